@@ -38,8 +38,25 @@ CREATE TABLE IF NOT EXISTS clients (
 -- Index for faster lookups by CNIC
 CREATE INDEX IF NOT EXISTS idx_clients_cnic ON clients(cnic);
 
--- Index for risk level filtering
+-- Indexes for risk level, employment and credit history filtering
 CREATE INDEX IF NOT EXISTS idx_clients_risk_level ON clients(risk_level);
+CREATE INDEX IF NOT EXISTS idx_clients_employment_status ON clients(employment_status);
+CREATE INDEX IF NOT EXISTS idx_clients_credit_history ON clients(credit_history);
+
+-- =============================================================================
+-- VIRTUAL TABLE: clients_fts
+-- Purpose: Full-text client search (see backend/search.py). Created on startup
+--          when SQLite has FTS5; rowid = clients.id. Triggers on clients keep
+--          it in sync.
+-- =============================================================================
+CREATE VIRTUAL TABLE IF NOT EXISTS clients_fts USING fts5(
+    name, cnic, phone, address,
+    cnic_digits,                            -- CNIC without dashes
+    phone_digits,                           -- Phone digits with/without country code or leading 0
+    prefix='2 3 4'
+);
+-- Triggers clients_fts_insert, clients_fts_update and clients_fts_delete
+-- mirror every write to clients into clients_fts.
 
 -- =============================================================================
 -- TABLE: loans
@@ -57,7 +74,9 @@ CREATE TABLE IF NOT EXISTS loans (
     loan_type VARCHAR NOT NULL,             -- Values: 'Business', 'Personal', 'Agriculture', 'Education'
     interest_rate FLOAT NOT NULL,           -- Annual interest rate (percentage)
     duration_months INTEGER NOT NULL,       -- Loan duration in months
-    monthly_installment FLOAT NOT NULL,     -- Calculated monthly payment amount
+    monthly_installment FLOAT NOT NULL,     -- Regular installment once any grace period is over
+    repayment_method VARCHAR NOT NULL DEFAULT 'flat',  -- Values: 'flat' (simple interest), 'reducing' (EMI)
+    grace_period_months INTEGER NOT NULL DEFAULT 0,    -- Interest-only months at the start of the term
     
     -- Loan Timeline
     start_date DATETIME NOT NULL,           -- Loan start date
@@ -65,6 +84,11 @@ CREATE TABLE IF NOT EXISTS loans (
     -- Loan Status
     status VARCHAR DEFAULT 'Active',        -- Values: 'Active', 'Completed', 'Defaulted'
     
+    -- Running Balances (kept by backend/ledger.py; NULL until the ledger is built)
+    total_due FLOAT,                        -- Sum of the repayment schedule
+    amount_paid FLOAT,                      -- Sum of payments in the ledger
+    outstanding_balance FLOAT,              -- total_due - amount_paid
+    
     -- Metadata
     created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
     
@@ -81,6 +105,9 @@ CREATE INDEX IF NOT EXISTS idx_loans_status ON loans(status);
 -- Index for loan type analytics
 CREATE INDEX IF NOT EXISTS idx_loans_type ON loans(loan_type);
 
+-- Index for loans of one status started in a date range
+CREATE INDEX IF NOT EXISTS idx_loans_status_start ON loans(status, start_date);
+
 -- =============================================================================
 -- TABLE: installments
 -- Purpose: Store repayment schedule and track payment status
@@ -98,7 +125,8 @@ CREATE TABLE IF NOT EXISTS installments (
     amount FLOAT NOT NULL,                  -- Installment amount
     
     -- Payment Tracking
-    paid BOOLEAN DEFAULT FALSE,             -- Payment status (0 = unpaid, 1 = paid)
+    amount_paid FLOAT NOT NULL DEFAULT 0,   -- Payments allocated to this installment so far
+    paid BOOLEAN DEFAULT FALSE,             -- Payment status (0 = unpaid, 1 = fully paid)
     paid_date DATETIME,                     -- Actual payment date (NULL if unpaid)
     is_overdue BOOLEAN DEFAULT FALSE,       -- Overdue flag (updated by system)
     
@@ -106,17 +134,114 @@ CREATE TABLE IF NOT EXISTS installments (
     FOREIGN KEY (loan_id) REFERENCES loans(id) ON DELETE CASCADE
 );
 
--- Index for faster lookups by loan
-CREATE INDEX IF NOT EXISTS idx_installments_loan_id ON installments(loan_id);
+-- Index for due date queries that ignore payment status (exports)
+CREATE INDEX IF NOT EXISTS idx_installments_due_date ON installments(due_date);
 
--- Index for payment status filtering
-CREATE INDEX IF NOT EXISTS idx_installments_paid ON installments(paid);
+-- Index for a loan's unpaid / open overdue installments (completion check, default alerts)
+CREATE INDEX IF NOT EXISTS idx_installments_loan_paid ON installments(loan_id, paid, is_overdue);
 
--- Index for overdue tracking
-CREATE INDEX IF NOT EXISTS idx_installments_overdue ON installments(is_overdue);
+-- Partial index for unpaid installments by due date (overdue sweep, cash-flow projection)
+CREATE INDEX IF NOT EXISTS idx_installments_unpaid_due ON installments(due_date) WHERE paid = 0;
 
--- Index for due date queries
-CREATE INDEX IF NOT EXISTS idx_installments_due_date ON installments(due_date);
+-- Index for a loan's schedule in due-date order (default-risk scoring)
+CREATE INDEX IF NOT EXISTS idx_installments_loan_due ON installments(loan_id, due_date);
+
+-- =============================================================================
+-- TABLE: payments
+-- Purpose: Ledger of every payment, full or partial (see backend/ledger.py)
+-- =============================================================================
+CREATE TABLE IF NOT EXISTS payments (
+    -- Primary Key
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    
+    -- Foreign Keys
+    loan_id INTEGER NOT NULL,
+    installment_id INTEGER,                 -- NULL once the loan's schedule has been regenerated
+    
+    -- Payment Details
+    amount FLOAT NOT NULL,
+    paid_at DATETIME NOT NULL,
+    source VARCHAR NOT NULL,                -- Values: 'payment', 'bulk', 'mark_all_paid', 'backfill'
+    
+    -- Metadata
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    
+    -- Foreign Key Constraints
+    FOREIGN KEY (loan_id) REFERENCES loans(id) ON DELETE CASCADE,
+    FOREIGN KEY (installment_id) REFERENCES installments(id)
+);
+
+-- Index for a loan's payment history and payments per year
+CREATE INDEX IF NOT EXISTS idx_payments_loan_paid_at ON payments(loan_id, paid_at);
+
+-- Index for the payments allocated to an installment
+CREATE INDEX IF NOT EXISTS idx_payments_installment_id ON payments(installment_id);
+
+-- =============================================================================
+-- TABLE: loan_summaries
+-- Purpose: Per-loan rollup maintained in the same transaction as loan and
+--          installment writes (see backend/summaries.py)
+-- =============================================================================
+CREATE TABLE IF NOT EXISTS loan_summaries (
+    loan_id INTEGER PRIMARY KEY,            -- Matches loans.id (no FK so deletes can be rolled up)
+    status VARCHAR,
+    loan_type VARCHAR,
+    start_year INTEGER,
+    loan_amount FLOAT DEFAULT 0,
+    installment_count INTEGER DEFAULT 0,
+    paid_count INTEGER DEFAULT 0,
+    overdue_count INTEGER DEFAULT 0,
+    expected_amount FLOAT DEFAULT 0,        -- Sum of all installment amounts
+    collected_amount FLOAT DEFAULT 0,       -- Sum of paid installment amounts
+    overdue_amount FLOAT DEFAULT 0,         -- Sum of unpaid overdue installment amounts
+    year_expected_amount FLOAT DEFAULT 0,   -- Due in the loan's start year
+    year_collected_amount FLOAT DEFAULT 0,  -- Paid in the loan's start year
+    updated_at DATETIME
+);
+
+-- =============================================================================
+-- TABLE: portfolio_rollups
+-- Purpose: Running portfolio totals per dimension/bucket, read by the dashboard
+--          Dimensions: 'portfolio' ('all'), 'status', 'loan_type', 'start_year'
+-- =============================================================================
+CREATE TABLE IF NOT EXISTS portfolio_rollups (
+    dimension VARCHAR NOT NULL,
+    bucket VARCHAR NOT NULL,
+    loan_count INTEGER DEFAULT 0,
+    disbursed_amount FLOAT DEFAULT 0,
+    installment_count INTEGER DEFAULT 0,
+    paid_count INTEGER DEFAULT 0,
+    overdue_count INTEGER DEFAULT 0,
+    expected_amount FLOAT DEFAULT 0,
+    collected_amount FLOAT DEFAULT 0,
+    overdue_amount FLOAT DEFAULT 0,
+    year_expected_amount FLOAT DEFAULT 0,
+    year_collected_amount FLOAT DEFAULT 0,
+    updated_at DATETIME,
+    PRIMARY KEY (dimension, bucket)
+);
+
+-- =============================================================================
+-- TABLE: loan_risk_scores
+-- Purpose: Latest default probability and alerts for every active loan,
+--          replaced by the portfolio scoring job (see backend/default_risk.py)
+-- =============================================================================
+CREATE TABLE IF NOT EXISTS loan_risk_scores (
+    loan_id INTEGER PRIMARY KEY,            -- Matches loans.id
+    client_id INTEGER NOT NULL,
+    default_probability FLOAT NOT NULL,     -- 0-100
+    installment_count INTEGER DEFAULT 0,
+    paid_count INTEGER DEFAULT 0,
+    overdue_count INTEGER DEFAULT 0,
+    recent_unpaid INTEGER DEFAULT 0,        -- Unpaid among the 3 latest-due installments
+    alert_count INTEGER DEFAULT 0,
+    highest_severity VARCHAR,               -- Low, Medium, High
+    alerts TEXT,                            -- JSON list of alerts
+    scored_at DATETIME NOT NULL
+);
+
+-- Index for the riskiest-loans view
+CREATE INDEX IF NOT EXISTS idx_loan_risk_scores_probability ON loan_risk_scores(default_probability, loan_id);
 
 -- =============================================================================
 -- RELATIONSHIPS
@@ -1,151 +1,173 @@
 from datetime import datetime, timedelta
+import functools
+import logging
+import os
+import threading
+import time
+import risk_config
+import schedules
+
+logger = logging.getLogger(__name__)
+
+# Percentage points added to the interest rate in stress-test scenarios
+STRESS_TEST_RATE_DELTA = 3.0
 
 class RiskScorer:
     """
     AI-based risk scoring system for client credit risk assessment.
-    Uses a weighted scoring model based on multiple factors.
+    Uses a weighted scoring model based on multiple factors. The weights,
+    bands and loan terms come from the scoring config (see risk_config),
+    which is reloaded when its file changes. Scores and suggestions are
+    memoized on the client's features until the next reload.
     """
     
-    def __init__(self):
-        self.weights = {
-            'income': 0.25,
-            'employment': 0.20,
-            'existing_loans': 0.20,
-            'credit_history': 0.25,
-            'loan_to_income': 0.10
+    def __init__(self, config_path=None, cache_size=None, reload_seconds=None):
+        self.config_path = config_path or risk_config.CONFIG_PATH
+        self.cache_size = risk_config.CACHE_SIZE if cache_size is None else cache_size
+        self.reload_seconds = risk_config.RELOAD_SECONDS if reload_seconds is None else reload_seconds
+        self._reload_lock = threading.Lock()
+        self.reload()
+    
+    def reload(self):
+        """
+        Read and compile the scoring config again, dropping memoized results.
+        Raises ValueError (keeping the current rules) if the file is invalid.
+        """
+        with self._reload_lock:
+            modified = self._modified()
+            tables = risk_config.load(self.config_path)
+            score = functools.lru_cache(maxsize=self.cache_size, typed=True)(tables.score)
+            terms = functools.lru_cache(maxsize=self.cache_size, typed=True)(functools.partial(self._terms, tables, score))
+            # Swapped in one assignment so concurrent callers see old or new rules, never a mix
+            self._compiled = (tables, score, terms)
+            self._modified_at = modified
+            self._checked_at = time.monotonic()
+            self.loaded_at = datetime.utcnow()
+        return self.status()
+    
+    def _modified(self):
+        try:
+            return os.stat(self.config_path).st_mtime_ns
+        except OSError:
+            return None
+    
+    def _current(self):
+        """The compiled rules, reloading them first if the config file changed"""
+        if time.monotonic() - self._checked_at >= self.reload_seconds:
+            self._checked_at = time.monotonic()
+            modified = self._modified()
+            if modified is not None and modified != self._modified_at:
+                try:
+                    self.reload()
+                except ValueError as e:
+                    # Keep scoring with the last good rules and warn once per change
+                    self._modified_at = modified
+                    logger.warning("Keeping the current risk scoring rules: %s", e)
+        return self._compiled
+    
+    def status(self):
+        tables, score, terms = self._compiled
+        return {
+            "config_path": self.config_path,
+            "loaded_at": self.loaded_at.isoformat(),
+            "weights": tables.weights,
+            "score_cache": score.cache_info()._asdict(),
+            "suggestion_cache": terms.cache_info()._asdict(),
         }
     
+    @property
+    def weights(self):
+        return self._compiled[0].weights
+    
     def calculate_risk_score(self, client_data, loan_amount=None):
         """
         Calculate risk score (0-100) where higher score = higher risk
         Returns: (risk_score, risk_level)
         """
-        scores = []
-        
-        # 1. Income Score (inverse - higher income = lower risk)
-        income = client_data.get('monthly_income', 0)
-        if income >= 50000:
-            income_score = 10
-        elif income >= 30000:
-            income_score = 30
-        elif income >= 20000:
-            income_score = 50
-        elif income >= 10000:
-            income_score = 70
-        else:
-            income_score = 90
-        scores.append(income_score * self.weights['income'])
-        
-        # 2. Employment Status Score
-        employment = client_data.get('employment_status', '').lower()
-        if employment == 'employed':
-            employment_score = 20
-        elif employment == 'self-employed':
-            employment_score = 40
-        else:
-            employment_score = 80
-        scores.append(employment_score * self.weights['employment'])
-        
-        # 3. Existing Loans Score
-        existing_loans = client_data.get('existing_loans', 0)
-        if existing_loans == 0:
-            loans_score = 10
-        elif existing_loans == 1:
-            loans_score = 30
-        elif existing_loans == 2:
-            loans_score = 60
-        else:
-            loans_score = 90
-        scores.append(loans_score * self.weights['existing_loans'])
-        
-        # 4. Credit History Score
-        credit_history = client_data.get('credit_history', '').lower()
-        if credit_history == 'good':
-            credit_score = 15
-        elif credit_history == 'average':
-            credit_score = 50
-        else:
-            credit_score = 85
-        scores.append(credit_score * self.weights['credit_history'])
-        
-        # 5. Loan-to-Income Ratio (if loan amount provided)
-        if loan_amount and income > 0:
-            loan_to_income_ratio = loan_amount / income
-            if loan_to_income_ratio <= 5:
-                lti_score = 20
-            elif loan_to_income_ratio <= 10:
-                lti_score = 40
-            elif loan_to_income_ratio <= 20:
-                lti_score = 60
-            else:
-                lti_score = 90
-            scores.append(lti_score * self.weights['loan_to_income'])
-        else:
-            # Default score if no loan amount
-            scores.append(40 * self.weights['loan_to_income'])
-        
-        # Calculate final risk score
-        risk_score = sum(scores)
-        
-        # Determine risk level
-        if risk_score <= 30:
-            risk_level = "Low"
-        elif risk_score <= 60:
-            risk_level = "Medium"
+        _, score, _ = self._current()
+        return score(
+            client_data.get('monthly_income', 0),
+            client_data.get('employment_status', ''),
+            client_data.get('existing_loans', 0),
+            client_data.get('credit_history', ''),
+            loan_amount
+        )
+    
+    def score_batch(self, clients, loan_amounts=None):
+        """
+        Vectorized version of calculate_risk_score for many clients at once.
+        `clients` is either a list of client dicts or a dict of columns
+        (NumPy arrays or lists) keyed like the client dict. `loan_amounts` is
+        an optional scalar or array aligned with the clients.
+        Returns: (risk_scores, risk_levels) lists, identical to the scalar path
+        """
+        if isinstance(clients, dict):
+            columns = clients
         else:
-            risk_level = "High"
-        
-        return round(risk_score, 2), risk_level
+            columns = {
+                'monthly_income': [c.get('monthly_income', 0) for c in clients],
+                'employment_status': [c.get('employment_status', '') for c in clients],
+                'existing_loans': [c.get('existing_loans', 0) for c in clients],
+                'credit_history': [c.get('credit_history', '') for c in clients],
+            }
+
+        if len(columns['monthly_income']) == 0:
+            return [], []
+        tables = self._current()[0]
+        return tables.score_columns(
+            columns['monthly_income'], columns['employment_status'], columns['existing_loans'],
+            columns['credit_history'], loan_amounts
+        )
     
-    def suggest_loan_terms(self, client_data, loan_amount):
+    def suggest_loan_terms(self, client_data, loan_amount, repayment_method=schedules.FLAT, grace_period_months=0):
         """
         AI-powered loan term suggestions based on risk profile
         Returns recommended interest rate and duration
         """
-        risk_score, risk_level = self.calculate_risk_score(client_data, loan_amount)
-        income = client_data.get('monthly_income', 0) or 0
-        existing_loans = client_data.get('existing_loans', 0) or 0
-        
-        # Base interest rates by risk level
-        if risk_level == "Low":
-            base_interest_rate = 12.0  # 12% annual
-            max_duration = 36  # 36 months
-        elif risk_level == "Medium":
-            base_interest_rate = 18.0  # 18% annual
-            max_duration = 24  # 24 months
-        else:
-            base_interest_rate = 24.0  # 24% annual
-            max_duration = 12  # 12 months
-        
-        # Adjust based on loan amount
-        if loan_amount > 500000:
-            base_interest_rate += 2
-        elif loan_amount < 50000:
-            base_interest_rate -= 1
+        _, _, terms = self._current()
+        suggestion = terms(
+            client_data.get('monthly_income', 0),
+            client_data.get('employment_status', ''),
+            client_data.get('existing_loans', 0),
+            client_data.get('credit_history', ''),
+            loan_amount, repayment_method, grace_period_months
+        )
+        # The memoized dict is shared, so hand out a copy
+        return {**suggestion, "stress_test": dict(suggestion["stress_test"]), "insights": list(suggestion["insights"])}
+    
+    @staticmethod
+    def _terms(tables, score, monthly_income, employment_status, existing_loans, credit_history,
+               loan_amount, repayment_method, grace_period_months):
+        risk_score, risk_level = score(monthly_income, employment_status, existing_loans, credit_history, loan_amount)
+        income = monthly_income or 0
+        existing_loans = existing_loans or 0
+        limits = tables.limits
         
-        # Recommended duration based on loan amount
-        if loan_amount <= 50000:
-            recommended_duration = min(12, max_duration)
-        elif loan_amount <= 200000:
-            recommended_duration = min(18, max_duration)
-        else:
-            recommended_duration = max_duration
+        # Base interest rate and longest term by risk level, adjusted for the loan amount
+        base_interest_rate, max_duration = tables.terms[risk_level]
+        base_interest_rate += tables.amount_rate_delta(loan_amount)
+        duration_cap = tables.amount_duration(loan_amount)
+        recommended_duration = max_duration if duration_cap is None else min(duration_cap, max_duration)
         
-        monthly_interest_rate = (base_interest_rate / 100) / 12
-        monthly_installment = (loan_amount * (1 + (base_interest_rate / 100) * (recommended_duration / 12))) / recommended_duration
+        schedules.validate_terms(recommended_duration, repayment_method, grace_period_months)
+        stress_test_interest = base_interest_rate + STRESS_TEST_RATE_DELTA
+        # Recommended and stressed terms priced together
+        priced = schedules.price_batch(
+            loan_amount, [base_interest_rate, stress_test_interest], recommended_duration,
+            repayment_method, grace_period_months,
+        )
+        monthly_installment, stress_test_installment = (float(value) for value in priced["installment"])
 
         loan_to_income_ratio = (loan_amount / income) if income else None
         debt_service_ratio = ((monthly_installment / income) * 100) if income else None
-        max_safe_amount = income * 15 if income else loan_amount
-        stress_test_interest = base_interest_rate + 3
-        stress_test_installment = ((loan_amount * (1 + (stress_test_interest / 100) * (recommended_duration / 12))) / recommended_duration)
+        max_safe_amount = income * limits["max_loan_income_multiple"] if income else loan_amount
 
         insights = []
-        if debt_service_ratio and debt_service_ratio > 35:
-            insights.append("Installments exceed 35% of monthly income. Consider lowering loan amount.")
-        if loan_to_income_ratio and loan_to_income_ratio > 12:
+        if debt_service_ratio and debt_service_ratio > limits["max_debt_service_ratio"]:
+            insights.append(f"Installments exceed {limits['max_debt_service_ratio']:g}% of monthly income. Consider lowering loan amount.")
+        if loan_to_income_ratio and loan_to_income_ratio > limits["max_loan_to_income"]:
             insights.append("Loan-to-income ratio is higher than typical microfinance thresholds.")
-        if existing_loans >= 2:
+        if existing_loans >= limits["many_existing_loans"]:
             insights.append("Client already services multiple loans. Verify repayment discipline.")
         if not insights:
             insights.append("Risk level is under control. Proceed with standard monitoring cadence.")
@@ -154,6 +176,9 @@ class RiskScorer:
             "recommended_interest_rate": round(base_interest_rate, 2),
             "recommended_duration_months": recommended_duration,
             "recommended_monthly_installment": round(monthly_installment, 2),
+            "repayment_method": repayment_method,
+            "grace_period_months": grace_period_months,
+            "total_payable": round(float(priced["total_payable"][0]), 2),
             "risk_level": risk_level,
             "risk_score": risk_score,
             "loan_to_income_ratio": round(loan_to_income_ratio, 2) if loan_to_income_ratio else None,
@@ -163,7 +188,7 @@ class RiskScorer:
                 "interest_rate": round(stress_test_interest, 2),
                 "monthly_installment": round(stress_test_installment, 2)
             },
-            "approval_recommendation": "Approve" if risk_level in ["Low", "Medium"] else "Review Required",
+            "approval_recommendation": "Approve" if risk_level in tables.approve_levels else "Review Required",
             "insights": insights
         }
 
@@ -179,13 +204,25 @@ class DefaultAlertSystem:
         Analyze loan and installment data to detect default risks
         Returns list of alerts
         """
-        alerts = []
-        
         # Count overdue installments
         overdue_count = sum(1 for inst in installments_data if inst.get('is_overdue') and not inst.get('paid'))
         paid_count = sum(1 for inst in installments_data if inst.get('paid'))
         total_count = len(installments_data)
         
+        recent_installments = sorted(installments_data, key=lambda x: x.get('due_date', ''), reverse=True)[:3]
+        recent_unpaid = sum(1 for inst in recent_installments if not inst.get('paid'))
+        
+        return DefaultAlertSystem.check_default_risk_from_stats(overdue_count, paid_count, total_count, recent_unpaid)
+    
+    @staticmethod
+    def check_default_risk_from_stats(overdue_count, paid_count, total_count, recent_unpaid):
+        """
+        Same alerts as check_default_risk, from pre-aggregated installment counts.
+        `recent_unpaid` is the number of unpaid installments among the three
+        with the latest due dates.
+        """
+        alerts = []
+        
         # Alert 1: Multiple missed payments
         if overdue_count >= 3:
             alerts.append({
@@ -221,8 +258,6 @@ class DefaultAlertSystem:
                 })
         
         # Alert 3: Recent payment issues
-        recent_installments = sorted(installments_data, key=lambda x: x.get('due_date', ''), reverse=True)[:3]
-        recent_unpaid = sum(1 for inst in recent_installments if not inst.get('paid'))
         if recent_unpaid >= 2:
             alerts.append({
                 "severity": "Medium",
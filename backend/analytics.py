@@ -0,0 +1,139 @@
+from typing import Optional
+from sqlalchemy import func, case, select
+from sqlalchemy.orm import Session
+import database
+
+
+def client_risk_counts(db: Session):
+    """
+    Count clients per risk level in a single pass over the clients table
+    """
+    Client = database.Client
+    row = db.query(
+        func.count(Client.id),
+        func.coalesce(func.sum(case((Client.risk_level == "Low", 1), else_=0)), 0),
+        func.coalesce(func.sum(case((Client.risk_level == "Medium", 1), else_=0)), 0),
+        func.coalesce(func.sum(case((Client.risk_level == "High", 1), else_=0)), 0),
+    ).one()
+
+    return {
+        "total": row[0],
+        "low": row[1],
+        "medium": row[2],
+        "high": row[3],
+    }
+
+
+def build_dashboard_payload(clients, loans, installments, loan_types, year):
+    """
+    Shape aggregate figures into the /api/dashboard/stats response
+    """
+    total_expected = installments["expected"]
+    total_collected = installments["collected"]
+
+    return {
+        "clients": {
+            "total": clients["total"],
+            "risk_distribution": {
+                "low": clients["low"],
+                "medium": clients["medium"],
+                "high": clients["high"]
+            }
+        },
+        "loans": {
+            "total": loans["total"],
+            "active": loans["active"],
+            "completed": loans["completed"],
+            "defaulted": loans["defaulted"]
+        },
+        "financial": {
+            "total_disbursed": round(loans["disbursed"], 2),
+            "total_expected": round(total_expected, 2),
+            "total_collected": round(total_collected, 2),
+            "collection_rate": round((total_collected / total_expected * 100) if total_expected > 0 else 0, 2),
+            "yearly": {
+                "year": year,
+                "disbursed": round(loans["yearly_disbursed"], 2),
+                "expected": round(installments["yearly_expected"], 2),
+                "collected": round(installments["yearly_collected"], 2)
+            }
+        },
+        "alerts": {
+            "overdue_installments": installments["overdue_count"]
+        },
+        "loan_types": loan_types
+    }
+
+
+def overdue_alerts_query(min_overdue: int = 1, risk_level: Optional[str] = None,
+                         after_loan_id: Optional[int] = None, limit: Optional[int] = None):
+    """
+    Active loans with unpaid overdue installments, joined with their client, in
+    one grouped statement ordered by loan id for keyset pagination.
+    """
+    Loan = database.Loan
+    Client = database.Client
+    Installment = database.Installment
+    overdue_count = func.count(Installment.id).label("overdue_count")
+
+    stmt = (
+        select(
+            Loan.id.label("loan_id"),
+            Loan.client_id,
+            Loan.loan_amount,
+            Client.name.label("client_name"),
+            Client.risk_level,
+            overdue_count,
+        )
+        .join(Client, Client.id == Loan.client_id)
+        .join(Installment, Installment.loan_id == Loan.id)
+        .where(
+            Loan.status == "Active",
+            Installment.is_overdue == True,
+            Installment.paid == False,
+        )
+        .group_by(Loan.id, Loan.client_id, Loan.loan_amount, Client.name, Client.risk_level)
+        .having(overdue_count >= min_overdue)
+        .order_by(Loan.id)
+    )
+    if risk_level is not None:
+        stmt = stmt.where(Client.risk_level == risk_level)
+    if after_loan_id is not None:
+        stmt = stmt.where(Loan.id > after_loan_id)
+    if limit is not None:
+        stmt = stmt.limit(limit)
+    return stmt
+
+
+def overdue_alerts_count(db: Session, min_overdue: int = 1, risk_level: Optional[str] = None) -> int:
+    """Number of alerts matching the filters across every page"""
+    matching = overdue_alerts_query(min_overdue, risk_level).subquery()
+    return db.execute(select(func.count()).select_from(matching)).scalar_one()
+
+
+def overdue_alerts(db: Session, min_overdue: int = 1, risk_level: Optional[str] = None,
+                   after_loan_id: Optional[int] = None, limit: Optional[int] = None):
+    """
+    Page of overdue alerts plus the cursor for the next page (None on the last page)
+    """
+    # Fetch one extra row to know whether another page exists
+    fetch = limit + 1 if limit is not None else None
+    rows = db.execute(overdue_alerts_query(min_overdue, risk_level, after_loan_id, fetch)).all()
+
+    next_cursor = None
+    if limit is not None and len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = rows[-1].loan_id
+
+    alerts = [
+        {
+            "loan_id": row.loan_id,
+            "client_name": row.client_name,
+            "client_id": row.client_id,
+            "overdue_count": row.overdue_count,
+            "loan_amount": row.loan_amount,
+            "risk_level": row.risk_level
+        }
+        for row in rows
+    ]
+    return alerts, next_cursor
@@ -0,0 +1,120 @@
+"""
+Benchmark the amortization engine.
+
+Compares building schedules one loan at a time in plain Python (month by
+month, the way a per-loan loop would) with schedules.schedule_batch, which
+computes every loan's schedule as one set of numpy arrays, and times
+price_batch on a what-if grid (every loan re-priced at several rates).
+Also checks that both produce the same payments to the paisa.
+
+    python benchmarks/bench_amortization.py --loans 10000
+"""
+import argparse
+import random
+import sys
+import time
+
+import numpy as np
+
+import common  # noqa: F401  (puts the backend on sys.path)
+
+import schedules
+
+WHAT_IF_RATE_DELTAS = (-2.0, -1.0, 0.0, 1.0, 2.0, 3.0)
+
+
+def reference_payments(amount, rate, months, method, grace):
+    """Month-by-month schedule in plain Python, used as the baseline and for equivalence"""
+    monthly_rate = rate / 1200
+    repaying = months - grace
+    payments = []
+    if method == schedules.REDUCING:
+        if monthly_rate:
+            emi = amount * monthly_rate / (1 - (1 + monthly_rate) ** -repaying)
+        else:
+            emi = amount / repaying
+        balance = amount
+        total = 0.0
+        for month in range(months):
+            interest = balance * monthly_rate
+            payment = interest if month < grace else emi
+            balance -= payment - interest
+            total += payment
+            payments.append(round(payment, 2))
+    else:
+        flat_interest = amount * monthly_rate * months
+        total = amount + flat_interest
+        for month in range(months):
+            payment = flat_interest / months + (0 if month < grace else amount / repaying)
+            payments.append(round(payment, 2))
+    payments[-1] = round(total - sum(payments[:-1]), 2)
+    return payments
+
+
+def make_loans(n, seed):
+    rng = random.Random(seed)
+    loans = []
+    for _ in range(n):
+        months = rng.choice([6, 9, 12, 18, 24, 36])
+        loans.append((
+            rng.choice([25000, 50000, 100000, 250000, 500000]),
+            rng.choice([0.0, 12.0, 15.0, 18.0, 24.0]),
+            months,
+            rng.choice(schedules.METHODS),
+            rng.choice([0, 0, 0, 1, 2, 3]),
+        ))
+    return loans
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--loans", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    loans = make_loans(args.loans, args.seed)
+    amounts, rates, months, methods, graces = (list(column) for column in zip(*loans))
+
+    started = time.perf_counter()
+    expected = [reference_payments(*loan) for loan in loans]
+    loop_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    batch = schedules.schedule_batch(amounts, rates, months, methods, graces)
+    batch_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for loan in loans[:1000]:
+        schedules.amortize(*loan)
+    single_seconds = (time.perf_counter() - started) / min(1000, len(loans))
+
+    grid_rates = np.add.outer(WHAT_IF_RATE_DELTAS, rates)
+    started = time.perf_counter()
+    priced = schedules.price_batch(amounts, grid_rates, months, methods, graces)
+    grid_seconds = time.perf_counter() - started
+
+    mismatches = 0
+    worst = 0.0
+    for row, payments in zip(batch.payment, expected):
+        diff = np.abs(row[:len(payments)] - np.asarray(payments)).max()
+        worst = max(worst, float(diff))
+        mismatches += diff > 0.011
+    totals_ok = np.allclose(batch.payment.sum(axis=1), priced["total_payable"][WHAT_IF_RATE_DELTAS.index(0.0)], atol=0.01)
+
+    print(f"{args.loans} loans, {sum(months)} installments")
+    print(f"  per-loan Python loop : {loop_seconds * 1000:8.1f} ms")
+    print(f"  schedule_batch       : {batch_seconds * 1000:8.1f} ms ({loop_seconds / batch_seconds:.1f}x)")
+    print(f"  amortize (one loan)  : {single_seconds * 1e6:8.1f} us per call")
+    print(f"  price_batch what-if  : {grid_seconds * 1000:8.1f} ms for {grid_rates.size} loan/rate pairs")
+    print(f"  largest payment difference vs reference: {worst:.4f}")
+
+    if mismatches or not totals_ok:
+        print(f"FAIL: {mismatches} schedules differ from the reference by more than a paisa"
+              + ("" if totals_ok else "; batch totals do not match price_batch"))
+        return 1
+    print("OK: batch schedules match the reference")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
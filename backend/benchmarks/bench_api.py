@@ -0,0 +1,398 @@
+"""
+End-to-end API benchmark suite.
+
+Generates a synthetic portfolio (seed_data.generate_portfolio) in a
+throwaway SQLite file, then drives every route in main.py in-process over
+httpx's ASGI transport. For each endpoint it reports throughput,
+p50/p95/p99 latency and the SQL statements and database time per request
+(taken from the metrics middleware), and writes everything to a JSON file
+so runs can be compared across commits.
+
+    python benchmarks/bench_api.py --scale 100k
+    python benchmarks/bench_api.py --scale 100k --compare results/api-<old>.json
+
+Read endpoints run first; writes and deletes run last against ids reserved
+for them. Any route missing from the suite is reported.
+
+Requires httpx (pip install httpx).
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+fd, DB_PATH = tempfile.mkstemp(suffix=".db", prefix="sahulatfin-bench-")
+os.close(fd)
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+os.environ.pop("ASYNC_DATABASE_URL", None)
+os.environ["OVERDUE_SWEEP_INTERVAL_SECONDS"] = "0"
+os.environ["DEFAULT_RISK_INTERVAL_SECONDS"] = "0"
+os.environ.setdefault("SLOW_REQUEST_MS", "60000")
+
+from common import BACKEND_DIR
+from load_test import percentile
+
+import httpx
+
+import ai_models
+import database
+import default_risk
+import ledger
+import main as api
+import metrics
+import seed_data
+import summaries
+
+USERNAME = "hexenzirkle"
+PASSWORD = "24k-5541@Hexa"
+NOW = datetime(2026, 1, 1)
+
+
+class Spec:
+    """One endpoint: how to build its i-th request and how hard to drive it"""
+
+    def __init__(self, method, route, build, requests=200, concurrency=8, expect=(200,), name=None):
+        self.method = method
+        self.route = route
+        self.build = build
+        self.requests = requests
+        self.concurrency = concurrency
+        self.expect = expect
+        self.name = name or f"{method} {route}"
+
+
+class Context:
+    """Ids from the generated data, with disjoint pools for destructive requests"""
+
+    def __init__(self, session, seed):
+        rng = random.Random(seed)
+        client_ids = [row[0] for row in session.query(database.Client.id).order_by(database.Client.id)]
+        loans = session.query(database.Loan.id, database.Loan.client_id).order_by(database.Loan.id).all()
+        self.rng = rng
+        # Clients (with their loans) at the end of the id range are reserved for deletes
+        reserve = max(1, min(100, len(client_ids) // 10, len(loans) // 10))
+        self.delete_client_ids = client_ids[-reserve:]
+        reserved = set(self.delete_client_ids)
+        self.client_ids = [client_id for client_id in client_ids if client_id not in reserved]
+        owned = [loan for loan in loans if loan.client_id not in reserved]
+        self.loan_ids = [loan.id for loan in owned]
+        rng.shuffle(self.loan_ids)
+        self.delete_loan_ids = self.loan_ids[:reserve]
+        self.mark_paid_loan_ids = self.loan_ids[reserve:2 * reserve]
+        # Updating a loan regenerates its schedule, so payments go to loans nothing else touches
+        pay_loan_ids = self.loan_ids[2 * reserve:3 * reserve]
+        bulk_pay_loan_ids = self.loan_ids[3 * reserve:4 * reserve]
+        self.loan_ids = self.loan_ids[4 * reserve:]
+        pay_candidates = session.query(database.Installment.id).filter(
+            database.Installment.paid == False,
+            database.Installment.loan_id.in_(pay_loan_ids),
+        ).all()
+        self.unpaid_installment_ids = [row[0] for row in pay_candidates]
+        bulk_candidates = session.query(database.Installment.loan_id, database.Installment.installment_number).filter(
+            database.Installment.paid == False,
+            database.Installment.loan_id.in_(bulk_pay_loan_ids),
+        ).all()
+        self.bulk_payments = [
+            {"loan_id": loan_id, "installment_number": number} for loan_id, number in bulk_candidates
+        ]
+        self.cnic_counter = 9_000_000
+
+    def client(self, i):
+        return self.client_ids[(i * 7919) % len(self.client_ids)]
+
+    def loan(self, i):
+        return self.loan_ids[(i * 7919) % len(self.loan_ids)]
+
+    def new_cnic(self):
+        self.cnic_counter += 1
+        return f"99999-{self.cnic_counter:07d}-1"
+
+    def new_client(self):
+        return {
+            "name": "Bench Client",
+            "cnic": self.new_cnic(),
+            "phone": "+92-300-1234567",
+            "address": "Karachi",
+            "monthly_income": self.rng.choice([15000, 30000, 60000]),
+            "employment_status": self.rng.choice(["Employed", "Self-Employed", "Unemployed"]),
+            "existing_loans": self.rng.randint(0, 2),
+            "credit_history": self.rng.choice(["Good", "Average", "Poor"]),
+        }
+
+    def new_loan(self, i):
+        return {
+            "client_id": self.client(i),
+            "loan_amount": 50000,
+            "loan_type": "Business",
+            "interest_rate": 18.0,
+            "duration_months": 12,
+            "start_date": "2025-06-01T00:00:00",
+        }
+
+    def import_file(self, rows=100):
+        header = "name,cnic,phone,address,monthly_income,employment_status,existing_loans,credit_history\n"
+        body = "".join(
+            f"Import Client,{self.new_cnic()},+92-300-7654321,Lahore,25000,Employed,0,Good\n" for _ in range(rows)
+        )
+        return {"file": ("clients.csv", io.BytesIO((header + body).encode()), "text/csv")}
+
+
+def get(path, **params):
+    return lambda ctx, i: {"method": "GET", "url": path(ctx, i) if callable(path) else path, "params": params}
+
+
+def build_specs(ctx):
+    login = {"username": USERNAME, "password": PASSWORD}
+    return [
+        # Public pages
+        Spec("GET", "/", get("/")),
+        Spec("GET", "/health", get("/health")),
+        Spec("GET", "/docs.html", get("/docs.html"), requests=50),
+        Spec("GET", "/health.html", get("/health.html"), requests=50),
+        Spec("GET", "/metrics", get("/metrics"), requests=50),
+        Spec("GET", "/api/metrics/summary", get("/api/metrics/summary"), requests=50),
+        # Auth
+        Spec("POST", "/api/auth/login", lambda ctx, i: {"method": "POST", "url": "/api/auth/login", "json": login},
+             requests=10, concurrency=2),
+        Spec("GET", "/api/auth/me", get("/api/auth/me")),
+        Spec("GET", "/api/auth/cache-stats", get("/api/auth/cache-stats")),
+        Spec("GET", "/api/cache/stats", get("/api/cache/stats")),
+        # Reads
+        Spec("GET", "/api/clients/", get("/api/clients/", limit=100)),
+        Spec("GET", "/api/clients/search", get("/api/clients/search", q="ayesha kh")),
+        Spec("GET", "/api/clients/{client_id}", get(lambda ctx, i: f"/api/clients/{ctx.client(i)}")),
+        Spec("GET", "/api/clients/{client_id}/loans", get(lambda ctx, i: f"/api/clients/{ctx.client(i)}/loans")),
+        Spec("GET", "/api/clients/{client_id}/overview", get(lambda ctx, i: f"/api/clients/{ctx.client(i)}/overview")),
+        Spec("GET", "/api/loans/", get("/api/loans/", limit=100)),
+        Spec("GET", "/api/loans/{loan_id}", get(lambda ctx, i: f"/api/loans/{ctx.loan(i)}")),
+        Spec("GET", "/api/loans/{loan_id}/installments", get(lambda ctx, i: f"/api/loans/{ctx.loan(i)}/installments")),
+        Spec("GET", "/api/loans/{loan_id}/alerts", get(lambda ctx, i: f"/api/loans/{ctx.loan(i)}/alerts")),
+        Spec("GET", "/api/loans/{loan_id}/payments", get(lambda ctx, i: f"/api/loans/{ctx.loan(i)}/payments")),
+        Spec("POST", "/api/loans/suggest", lambda ctx, i: {
+            "method": "POST", "url": "/api/loans/suggest", "json": {"client_id": ctx.client(i), "loan_amount": 75000}
+        }),
+        Spec("GET", "/api/risk-scoring/config", get("/api/risk-scoring/config")),
+        Spec("GET", "/api/alerts/all", get("/api/alerts/all", limit=100), requests=50),
+        Spec("GET", "/api/alerts/riskiest", get("/api/alerts/riskiest", limit=100)),
+        Spec("GET", "/api/alerts/risk-scores/status", get("/api/alerts/risk-scores/status")),
+        Spec("GET", "/api/installments/overdue-sweep", get("/api/installments/overdue-sweep")),
+        Spec("GET", "/api/dashboard/stats", get("/api/dashboard/stats")),
+        Spec("GET", "/api/cashflow/projection", get("/api/cashflow/projection", period="week", group_by="loan_type", stress="true"),
+             requests=50),
+        Spec("GET", "/api/exports/installments", get("/api/exports/installments", format="csv"), requests=3, concurrency=1),
+        # Jobs
+        Spec("POST", "/api/alerts/risk-scores/run", lambda ctx, i: {"method": "POST", "url": "/api/alerts/risk-scores/run"},
+             requests=3, concurrency=1),
+        Spec("PUT", "/api/installments/update-overdue", lambda ctx, i: {"method": "PUT", "url": "/api/installments/update-overdue"},
+             requests=3, concurrency=1),
+        Spec("POST", "/api/clients/rescore", lambda ctx, i: {"method": "POST", "url": "/api/clients/rescore"},
+             requests=2, concurrency=1),
+        # Writes
+        Spec("POST", "/api/clients/", lambda ctx, i: {"method": "POST", "url": "/api/clients/", "json": ctx.new_client()},
+             requests=100, concurrency=4),
+        Spec("POST", "/api/clients/import", lambda ctx, i: {"method": "POST", "url": "/api/clients/import", "files": ctx.import_file()},
+             requests=10, concurrency=1),
+        Spec("PUT", "/api/clients/{client_id}", lambda ctx, i: {
+            "method": "PUT", "url": f"/api/clients/{ctx.client(i)}", "json": {"monthly_income": 20000 + i}
+        }, requests=100, concurrency=4),
+        Spec("POST", "/api/loans/", lambda ctx, i: {"method": "POST", "url": "/api/loans/", "json": ctx.new_loan(i)},
+             requests=100, concurrency=4),
+        Spec("POST", "/api/loans/bulk", lambda ctx, i: {
+            "method": "POST", "url": "/api/loans/bulk", "json": [ctx.new_loan(i * 50 + n) for n in range(50)]
+        }, requests=10, concurrency=1),
+        Spec("PUT", "/api/loans/{loan_id}", lambda ctx, i: {
+            "method": "PUT", "url": f"/api/loans/{ctx.loan(i)}", "json": {"interest_rate": 20.0}
+        }, requests=100, concurrency=4),
+        Spec("PUT", "/api/installments/{installment_id}/pay", lambda ctx, i: {
+            "method": "PUT", "url": f"/api/installments/{ctx.unpaid_installment_ids[i]}/pay"
+        }, requests=min(100, len(ctx.unpaid_installment_ids)), concurrency=4),
+        Spec("POST", "/api/payments/bulk", lambda ctx, i: {
+            "method": "POST", "url": "/api/payments/bulk", "json": ctx.bulk_payments[i * 100:(i + 1) * 100]
+        }, requests=max(1, min(10, len(ctx.bulk_payments) // 100)), concurrency=1),
+        Spec("PUT", "/api/loans/{loan_id}/mark-all-paid", lambda ctx, i: {
+            "method": "PUT", "url": f"/api/loans/{ctx.mark_paid_loan_ids[i]}/mark-all-paid"
+        }, requests=len(ctx.mark_paid_loan_ids), concurrency=4),
+        # Deletes
+        Spec("DELETE", "/api/loans/{loan_id}", lambda ctx, i: {"method": "DELETE", "url": f"/api/loans/{ctx.delete_loan_ids[i]}"},
+             requests=len(ctx.delete_loan_ids), concurrency=4),
+        Spec("DELETE", "/api/clients/{client_id}", lambda ctx, i: {
+            "method": "DELETE", "url": f"/api/clients/{ctx.delete_client_ids[i]}"
+        }, requests=len(ctx.delete_client_ids), concurrency=4),
+    ]
+
+
+async def drive(client, ctx, spec):
+    latencies = []
+    errors = 0
+    next_index = 0
+
+    async def worker():
+        nonlocal next_index, errors
+        while next_index < spec.requests:
+            i = next_index
+            next_index += 1
+            request = spec.build(ctx, i)
+            started = time.perf_counter()
+            response = await client.request(
+                request["method"], request["url"], params=request.get("params"),
+                json=request.get("json"), files=request.get("files"),
+            )
+            latencies.append((time.perf_counter() - started) * 1000)
+            if response.status_code not in spec.expect:
+                errors += 1
+
+    metrics.registry.reset()
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(spec.concurrency)))
+    elapsed = time.perf_counter() - started
+
+    route_metrics = next(
+        (route for route in metrics.registry.summary()["routes"]
+         if route["route"] == spec.route and route["method"] == spec.method),
+        {},
+    )
+    return {
+        "name": spec.name,
+        "method": spec.method,
+        "route": spec.route,
+        "requests": len(latencies),
+        "concurrency": spec.concurrency,
+        "errors": errors,
+        "rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+        "avg_statements": route_metrics.get("avg_statements"),
+        "avg_db_ms": route_metrics.get("avg_db_ms"),
+    }
+
+
+def uncovered_routes(specs):
+    covered = {(spec.method, spec.route) for spec in specs}
+    missing = []
+    for route in api.app.routes:
+        for method in sorted(getattr(route, "methods", None) or []):
+            if method in ("HEAD", "OPTIONS") or route.path.startswith(("/docs", "/redoc", "/openapi")) and route.path != "/docs.html":
+                continue
+            if (method, route.path) not in covered:
+                missing.append(f"{method} {route.path}")
+    return missing
+
+
+async def run(args, ctx, specs):
+    transport = httpx.ASGITransport(app=api.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=600) as client:
+        login = await client.post("/api/auth/login", json={"username": USERNAME, "password": PASSWORD})
+        login.raise_for_status()
+        client.headers["Authorization"] = f"Bearer {login.json()['access_token']}"
+
+        results = []
+        print(f"{'endpoint':<48} {'req':>5} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'sql':>6} {'err':>4}")
+        for spec in specs:
+            if args.only and args.only not in spec.name:
+                continue
+            result = await drive(client, ctx, spec)
+            results.append(result)
+            print(f"{result['name']:<48} {result['requests']:5d} {result['rps']:8.1f} {result['p50_ms']:8.1f} "
+                  f"{result['p95_ms']:8.1f} {result['p99_ms']:8.1f} {result['avg_statements'] or 0:6.1f} {result['errors']:4d}")
+        return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def compare(results, baseline_path):
+    with open(baseline_path) as baseline_file:
+        baseline = {result["name"]: result for result in json.load(baseline_file)["results"]}
+    print(f"\nAgainst {baseline_path}:")
+    print(f"{'endpoint':<48} {'p95 before':>11} {'p95 now':>9} {'change':>8} {'sql before':>11} {'sql now':>8}")
+    for result in results:
+        before = baseline.get(result["name"])
+        if not before:
+            continue
+        change = (result["p95_ms"] / before["p95_ms"] - 1) * 100 if before["p95_ms"] else 0.0
+        print(f"{result['name']:<48} {before['p95_ms']:11.1f} {result['p95_ms']:9.1f} {change:+7.0f}% "
+              f"{before['avg_statements'] or 0:11.1f} {result['avg_statements'] or 0:8.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", default="10k", help="installments to generate: 10k, 100k, 1m or a number")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--only", help="run only endpoints whose name contains this text")
+    parser.add_argument("--output", help="JSON results path (default benchmarks/results/api-<commit>-<scale>.json)")
+    parser.add_argument("--compare", help="earlier results JSON to compare against")
+    args = parser.parse_args()
+
+    installments = seed_data.SCALES.get(args.scale.lower()) or int(args.scale)
+    try:
+        database.init_db()
+        session = database.SessionLocal()
+        try:
+            started = time.perf_counter()
+            dataset = seed_data.generate_portfolio(session, installments, seed=args.seed, now=NOW)
+            ledger.backfill(session, now=NOW)
+            session.commit()
+            summaries.rebuild(session)
+            default_risk.score_portfolio(session, ai_models.DefaultAlertSystem())
+            print(f"Generated {dataset['clients']} clients, {dataset['loans']} loans, "
+                  f"{dataset['installments']} installments in {time.perf_counter() - started:.1f}s")
+            ctx = Context(session, args.seed)
+        finally:
+            session.close()
+        api.startup_event()
+
+        specs = build_specs(ctx)
+        missing = uncovered_routes(specs)
+        if missing:
+            print("Routes not covered by the suite: " + ", ".join(missing))
+        results = asyncio.run(run(args, ctx, specs))
+    finally:
+        api.shutdown_event()
+        database.engine.dispose()
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(DB_PATH + suffix):
+                os.remove(DB_PATH + suffix)
+
+    commit = git_commit()
+    report = {
+        "commit": commit,
+        "created_at": datetime.utcnow().isoformat(),
+        "scale": args.scale,
+        "seed": args.seed,
+        "dataset": dataset,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "uncovered_routes": missing,
+        "results": results,
+    }
+    output = args.output or os.path.join(
+        BACKEND_DIR, "benchmarks", "results", f"api-{commit or 'local'}-{args.scale}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as output_file:
+        json.dump(report, output_file, indent=2)
+    print(f"\nWrote {output}")
+
+    if args.compare:
+        compare(results, args.compare)
+    return 1 if any(result["errors"] for result in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,63 @@
+"""
+Benchmark collection-day repayment posting.
+
+Posts the same set of payments through PUT /api/installments/{id}/pay one
+request at a time and through POST /api/payments/bulk in a single batch,
+each against a fresh copy of the portfolio, and reports time and SQL
+statements for both.
+
+    python benchmarks/bench_bulk_payments.py --loans 1000 --payments 2000
+"""
+import argparse
+import time
+
+from common import temp_database, seed_portfolio, count_statements
+
+import database
+import main as api
+import summaries
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--loans", type=int, default=1000)
+    parser.add_argument("--payments", type=int, default=2000)
+    args = parser.parse_args()
+
+    results = {}
+    for name in ("single", "bulk"):
+        with temp_database() as (engine, Session):
+            db = Session()
+            seed_portfolio(db, args.loans)
+            summaries.rebuild(db)
+            installment_ids = [
+                row.id for row in db.query(database.Installment.id)
+                .filter(database.Installment.paid == False)
+                .order_by(database.Installment.loan_id, database.Installment.id)
+                .limit(args.payments)
+            ]
+            with count_statements(engine) as counter:
+                started = time.perf_counter()
+                if name == "single":
+                    for installment_id in installment_ids:
+                        api.mark_installment_paid(installment_id, amount=None, db=db, current_user=None)
+                else:
+                    records = [api.PaymentRecord(installment_id=installment_id) for installment_id in installment_ids]
+                    api.post_bulk_payments(records, db=db, current_user=None)
+                elapsed = time.perf_counter() - started
+            paid = db.query(database.Installment).filter(database.Installment.id.in_(installment_ids[:900]),
+                                                         database.Installment.paid == True).count()
+            completed = db.query(database.Loan).filter(database.Loan.status == "Completed").count()
+            results[name] = (elapsed, counter["statements"], paid, completed)
+            db.close()
+
+    print(f"{len(installment_ids)} payments across {args.loans} loans")
+    for name, (elapsed, statements, paid, completed) in results.items():
+        print(f"{name:>7}: {elapsed * 1000:9.1f} ms  {statements:7d} statements  (completed loans: {completed})")
+    print(f"speedup: {results['single'][0] / results['bulk'][0]:.1f}x")
+    if results["single"][2:] != results["bulk"][2:]:
+        print("WARNING: the two runs ended in different states")
+
+
+if __name__ == "__main__":
+    main()
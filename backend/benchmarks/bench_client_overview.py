@@ -0,0 +1,101 @@
+"""
+Benchmark the client 360 overview as a client's loan count grows.
+
+Compares overview.client_overview with what a client page did before it:
+the client, their loans, then each loan's installments and the on-demand
+alert calculation from /api/loans/{id}/alerts. The overview's statement
+count must not depend on the number of loans, and it must agree with the
+per-loan path on installment counts and default probability.
+
+    python benchmarks/bench_client_overview.py --loans-per-client 1 5 25 100
+"""
+import argparse
+import sys
+
+from common import temp_database, seed_portfolio, count_statements, time_call
+
+import ai_models
+import database
+import default_risk
+import overview
+import summaries
+
+
+def legacy_overview(db, alert_system, client_id):
+    """Client page before /overview: one round of queries per loan"""
+    client = db.query(database.Client).filter(database.Client.id == client_id).first()
+    loans = db.query(database.Loan).filter(database.Loan.client_id == client_id).all()
+    result = {}
+    for loan in loans:
+        installments = db.query(database.Installment).filter(database.Installment.loan_id == loan.id).all()
+        installments_data = [
+            {'paid': inst.paid, 'is_overdue': inst.is_overdue, 'due_date': inst.due_date.isoformat()}
+            for inst in installments
+        ]
+        loan_data = {'status': loan.status, 'loan_amount': loan.loan_amount}
+        overdue_count = sum(1 for inst in installments if inst.is_overdue and not inst.paid)
+        alert_system.check_default_risk(loan_data, installments_data)
+        probability = alert_system.calculate_default_probability(loan_data, client.risk_score or 50, overdue_count)
+        result[loan.id] = (len(installments), sum(1 for inst in installments if inst.paid), probability)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--loans-per-client", type=int, nargs="+", default=[1, 5, 25, 100])
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--installments", type=int, default=12)
+    args = parser.parse_args()
+
+    alert_system = ai_models.DefaultAlertSystem()
+    print(f"{'loans':>6} {'legacy ms':>10} {'legacy stmts':>13} {'overview ms':>12} {'overview stmts':>15}"
+          f" {'scored ms':>10} {'scored stmts':>13}")
+    statement_counts = set()
+    mismatches = 0
+    for per_client in args.loans_per_client:
+        with temp_database() as (engine, Session):
+            db = Session()
+            seed_portfolio(db, args.clients * per_client, installments_per_loan=args.installments,
+                           loans_per_client=per_client)
+            summaries.rebuild(db)
+            client_id = db.query(database.Client.id).order_by(database.Client.id).limit(1).scalar()
+
+            with count_statements(engine) as legacy_counter:
+                legacy = legacy_overview(db, alert_system, client_id)
+            legacy_ms = time_call(lambda: legacy_overview(db, alert_system, client_id))
+
+            # Before the scoring job has run every loan is scored from its summary
+            db.expire_all()
+            with count_statements(engine) as live_counter:
+                result = overview.client_overview(db, client_id, alert_system)
+            live_ms = time_call(lambda: (db.expire_all(), overview.client_overview(db, client_id, alert_system)))
+
+            default_risk.score_portfolio(db, alert_system)
+            db.expire_all()
+            with count_statements(engine) as scored_counter:
+                overview.client_overview(db, client_id, alert_system)
+            scored_ms = time_call(lambda: (db.expire_all(), overview.client_overview(db, client_id, alert_system)))
+
+            for item in result["loans"]:
+                total, paid, probability = legacy[item["loan"].id]
+                ours = item["installments"]
+                if (ours["total"], ours["paid"]) != (total, paid) or abs(item["risk"]["default_probability"] - probability) > 0.01:
+                    mismatches += 1
+
+            statement_counts.update((live_counter["statements"], scored_counter["statements"]))
+            print(f"{len(legacy):6d} {legacy_ms:10.2f} {legacy_counter['statements']:13d} {live_ms:12.2f}"
+                  f" {live_counter['statements']:15d} {scored_ms:10.2f} {scored_counter['statements']:13d}")
+            db.close()
+
+    if len(statement_counts) != 1:
+        print(f"FAIL: overview statement count varies with the number of loans: {sorted(statement_counts)}")
+        return 1
+    if mismatches:
+        print(f"FAIL: {mismatches} loans differ from the per-loan calculation")
+        return 1
+    print(f"OK: {statement_counts.pop()} statements per overview and results match the per-loan path")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,103 @@
+"""
+Benchmark client search.
+
+Fills a temporary database with synthetic clients (the FTS5 triggers index
+them as they are inserted), then times search.search_clients for typical
+queries against both the FTS5 index and the LIKE fallback. Also checks that
+the index is in sync with the clients table.
+
+    python benchmarks/bench_client_search.py --clients 1000000
+"""
+import argparse
+import random
+import sys
+import time
+from datetime import datetime
+
+from sqlalchemy import insert
+
+from common import temp_database, time_call
+
+import database
+import search
+import seed_data
+
+CHUNK = 20000
+
+
+def insert_clients(session, n, seed):
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    samples = []
+    for start in range(1, n + 1, CHUNK):
+        rows = [seed_data._client(rng, client_id) for client_id in range(start, min(start + CHUNK, n + 1))]
+        for row in rows:
+            row.update(risk_score=50.0, risk_level="Medium", created_at=now)
+        session.execute(insert(database.Client), rows)
+        samples.append(rows[len(rows) // 2])
+    session.commit()
+    return samples
+
+
+def queries(sample):
+    first, last = sample["name"].split()[:2]
+    cnic_digits = sample["cnic"].replace("-", "")
+    phone_digits = "".join(ch for ch in sample["phone"] if ch.isdigit())
+    return [
+        ("full name", f"{first} {last}"),
+        ("name prefixes", f"{first[:3]} {last[:3]}"),
+        ("common surname", last),
+        ("CNIC as written", sample["cnic"]),
+        ("CNIC digits prefix", cnic_digits[:8]),
+        ("phone digits", phone_digits[-10:]),
+        ("address word", sample["address"].split()[-1]),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=100000)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    with temp_database() as (engine, Session):
+        session = Session()
+        if not search.ensure_index(session):
+            print("FTS5 is not available in this SQLite build")
+            return 1
+
+        started = time.perf_counter()
+        samples = insert_clients(session, args.clients, args.seed)
+        print(f"Inserted and indexed {args.clients} clients in {time.perf_counter() - started:.1f}s")
+
+        report = search.verify(session)
+        key = search._key(session)
+        print(f"{'query':<20} {'fts ms':>8} {'like ms':>9} {'hits':>5}  found")
+        failures = 0
+        for name, query in queries(samples[len(samples) // 2]):
+            search._fts_enabled[key] = True
+            hits = search.search_clients(session, query, args.limit)
+            fts_ms = time_call(lambda: search.search_clients(session, query, args.limit))
+            search._fts_enabled[key] = False
+            like_ms = time_call(lambda: search.search_clients(session, query, args.limit), repeat=1)
+            found = any(query.split()[0].lower() in " ".join((c.name, c.cnic, c.phone, c.address)).lower()
+                        or query in c.cnic.replace("-", "") or query in c.phone.replace("-", "")
+                        for c in hits)
+            failures += not found
+            print(f"{name:<20} {fts_ms:8.2f} {like_ms:9.1f} {len(hits):5d}  {'yes' if found else 'NO'}  ({query})")
+        search._fts_enabled[key] = True
+        session.close()
+
+    if not report["ok"]:
+        print(f"FAIL: index out of sync: {report}")
+        return 1
+    if failures:
+        print(f"FAIL: {failures} queries did not find the client they were built from")
+        return 1
+    print("OK: index in sync and every query found its client")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,96 @@
+"""
+Concurrent read/write load test for the database engine configuration.
+
+Runs reader and writer threads against the same SQLite file for a fixed
+time. It runs once with the original engine (rollback journal, default
+pool, no pragmas) and once with database.create_db_engine (WAL, pool
+sizing, busy_timeout, cache/mmap pragmas). For each run it reports
+operations per second and "database is locked" failures.
+
+    python benchmarks/bench_concurrency.py --readers 8 --writers 4 --seconds 10
+"""
+import argparse
+import random
+import threading
+import time
+
+from common import temp_database, seed_portfolio
+
+from sqlalchemy import func, update
+from sqlalchemy.exc import OperationalError
+
+import database
+
+
+def reader(Session, loan_ids, stop, stats, seed):
+    rng = random.Random(seed)
+    while not stop.is_set():
+        db = Session()
+        try:
+            loan_id = rng.choice(loan_ids)
+            db.query(database.Installment).filter(database.Installment.loan_id == loan_id).all()
+            db.query(func.count(database.Loan.id)).filter(database.Loan.status == "Active").scalar()
+            stats["reads"] += 1
+        except OperationalError:
+            stats["read_errors"] += 1
+        finally:
+            db.close()
+
+
+def writer(Session, installment_ids, stop, stats, seed):
+    rng = random.Random(seed)
+    while not stop.is_set():
+        db = Session()
+        try:
+            db.execute(
+                update(database.Installment)
+                .where(database.Installment.id == rng.choice(installment_ids))
+                .values(paid=True)
+            )
+            db.commit()
+            stats["writes"] += 1
+        except OperationalError:
+            db.rollback()
+            stats["write_errors"] += 1
+        finally:
+            db.close()
+
+
+def run(tune_sqlite, args):
+    with temp_database(tune_sqlite=tune_sqlite) as (engine, Session):
+        db = Session()
+        seed_portfolio(db, args.loans)
+        loan_ids = [row.id for row in db.query(database.Loan.id).all()]
+        installment_ids = [row.id for row in db.query(database.Installment.id).all()]
+        db.close()
+
+        stats = {"reads": 0, "writes": 0, "read_errors": 0, "write_errors": 0}
+        stop = threading.Event()
+        threads = [threading.Thread(target=reader, args=(Session, loan_ids, stop, stats, i)) for i in range(args.readers)]
+        threads += [threading.Thread(target=writer, args=(Session, installment_ids, stop, stats, 100 + i)) for i in range(args.writers)]
+        for thread in threads:
+            thread.start()
+        time.sleep(args.seconds)
+        stop.set()
+        for thread in threads:
+            thread.join()
+        return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--loans", type=int, default=2000)
+    args = parser.parse_args()
+
+    print(f"{args.readers} readers, {args.writers} writers, {args.seconds}s, {args.loans} loans")
+    for label, tune_sqlite in (("before (default engine)", False), ("after (create_db_engine)", True)):
+        stats = run(tune_sqlite, args)
+        print(f"{label:>25}: {stats['reads'] / args.seconds:8.0f} reads/s {stats['writes'] / args.seconds:8.0f} writes/s"
+              f"  locked errors: {stats['read_errors'] + stats['write_errors']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Benchmark /api/dashboard/stats as the loan book grows.
+
+Compares the original per-loan implementation (one installments query per
+loan), the grouped aggregates that replaced it and the materialized rollups
+read by summaries.dashboard_stats. Both earlier versions are kept here only
+as baselines.
+
+    python benchmarks/bench_dashboard.py --sizes 100 1000 10000
+"""
+import argparse
+from datetime import datetime
+
+from sqlalchemy import and_, case, func
+
+from common import temp_database, seed_portfolio, count_statements, time_call
+
+import analytics
+import database
+import summaries
+
+
+def legacy_dashboard_stats(db):
+    """Previous implementation, kept here only as a baseline"""
+    total_clients = db.query(database.Client).count()
+    for level in ("Low", "Medium", "High"):
+        db.query(database.Client).filter(database.Client.risk_level == level).count()
+    db.query(database.Loan).count()
+    for loan_status in ("Active", "Completed", "Defaulted"):
+        db.query(database.Loan).filter(database.Loan.status == loan_status).count()
+
+    loans = db.query(database.Loan).all()
+    total_expected = 0
+    total_collected = 0
+    for loan in loans:
+        installments = db.query(database.Installment).filter(database.Installment.loan_id == loan.id).all()
+        total_expected += sum(inst.amount for inst in installments)
+        total_collected += sum(inst.amount for inst in installments if inst.paid)
+    return total_clients, total_expected, total_collected
+
+
+def aggregate_dashboard_stats(db, year):
+    """
+    Grouped-aggregate implementation used before the rollups, kept here only
+    as a baseline. It predates the payments ledger, so "collected" counts
+    fully paid installments only.
+    """
+    Loan = database.Loan
+    Installment = database.Installment
+    year_start, year_end = datetime(year, 1, 1), datetime(year + 1, 1, 1)
+    started_this_year = and_(Loan.start_date >= year_start, Loan.start_date < year_end)
+
+    loan_row = db.query(
+        func.count(Loan.id),
+        func.coalesce(func.sum(case((Loan.status == "Active", 1), else_=0)), 0),
+        func.coalesce(func.sum(case((Loan.status == "Completed", 1), else_=0)), 0),
+        func.coalesce(func.sum(case((Loan.status == "Defaulted", 1), else_=0)), 0),
+        func.coalesce(func.sum(Loan.loan_amount), 0),
+        func.coalesce(func.sum(case((started_this_year, Loan.loan_amount), else_=0)), 0),
+    ).one()
+    loans = dict(zip(("total", "active", "completed", "defaulted", "disbursed", "yearly_disbursed"), loan_row))
+
+    due_this_year = and_(Installment.due_date >= year_start, Installment.due_date < year_end)
+    paid_this_year = and_(Installment.paid == True, Installment.paid_date >= year_start, Installment.paid_date < year_end)
+    overdue = and_(Installment.is_overdue == True, Installment.paid == False)
+    installment_row = db.query(
+        func.coalesce(func.sum(Installment.amount), 0),
+        func.coalesce(func.sum(case((Installment.paid == True, Installment.amount), else_=0)), 0),
+        func.coalesce(func.sum(case((and_(started_this_year, due_this_year), Installment.amount), else_=0)), 0),
+        func.coalesce(func.sum(case((and_(started_this_year, paid_this_year), Installment.amount), else_=0)), 0),
+        func.coalesce(func.sum(case((overdue, 1), else_=0)), 0),
+    ).join(Loan, Loan.id == Installment.loan_id).one()
+    installments = dict(zip(("expected", "collected", "yearly_expected", "yearly_collected", "overdue_count"),
+                            installment_row))
+
+    loan_types = dict(db.query(Loan.loan_type, func.count(Loan.id)).group_by(Loan.loan_type).all())
+    return analytics.build_dashboard_payload(analytics.client_risk_counts(db), loans, installments, loan_types, year)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 5000, 20000])
+    parser.add_argument("--installments", type=int, default=12)
+    parser.add_argument("--skip-legacy-above", type=int, default=5000,
+                        help="skip the legacy baseline for books larger than this")
+    args = parser.parse_args()
+
+    print(f"{'loans':>8} {'legacy ms':>10} {'legacy stmts':>13} {'aggregate ms':>13} {'aggregate stmts':>16}"
+          f" {'rollup ms':>10} {'rollup stmts':>13}")
+    for size in args.sizes:
+        with temp_database() as (engine, Session):
+            db = Session()
+            seed_portfolio(db, size, installments_per_loan=args.installments)
+            year = datetime.utcnow().year
+
+            with count_statements(engine) as aggregate_counter:
+                aggregate_dashboard_stats(db, year)
+            aggregate_ms = time_call(lambda: aggregate_dashboard_stats(db, year))
+
+            summaries.rebuild(db)
+            with count_statements(engine) as rollup_counter:
+                summaries.dashboard_stats(db, year)
+            rollup_ms = time_call(lambda: summaries.dashboard_stats(db, year))
+
+            if size <= args.skip_legacy_above:
+                with count_statements(engine) as legacy_counter:
+                    legacy_dashboard_stats(db)
+                legacy_ms = f"{time_call(lambda: legacy_dashboard_stats(db), repeat=1):10.1f}"
+                legacy_stmts = f"{legacy_counter['statements']:13d}"
+            else:
+                legacy_ms, legacy_stmts = f"{'-':>10}", f"{'-':>13}"
+
+            print(f"{size:8d} {legacy_ms} {legacy_stmts} {aggregate_ms:13.1f} {aggregate_counter['statements']:16d}"
+                  f" {rollup_ms:10.1f} {rollup_counter['statements']:13d}")
+            db.close()
+
+
+if __name__ == "__main__":
+    main()
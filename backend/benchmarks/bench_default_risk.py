@@ -0,0 +1,86 @@
+"""
+Portfolio default-risk scoring: timing and equivalence.
+
+Seeds a throwaway database, runs default_risk.score_portfolio over every
+active loan and checks a sample of the stored scores against the per-loan
+path used by /api/loans/{id}/alerts (check_default_risk and
+calculate_default_probability over the loan's installment dicts).
+
+    python benchmarks/bench_default_risk.py --loans 100000
+"""
+import argparse
+import json
+import random
+import sys
+import time
+
+from common import seed_portfolio, temp_database
+
+import ai_models
+import database
+import default_risk
+
+
+def legacy_score(session, alert_system, loan):
+    """The on-demand calculation from get_loan_alerts"""
+    installments = session.query(database.Installment).filter(database.Installment.loan_id == loan.id).all()
+    installments_data = [
+        {'paid': inst.paid, 'is_overdue': inst.is_overdue, 'due_date': inst.due_date.isoformat()}
+        for inst in installments
+    ]
+    loan_data = {'status': loan.status, 'loan_amount': loan.loan_amount}
+    overdue_count = sum(1 for inst in installments if inst.is_overdue and not inst.paid)
+    alerts = alert_system.check_default_risk(loan_data, installments_data)
+    probability = alert_system.calculate_default_probability(loan_data, loan.client.risk_score or 50, overdue_count)
+    return probability, alerts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--loans", type=int, default=100000)
+    parser.add_argument("--sample", type=int, default=500, help="loans checked against the per-loan path")
+    args = parser.parse_args()
+
+    alert_system = ai_models.DefaultAlertSystem()
+    with temp_database() as (engine, Session):
+        session = Session()
+        started = time.perf_counter()
+        seed_portfolio(session, args.loans)
+        print(f"Seeded {args.loans} loans in {time.perf_counter() - started:.1f}s")
+
+        result = default_risk.score_portfolio(session, alert_system)
+        print(f"score_portfolio: {result['loans_scored']} active loans in {result['duration_ms'] / 1000:.2f}s")
+
+        stored = {score.loan_id: score for score in session.query(database.LoanRiskScore).all()}
+        active_ids = [loan_id for (loan_id,) in session.query(database.Loan.id).filter(database.Loan.status == "Active")]
+        if set(stored) != set(active_ids):
+            print("MISMATCH: scored loans differ from active loans")
+            return 1
+
+        sample = random.Random(7).sample(active_ids, min(args.sample, len(active_ids)))
+        started = time.perf_counter()
+        mismatches = 0
+        for loan_id in sample:
+            loan = session.get(database.Loan, loan_id)
+            probability, alerts = legacy_score(session, alert_system, loan)
+            score = stored[loan_id]
+            if probability != score.default_probability or alerts != json.loads(score.alerts or "[]"):
+                mismatches += 1
+                print(f"  loan {loan_id}: per-loan ({probability}, {alerts}) != stored ({score.default_probability}, {score.alerts})")
+        per_loan_ms = (time.perf_counter() - started) * 1000 / max(1, len(sample))
+        print(f"Per-loan path: {per_loan_ms:.2f} ms/loan, ~{per_loan_ms * len(active_ids) / 1000:.0f}s for the whole book")
+
+        started = time.perf_counter()
+        loans, next_position = default_risk.riskiest_loans(session, limit=100)
+        print(f"Riskiest page of {len(loans)}: {(time.perf_counter() - started) * 1000:.1f} ms")
+        session.close()
+
+    if mismatches:
+        print(f"{mismatches}/{len(sample)} sampled loans differ")
+        return 1
+    print(f"All {len(sample)} sampled loans match")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,94 @@
+"""
+Memory check for the streaming installment export.
+
+Builds a throwaway database with `--rows` installments (5M by default),
+streams the whole export through exports.stream_installments and samples
+the process's anonymous RSS while doing so. Exits 1 if the export grows
+anonymous memory by more than `--max-growth-mb` or loses rows.
+
+Anonymous RSS is used because SQLite's memory-mapped pages are file backed
+and would otherwise show up as (reclaimable) RSS.
+
+    python benchmarks/bench_export_memory.py --rows 5000000 --format csv
+"""
+import argparse
+import sys
+import time
+
+from sqlalchemy import text
+
+from common import seed_portfolio, temp_database
+
+import exports
+
+TEMPLATE_LOANS = 1000
+INSTALLMENTS_PER_LOAN = 12
+
+
+def anon_rss_mb():
+    with open("/proc/self/status") as status:
+        for line in status:
+            if line.startswith("RssAnon:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def grow_installments(session, target_rows):
+    """Copy the seeded schedules forward in time until there are `target_rows` installments"""
+    template = session.execute(text("SELECT COUNT(*) FROM installments")).scalar()
+    copies = -(-target_rows // template) - 1
+    session.execute(text("""
+        WITH RECURSIVE copies(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM copies WHERE n < :copies)
+        INSERT INTO installments (loan_id, installment_number, due_date, amount, paid, paid_date, is_overdue)
+        SELECT loan_id, installment_number + n * :per_loan, datetime(due_date, '+' || (n * 360) || ' days'),
+               amount, 0, NULL, 0
+        FROM installments, copies
+    """), {"copies": copies, "per_loan": INSTALLMENTS_PER_LOAN})
+    session.commit()
+    return session.execute(text("SELECT COUNT(*) FROM installments")).scalar()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=5_000_000)
+    parser.add_argument("--format", choices=sorted(exports.SUPPORTED_FORMATS), default="csv")
+    parser.add_argument("--batch-size", type=int, default=exports.DEFAULT_BATCH_SIZE)
+    parser.add_argument("--max-growth-mb", type=float, default=64)
+    args = parser.parse_args()
+
+    with temp_database() as (engine, Session):
+        session = Session()
+        seed_portfolio(session, TEMPLATE_LOANS, installments_per_loan=INSTALLMENTS_PER_LOAN)
+        started = time.perf_counter()
+        total = grow_installments(session, args.rows)
+        session.close()
+        print(f"Built {total} installments in {time.perf_counter() - started:.1f}s")
+
+        baseline = peak = anon_rss_mb()
+        exported_bytes = 0
+        lines = 0
+        started = time.perf_counter()
+        for chunk in exports.stream_installments(args.format, session_factory=Session, batch_size=args.batch_size):
+            exported_bytes += len(chunk)
+            lines += chunk.count(b"\n")
+            peak = max(peak, anon_rss_mb())
+        elapsed = time.perf_counter() - started
+
+    rows = lines - 1 if args.format == "csv" else lines
+    growth = peak - baseline
+    print(f"Exported {rows} rows ({exported_bytes / 1e6:.0f} MB {args.format}) in {elapsed:.1f}s "
+          f"({rows / elapsed:,.0f} rows/s)")
+    print(f"Anonymous RSS: {baseline:.0f} MB before, {peak:.0f} MB peak (+{growth:.1f} MB)")
+
+    if rows != total:
+        print(f"FAIL: expected {total} rows")
+        return 1
+    if growth > args.max_growth_mb:
+        print(f"FAIL: memory grew by more than {args.max_growth_mb} MB")
+        return 1
+    print("OK: memory stayed bounded")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,93 @@
+"""
+Benchmark loan disbursement with schedule generation.
+
+Compares the previous per-installment ORM loop (one commit for the loan,
+one for its schedule) with POST /api/loans/bulk, which writes every loan
+and schedule in one transaction with a single bulk insert.
+
+    python benchmarks/bench_loan_schedules.py --loans 1000 --months 36
+"""
+import argparse
+import time
+from datetime import datetime, timedelta
+
+from common import temp_database, seed_portfolio, count_statements
+
+import database
+import main as api
+import summaries
+
+
+def legacy_create_loan(db, loan):
+    """Previous create_loan body, kept here only as a baseline"""
+    total_amount = loan.loan_amount + loan.loan_amount * (loan.interest_rate / 100) * (loan.duration_months / 12)
+    monthly_installment = total_amount / loan.duration_months
+    db_loan = database.Loan(
+        client_id=loan.client_id,
+        loan_amount=loan.loan_amount,
+        loan_type=loan.loan_type,
+        interest_rate=loan.interest_rate,
+        duration_months=loan.duration_months,
+        monthly_installment=round(monthly_installment, 2),
+        start_date=loan.start_date,
+        status="Active"
+    )
+    db.add(db_loan)
+    db.commit()
+    db.refresh(db_loan)
+    for i in range(loan.duration_months):
+        db.add(database.Installment(
+            loan_id=db_loan.id,
+            installment_number=i + 1,
+            due_date=loan.start_date + timedelta(days=30 * (i + 1)),
+            amount=round(monthly_installment, 2),
+            paid=False,
+            is_overdue=False
+        ))
+    db.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--loans", type=int, default=1000)
+    parser.add_argument("--months", type=int, default=36)
+    args = parser.parse_args()
+
+    requests = [
+        api.LoanCreate(
+            client_id=1 + i % 50,
+            loan_amount=50000 + 1000 * (i % 20),
+            loan_type="Business",
+            interest_rate=15.0,
+            duration_months=args.months,
+            start_date=datetime(2026, 1, 1),
+        )
+        for i in range(args.loans)
+    ]
+
+    results = {}
+    for name in ("legacy", "bulk"):
+        with temp_database() as (engine, Session):
+            db = Session()
+            seed_portfolio(db, 100, installments_per_loan=1)
+            summaries.rebuild(db)
+            with count_statements(engine) as counter:
+                started = time.perf_counter()
+                if name == "legacy":
+                    for loan in requests:
+                        legacy_create_loan(db, loan)
+                else:
+                    api.create_loans_bulk(requests, db=db, current_user=None)
+                elapsed = time.perf_counter() - started
+            installments = db.query(database.Installment).count() - 100
+            results[name] = (elapsed, counter["statements"], installments)
+            db.close()
+
+    print(f"{args.loans} loans x {args.months} installments")
+    for name, (elapsed, statements, installments) in results.items():
+        print(f"{name:>7}: {elapsed * 1000:9.1f} ms  {statements:7d} statements  {installments} installments")
+    print(f"speedup: {results['legacy'][0] / results['bulk'][0]:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
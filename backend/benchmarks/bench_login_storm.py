@@ -0,0 +1,133 @@
+"""
+Latency of ordinary endpoints while a burst of logins is in flight.
+
+Runs the app in-process over httpx's ASGI transport against a throwaway
+SQLite file. A set of "storm" workers logs in repeatedly while probe
+workers hit other endpoints; the probes' p50/p99 are reported for:
+
+    idle    no logins running
+    shared  bcrypt on the request threadpool (how /api/auth/login used to run)
+    pool    bcrypt on the dedicated passwords pool (current behaviour)
+
+    python benchmarks/bench_login_storm.py --storm 50 --seconds 10
+
+Requires httpx (pip install httpx).
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+fd, DB_PATH = tempfile.mkstemp(suffix=".db", prefix="sahulatfin-bench-")
+os.close(fd)
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+os.environ.pop("ASYNC_DATABASE_URL", None)
+os.environ.setdefault("OVERDUE_SWEEP_INTERVAL_SECONDS", "0")
+
+from common import seed_portfolio
+from load_test import percentile
+
+import anyio
+import httpx
+
+import database
+import main as api
+import passwords
+
+USERNAME = "hexenzirkle"
+PASSWORD = "24k-5541@Hexa"
+PROBE_ENDPOINTS = ["/api/clients/1", "/api/dashboard/stats", "/api/loans/?limit=50"]
+
+
+async def shared_threadpool_verify(plain_password, hashed_password):
+    """bcrypt on the same threadpool that serves sync endpoints"""
+    return await anyio.to_thread.run_sync(passwords._verify_and_update, plain_password, hashed_password)
+
+
+async def measure(client, storm_workers, seconds, probe_workers):
+    stop = asyncio.Event()
+    latencies = []
+    logins = 0
+
+    async def storm():
+        nonlocal logins
+        while not stop.is_set():
+            response = await client.post("/api/auth/login", json={"username": USERNAME, "password": PASSWORD})
+            response.raise_for_status()
+            logins += 1
+
+    async def probe(path):
+        while not stop.is_set():
+            started = time.perf_counter()
+            response = await client.get(path)
+            response.raise_for_status()
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    tasks = [asyncio.create_task(storm()) for _ in range(storm_workers)]
+    tasks += [
+        asyncio.create_task(probe(PROBE_ENDPOINTS[i % len(PROBE_ENDPOINTS)]))
+        for i in range(probe_workers)
+    ]
+    await asyncio.sleep(seconds)
+    stop.set()
+    await asyncio.gather(*tasks)
+    return {
+        "probes": len(latencies),
+        "logins": logins,
+        "p50_ms": percentile(latencies, 50),
+        "p99_ms": percentile(latencies, 99),
+    }
+
+
+async def run(args):
+    transport = httpx.ASGITransport(app=api.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        login = await client.post("/api/auth/login", json={"username": USERNAME, "password": PASSWORD})
+        login.raise_for_status()
+        client.headers["Authorization"] = f"Bearer {login.json()['access_token']}"
+
+        pooled_verify = passwords.verify_and_update
+        print(f"bcrypt rounds={passwords.BCRYPT_ROUNDS} workers={passwords.BCRYPT_WORKERS}, "
+              f"{args.storm} login workers, {args.probes} probe workers, {args.seconds}s each")
+        print(f"{'mode':<8} {'logins':>7} {'probes':>7} {'p50 ms':>9} {'p99 ms':>9}")
+        for mode, storm_workers, verify in (
+            ("idle", 0, pooled_verify),
+            ("shared", args.storm, shared_threadpool_verify),
+            ("pool", args.storm, pooled_verify),
+        ):
+            passwords.verify_and_update = verify
+            result = await measure(client, storm_workers, args.seconds, args.probes)
+            print(f"{mode:<8} {result['logins']:7d} {result['probes']:7d} {result['p50_ms']:9.1f} {result['p99_ms']:9.1f}")
+        passwords.verify_and_update = pooled_verify
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--storm", type=int, default=50, help="concurrent login workers")
+    parser.add_argument("--probes", type=int, default=6, help="concurrent probe workers")
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--loans", type=int, default=2000)
+    args = parser.parse_args()
+
+    try:
+        database.init_db()
+        session = database.SessionLocal()
+        try:
+            seed_portfolio(session, args.loans)
+        finally:
+            session.close()
+        api.startup_event()
+        asyncio.run(run(args))
+    finally:
+        api.shutdown_event()
+        database.engine.dispose()
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(DB_PATH + suffix):
+                os.remove(DB_PATH + suffix)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,74 @@
+"""
+Compare scalar RiskScorer.calculate_risk_score with RiskScorer.score_batch.
+
+Checks that both paths return identical scores and levels, then reports
+throughput for each.
+
+    python benchmarks/bench_risk_scoring.py --clients 100000
+"""
+import argparse
+import random
+import time
+
+import common  # noqa: F401  (puts the backend on sys.path)
+import numpy as np
+
+import ai_models
+
+
+def random_clients(n, seed=7):
+    rng = random.Random(seed)
+    return [
+        {
+            'monthly_income': rng.choice([0, 5000, 9999.99, 10000, 20000, 29999, 30000, 49999, 50000, 120000]),
+            'employment_status': rng.choice(["Employed", "Self-Employed", "Unemployed", "SELF-EMPLOYED", ""]),
+            'existing_loans': rng.randint(0, 5),
+            'credit_history': rng.choice(["Good", "Average", "Poor", "good"]),
+        }
+        for _ in range(n)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=100000)
+    args = parser.parse_args()
+
+    scorer = ai_models.RiskScorer()
+    clients = random_clients(args.clients)
+    rng = random.Random(11)
+    loan_amounts = [rng.choice([None, 0, 25000, 100000, 500000, 1000000]) for _ in clients]
+
+    columns = {
+        'monthly_income': np.array([c['monthly_income'] for c in clients], dtype=float),
+        'employment_status': np.array([c['employment_status'] for c in clients]),
+        'existing_loans': np.array([c['existing_loans'] for c in clients]),
+        'credit_history': np.array([c['credit_history'] for c in clients]),
+    }
+    amounts = np.array([a if a is not None else 0 for a in loan_amounts], dtype=float)
+
+    started = time.perf_counter()
+    scalar = [scorer.calculate_risk_score(c, a) for c, a in zip(clients, loan_amounts)]
+    scalar_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    scores, levels = scorer.score_batch(columns, amounts)
+    batch_s = time.perf_counter() - started
+
+    mismatches = sum(1 for expected, got in zip(scalar, zip(scores, levels)) if expected != got)
+    records_scores, records_levels = scorer.score_batch(clients)
+    mismatches += sum(
+        1 for c, got in zip(clients, zip(records_scores, records_levels))
+        if scorer.calculate_risk_score(c) != got
+    )
+
+    print(f"clients:      {args.clients}")
+    print(f"scalar:       {scalar_s * 1000:8.1f} ms  ({args.clients / scalar_s:,.0f} clients/s)")
+    print(f"batch:        {batch_s * 1000:8.1f} ms  ({args.clients / batch_s:,.0f} clients/s)")
+    print(f"speedup:      {scalar_s / batch_s:8.1f}x")
+    print(f"mismatches:   {mismatches}")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
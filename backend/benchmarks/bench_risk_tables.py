@@ -0,0 +1,367 @@
+"""
+Table-driven RiskScorer: equivalence with the if/elif scorer, and timing.
+
+Checks RiskScorer.calculate_risk_score, score_batch and suggest_loan_terms
+against a frozen copy of the rule-by-rule scorer they replaced, over random
+clients plus every band boundary (and the float on either side of it). Then
+times the legacy scorer, the compiled tables without memoization and the
+memoized scorer, and checks that editing the config file is picked up
+without a restart and that an invalid edit keeps the current rules.
+
+    python benchmarks/bench_risk_tables.py --clients 100000
+"""
+import argparse
+import json
+import math
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+import common  # noqa: F401  (puts the backend on sys.path)
+
+import ai_models
+import risk_config
+import schedules
+from ai_models import STRESS_TEST_RATE_DELTA
+
+
+class LegacyRiskScorer:
+    """The if/elif RiskScorer the scoring tables replaced, kept here only as the reference"""
+    
+    def __init__(self):
+        self.weights = {
+            'income': 0.25,
+            'employment': 0.20,
+            'existing_loans': 0.20,
+            'credit_history': 0.25,
+            'loan_to_income': 0.10
+        }
+    
+    def calculate_risk_score(self, client_data, loan_amount=None):
+        """
+        Calculate risk score (0-100) where higher score = higher risk
+        Returns: (risk_score, risk_level)
+        """
+        scores = []
+        
+        # 1. Income Score (inverse - higher income = lower risk)
+        income = client_data.get('monthly_income', 0)
+        if income >= 50000:
+            income_score = 10
+        elif income >= 30000:
+            income_score = 30
+        elif income >= 20000:
+            income_score = 50
+        elif income >= 10000:
+            income_score = 70
+        else:
+            income_score = 90
+        scores.append(income_score * self.weights['income'])
+        
+        # 2. Employment Status Score
+        employment = client_data.get('employment_status', '').lower()
+        if employment == 'employed':
+            employment_score = 20
+        elif employment == 'self-employed':
+            employment_score = 40
+        else:
+            employment_score = 80
+        scores.append(employment_score * self.weights['employment'])
+        
+        # 3. Existing Loans Score
+        existing_loans = client_data.get('existing_loans', 0)
+        if existing_loans == 0:
+            loans_score = 10
+        elif existing_loans == 1:
+            loans_score = 30
+        elif existing_loans == 2:
+            loans_score = 60
+        else:
+            loans_score = 90
+        scores.append(loans_score * self.weights['existing_loans'])
+        
+        # 4. Credit History Score
+        credit_history = client_data.get('credit_history', '').lower()
+        if credit_history == 'good':
+            credit_score = 15
+        elif credit_history == 'average':
+            credit_score = 50
+        else:
+            credit_score = 85
+        scores.append(credit_score * self.weights['credit_history'])
+        
+        # 5. Loan-to-Income Ratio (if loan amount provided)
+        if loan_amount and income > 0:
+            loan_to_income_ratio = loan_amount / income
+            if loan_to_income_ratio <= 5:
+                lti_score = 20
+            elif loan_to_income_ratio <= 10:
+                lti_score = 40
+            elif loan_to_income_ratio <= 20:
+                lti_score = 60
+            else:
+                lti_score = 90
+            scores.append(lti_score * self.weights['loan_to_income'])
+        else:
+            # Default score if no loan amount
+            scores.append(40 * self.weights['loan_to_income'])
+        
+        # Calculate final risk score
+        risk_score = sum(scores)
+        
+        # Determine risk level
+        if risk_score <= 30:
+            risk_level = "Low"
+        elif risk_score <= 60:
+            risk_level = "Medium"
+        else:
+            risk_level = "High"
+        
+        return round(risk_score, 2), risk_level
+    
+    def suggest_loan_terms(self, client_data, loan_amount, repayment_method=schedules.FLAT, grace_period_months=0):
+        """
+        AI-powered loan term suggestions based on risk profile
+        Returns recommended interest rate and duration
+        """
+        risk_score, risk_level = self.calculate_risk_score(client_data, loan_amount)
+        income = client_data.get('monthly_income', 0) or 0
+        existing_loans = client_data.get('existing_loans', 0) or 0
+        
+        # Base interest rates by risk level
+        if risk_level == "Low":
+            base_interest_rate = 12.0  # 12% annual
+            max_duration = 36  # 36 months
+        elif risk_level == "Medium":
+            base_interest_rate = 18.0  # 18% annual
+            max_duration = 24  # 24 months
+        else:
+            base_interest_rate = 24.0  # 24% annual
+            max_duration = 12  # 12 months
+        
+        # Adjust based on loan amount
+        if loan_amount > 500000:
+            base_interest_rate += 2
+        elif loan_amount < 50000:
+            base_interest_rate -= 1
+        
+        # Recommended duration based on loan amount
+        if loan_amount <= 50000:
+            recommended_duration = min(12, max_duration)
+        elif loan_amount <= 200000:
+            recommended_duration = min(18, max_duration)
+        else:
+            recommended_duration = max_duration
+        
+        schedules.validate_terms(recommended_duration, repayment_method, grace_period_months)
+        stress_test_interest = base_interest_rate + STRESS_TEST_RATE_DELTA
+        # Recommended and stressed terms priced together
+        priced = schedules.price_batch(
+            loan_amount, [base_interest_rate, stress_test_interest], recommended_duration,
+            repayment_method, grace_period_months,
+        )
+        monthly_installment, stress_test_installment = (float(value) for value in priced["installment"])
+
+        loan_to_income_ratio = (loan_amount / income) if income else None
+        debt_service_ratio = ((monthly_installment / income) * 100) if income else None
+        max_safe_amount = income * 15 if income else loan_amount
+
+        insights = []
+        if debt_service_ratio and debt_service_ratio > 35:
+            insights.append("Installments exceed 35% of monthly income. Consider lowering loan amount.")
+        if loan_to_income_ratio and loan_to_income_ratio > 12:
+            insights.append("Loan-to-income ratio is higher than typical microfinance thresholds.")
+        if existing_loans >= 2:
+            insights.append("Client already services multiple loans. Verify repayment discipline.")
+        if not insights:
+            insights.append("Risk level is under control. Proceed with standard monitoring cadence.")
+
+        return {
+            "recommended_interest_rate": round(base_interest_rate, 2),
+            "recommended_duration_months": recommended_duration,
+            "recommended_monthly_installment": round(monthly_installment, 2),
+            "repayment_method": repayment_method,
+            "grace_period_months": grace_period_months,
+            "total_payable": round(float(priced["total_payable"][0]), 2),
+            "risk_level": risk_level,
+            "risk_score": risk_score,
+            "loan_to_income_ratio": round(loan_to_income_ratio, 2) if loan_to_income_ratio else None,
+            "debt_service_ratio": round(debt_service_ratio, 2) if debt_service_ratio else None,
+            "max_suggested_loan": round(max_safe_amount, 2),
+            "stress_test": {
+                "interest_rate": round(stress_test_interest, 2),
+                "monthly_installment": round(stress_test_installment, 2)
+            },
+            "approval_recommendation": "Approve" if risk_level in ["Low", "Medium"] else "Review Required",
+            "insights": insights
+        }
+
+
+def _around(value):
+    return [math.nextafter(value, -math.inf), value, math.nextafter(value, math.inf)]
+
+
+def boundary_clients():
+    """Every band edge of the default config, the floats either side of it and odd values"""
+    incomes = [0, -1, 1, 9999.99, 120000, float("nan")]
+    for edge in (10000, 20000, 30000, 50000):
+        incomes += _around(float(edge)) + [edge]
+    clients = [
+        {'monthly_income': income, 'employment_status': employment, 'existing_loans': loans, 'credit_history': credit}
+        for income in incomes
+        for employment in ("Employed", "SELF-EMPLOYED", "self-employed", "Unemployed", "")
+        for loans in (0, 1, 2, 3, 1.5, True)
+        for credit in ("Good", "average", "Poor", "")
+    ]
+    amounts = [None, 0, 1, 25000, 49999.99, 50000, 50001, 200000, 200000.01, 500000, 500000.01, 1000000]
+    for ratio in (5, 10, 20):
+        amounts += [ratio * 20000 + delta for delta in (-0.01, 0, 0.01)]
+    return clients, amounts
+
+
+def random_clients(n, seed):
+    rng = random.Random(seed)
+    clients = [
+        {
+            'monthly_income': rng.choice([0, 5000, 9999.99, 10000, 20000, 29999, 30000, 49999, 50000, 120000,
+                                          round(rng.uniform(1000, 200000), 2)]),
+            'employment_status': rng.choice(["Employed", "Self-Employed", "Unemployed", "SELF-EMPLOYED", ""]),
+            'existing_loans': rng.randint(0, 5),
+            'credit_history': rng.choice(["Good", "Average", "Poor", "good"]),
+        }
+        for _ in range(n)
+    ]
+    amounts = [rng.choice([None, 0, 25000, 50000, 100000, 200000, 500000, 1000000, round(rng.uniform(1000, 900000), 2)])
+               for _ in clients]
+    return clients, amounts
+
+
+def same(expected, got):
+    if isinstance(expected, float) and math.isnan(expected):
+        return isinstance(got, float) and math.isnan(got)
+    return expected == got and type(expected) is type(got)
+
+
+def check_equivalence(legacy, scorer, clients, amounts):
+    mismatches = []
+    for client in clients:
+        for amount in amounts:
+            expected, got = legacy.calculate_risk_score(client, amount), scorer.calculate_risk_score(client, amount)
+            if not all(same(e, g) for e, g in zip(expected, got)):
+                mismatches.append(("score", client, amount, expected, got))
+
+    columns = {key: [client[key] for client in clients] for key in clients[0]}
+    batch_amounts = [0 if amount is None else amount for amount in amounts]
+    for amount in batch_amounts + [None]:
+        scores, levels = scorer.score_batch(columns, amount)
+        for client, score, level in zip(clients, scores, levels):
+            expected = legacy.calculate_risk_score(client, amount)
+            if (score, level) != expected:
+                mismatches.append(("batch", client, amount, expected, (score, level)))
+
+    for client in clients:
+        if client['monthly_income'] != client['monthly_income'] or isinstance(client['existing_loans'], bool):
+            continue
+        for amount in amounts:
+            if not amount:
+                continue
+            expected, got = legacy.suggest_loan_terms(client, amount), scorer.suggest_loan_terms(client, amount)
+            if expected != got:
+                mismatches.append(("suggest", client, amount, expected, got))
+    return mismatches
+
+
+def check_reload(config_path):
+    """Edit a copy of the config and check the scorer picks it up, and keeps it when the edit is invalid"""
+    directory = tempfile.mkdtemp(prefix="sahulatfin-risk-")
+    path = os.path.join(directory, "risk_scoring.json")
+    shutil.copy(config_path, path)
+    try:
+        scorer = ai_models.RiskScorer(path, reload_seconds=0)
+        client = {'monthly_income': 25000, 'employment_status': 'Employed', 'existing_loans': 1, 'credit_history': 'Good'}
+        before = scorer.calculate_risk_score(client)
+
+        with open(path) as f:
+            config = json.load(f)
+        config["income"]["otherwise"] = 100
+        config["income"]["bands"] = [[">=", 20000, 100]]
+        with open(path, "w") as f:
+            json.dump(config, f)
+        os.utime(path, ns=(time.time_ns(), time.time_ns() + 1000))
+        edited = scorer.calculate_risk_score(client)
+
+        with open(path, "w") as f:
+            f.write("{not json")
+        os.utime(path, ns=(time.time_ns(), time.time_ns() + 2000))
+        kept = scorer.calculate_risk_score(client)
+        return [
+            ("edited config is used", edited[0] == round(before[0] + (100 - 50) * 0.25, 2)),
+            ("invalid config keeps the last good rules", kept == edited),
+        ]
+    finally:
+        shutil.rmtree(directory)
+
+
+def timed(fn, repeat=3):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=100000)
+    parser.add_argument("--distinct", type=int, default=2000,
+                        help="distinct client/amount pairs in the timing workload (repeats hit the memo)")
+    args = parser.parse_args()
+
+    legacy = LegacyRiskScorer()
+    scorer = ai_models.RiskScorer(reload_seconds=3600)
+
+    clients, amounts = boundary_clients()
+    mismatches = check_equivalence(legacy, scorer, clients, amounts)
+    random_set, random_amounts = random_clients(2000, seed=3)
+    mismatches += check_equivalence(legacy, scorer, random_set, random_amounts[:12])
+    for kind, client, amount, expected, got in mismatches[:10]:
+        print(f"MISMATCH {kind}: {client} amount={amount}: expected {expected}, got {got}")
+    print(f"equivalence:  {len(clients) * len(amounts) + len(random_set) * 12} scores checked, {len(mismatches)} mismatches")
+
+    reload_checks = check_reload(scorer.config_path)
+    for name, ok in reload_checks:
+        print(f"reload:       {name}: {'ok' if ok else 'FAIL'}")
+
+    distinct, distinct_amounts = random_clients(args.distinct, seed=5)
+    rng = random.Random(9)
+    workload = [(distinct[i], distinct_amounts[i]) for i in (rng.randrange(args.distinct) for _ in range(args.clients))]
+    tables = risk_config.load(scorer.config_path)
+    features = [(c['monthly_income'], c['employment_status'], c['existing_loans'], c['credit_history'], a)
+                for c, a in workload]
+
+    legacy_s = timed(lambda: [legacy.calculate_risk_score(c, a) for c, a in workload])
+    tables_s = timed(lambda: [tables.score(*f) for f in features])
+    memo_s = timed(lambda: [scorer.calculate_risk_score(c, a) for c, a in workload])
+    suggest_workload = [(c, a) for c, a in workload[:args.clients // 10] if a]
+    legacy_suggest_s = timed(lambda: [legacy.suggest_loan_terms(c, a) for c, a in suggest_workload], repeat=1)
+    suggest_s = timed(lambda: [scorer.suggest_loan_terms(c, a) for c, a in suggest_workload], repeat=1)
+
+    n = len(workload)
+    print(f"calls:        {n} scores over {args.distinct} distinct clients, {len(suggest_workload)} suggestions")
+    print(f"legacy:       {legacy_s / n * 1e6:6.2f} us/score   {legacy_suggest_s / len(suggest_workload) * 1e6:7.1f} us/suggestion")
+    print(f"tables:       {tables_s / n * 1e6:6.2f} us/score")
+    print(f"memoized:     {memo_s / n * 1e6:6.2f} us/score   {suggest_s / len(suggest_workload) * 1e6:7.1f} us/suggestion")
+    print(f"cache:        {scorer.status()['score_cache']}")
+
+    failed = bool(mismatches) or not all(ok for _, ok in reload_checks)
+    print("FAIL" if failed else "OK: identical to the legacy scorer and hot reload works")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,112 @@
+"""
+API ordering check.
+
+check_query_plans.py only looks for full table scans, so it cannot see an
+index change that reorders rows a query never sorted. This generates a
+small synthetic portfolio (seed_data.generate_portfolio) in a throwaway
+SQLite file, sweeps overdue installments so schedules mix paid, overdue
+and upcoming rows, then calls GET /api/loans/{id}/installments in-process
+over httpx's ASGI transport. Exits 1 if any schedule is not in
+installment_number order.
+
+    python benchmarks/check_api_order.py
+    python benchmarks/check_api_order.py --loans 200
+
+Requires httpx (pip install httpx).
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+from datetime import datetime
+
+fd, DB_PATH = tempfile.mkstemp(suffix=".db", prefix="sahulatfin-check-")
+os.close(fd)
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+os.environ.pop("ASYNC_DATABASE_URL", None)
+os.environ["OVERDUE_SWEEP_INTERVAL_SECONDS"] = "0"
+os.environ["DEFAULT_RISK_INTERVAL_SECONDS"] = "0"
+
+import common  # noqa: F401  (puts the backend on sys.path)
+
+import httpx
+
+import database
+import ledger
+import main as api
+import overdue
+import seed_data
+
+USERNAME = "hexenzirkle"
+PASSWORD = "24k-5541@Hexa"
+NOW = datetime(2026, 1, 1)
+
+
+async def check_schedules(loan_ids):
+    """(loans checked, loans whose schedule mixes paid and unpaid rows, out-of-order loan ids)"""
+    transport = httpx.ASGITransport(app=api.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://check", timeout=600) as client:
+        login = await client.post("/api/auth/login", json={"username": USERNAME, "password": PASSWORD})
+        login.raise_for_status()
+        client.headers["Authorization"] = f"Bearer {login.json()['access_token']}"
+
+        mixed, out_of_order = 0, []
+        for loan_id in loan_ids:
+            response = await client.get(f"/api/loans/{loan_id}/installments")
+            response.raise_for_status()
+            installments = response.json()
+            numbers = [inst["installment_number"] for inst in installments]
+            if numbers != sorted(numbers):
+                out_of_order.append(loan_id)
+            mixed += len({inst["paid"] for inst in installments}) > 1
+        return len(loan_ids), mixed, out_of_order
+
+
+def run(args):
+    database.init_db()
+    session = database.SessionLocal()
+    try:
+        seed_data.generate_portfolio(session, args.installments, seed=args.seed, now=NOW)
+        ledger.backfill(session, now=NOW)
+        session.commit()
+        overdue.sweep(session, now=NOW)
+        loan_ids = [loan_id for (loan_id,) in
+                    session.query(database.Loan.id).order_by(database.Loan.id).limit(args.loans)]
+    finally:
+        session.close()
+    api.startup_event()
+    try:
+        return asyncio.run(check_schedules(loan_ids))
+    finally:
+        api.shutdown_event()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--installments", type=int, default=5000)
+    parser.add_argument("--loans", type=int, default=100, help="schedules to request")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    try:
+        checked, mixed, out_of_order = run(args)
+    finally:
+        database.engine.dispose()
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(DB_PATH + suffix):
+                os.remove(DB_PATH + suffix)
+
+    print(f"Checked {checked} schedules, {mixed} with both paid and unpaid installments")
+    if not mixed:
+        print("FAIL: no schedule mixes paid and unpaid installments, so the check proves nothing")
+        return 1
+    if out_of_order:
+        print(f"FAIL: {len(out_of_order)} schedules not in installment order, e.g. loan {out_of_order[0]}")
+        return 1
+    print("OK: every schedule is in installment_number order")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
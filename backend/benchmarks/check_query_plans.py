@@ -0,0 +1,128 @@
+"""
+Query-plan regression check.
+
+Builds a throwaway database with the current models' indexes, runs ANALYZE
+(as database.migrate_indexes does after adding indexes), then asks SQLite
+for the EXPLAIN QUERY PLAN of each hot query. Exits 1 if any of them reads
+a whole table ("SCAN <table>") instead of searching an index, so a dropped
+index or a query rewrite that defeats one is caught before it ships.
+
+    python benchmarks/check_query_plans.py
+    python benchmarks/check_query_plans.py --verbose   # print every plan
+"""
+import argparse
+import re
+import sys
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, select, text, update
+
+from common import seed_portfolio, temp_database
+
+import analytics
+import cashflow
+import database
+import default_risk
+import exports
+import listings
+import overdue
+import overview
+import summaries
+
+# "SCAN loans" is a full table scan; "SCAN loans USING INDEX ..." walks an index
+# in order and "SEARCH" seeks into one. Subqueries and CTEs show up as SCAN of
+# their alias, which is not a table.
+SCAN = re.compile(r"^SCAN (\w+)$")
+
+
+def hot_queries(session, now):
+    """(name, statement) for every query on a request or job hot path"""
+    Installment = database.Installment
+    Loan = database.Loan
+    month_start = datetime(now.year, now.month, 1)
+    year_start, year_end = datetime(now.year, 1, 1), datetime(now.year + 1, 1, 1)
+
+    return [
+        ("overdue sweep", update(Installment).where(*overdue._newly_overdue(now)).values(is_overdue=True)),
+        ("cash-flow projection", cashflow.projection_query(
+            "month", month_start, month_start + timedelta(days=180), None, "sqlite")),
+        ("cash-flow projection by risk level", cashflow.projection_query(
+            "week", month_start, month_start + timedelta(days=180), "risk_level", "sqlite")),
+        ("overdue alerts page", analytics.overdue_alerts_query(limit=100)),
+        ("overdue alerts for high-risk clients", analytics.overdue_alerts_query(risk_level="High", limit=100)),
+        ("overdue alert count", select(func.count()).select_from(analytics.overdue_alerts_query().subquery())),
+        ("loan schedule", select(Installment).where(Installment.loan_id == 42)
+            .order_by(Installment.installment_number)),
+        ("loan completion check", select(
+            select(Installment.id).where(Installment.loan_id == 42, Installment.paid == False).exists()
+        )),
+        ("loan summary refresh", summaries._loan_rows_query(session).filter(Loan.id.in_([1, 2, 3])).statement),
+        ("client listing by risk level", listings.clients_query(risk_level="High")),
+        ("loan listing by status", listings.loans_query(status="Defaulted", after_id=100, with_client_name=True)),
+        ("client's loans", listings.loans_query(client_id=7)),
+        ("active loans started this year", select(Loan.id, Loan.loan_amount).where(
+            Loan.status == "Active", Loan.start_date >= year_start, Loan.start_date < year_end)),
+        ("riskiest loans page", default_risk.riskiest_query(limit=100)),
+        ("riskiest loans next page", default_risk.riskiest_query(after_probability=55.0, after_loan_id=900, limit=100)),
+        ("installment export for a due window", exports.installments_query(
+            due_from=month_start, due_to=month_start + timedelta(days=31))),
+        ("installment export for one loan", exports.installments_query(loan_id=42)),
+        ("loan payment history", select(database.Payment).where(database.Payment.loan_id == 42)
+            .order_by(database.Payment.paid_at)),
+        ("payments detached before a schedule change", update(database.Payment).where(
+            database.Payment.loan_id == 42).values(installment_id=None)),
+        ("latest installments for loan alerts", select(Installment.paid).where(Installment.loan_id == 42)
+            .order_by(Installment.due_date.desc()).limit(3)),
+        ("client overview installment stats", overview.installment_stats_query([42, 43, 44])),
+    ]
+
+
+def explain(conn, stmt):
+    compiled = stmt.compile(dialect=conn.dialect, compile_kwargs={"literal_binds": True})
+    return [row[-1] for row in conn.execute(text(f"EXPLAIN QUERY PLAN {compiled}"))]
+
+
+def full_scans(plan, tables):
+    scans = []
+    for detail in plan:
+        match = SCAN.match(detail.strip())
+        # Aliased tables compile as e.g. installments_1
+        if match and re.sub(r"_\d+$", "", match.group(1)) in tables:
+            scans.append(detail.strip())
+    return scans
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--loans", type=int, default=5000)
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    tables = set(database.Base.metadata.tables)
+    now = datetime.utcnow()
+    failures = 0
+    with temp_database() as (engine, Session):
+        session = Session()
+        seed_portfolio(session, args.loans)
+        summaries.rebuild(session)
+        with engine.connect() as conn:
+            conn.execute(text("ANALYZE"))
+            for name, stmt in hot_queries(session, now):
+                plan = explain(conn, stmt)
+                scans = full_scans(plan, tables)
+                print(f"{'FAIL' if scans else 'ok  '}  {name}" + (f": {'; '.join(scans)}" if scans else ""))
+                if args.verbose or scans:
+                    for detail in plan:
+                        print(f"        {detail}")
+                failures += bool(scans)
+        session.close()
+
+    if failures:
+        print(f"\n{failures} hot queries fall back to a full table scan")
+        return 1
+    print("\nAll hot queries use an index")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
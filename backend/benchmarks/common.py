@@ -0,0 +1,139 @@
+"""
+Shared helpers for the benchmark scripts.
+
+Benchmarks run against a throwaway SQLite file so the real
+mlms_database.db is never touched.
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from sqlalchemy import create_engine, event, insert
+from sqlalchemy.orm import sessionmaker
+
+import database
+import ledger
+
+LOAN_TYPES = ["Business", "Personal", "Agriculture", "Education"]
+EMPLOYMENT = ["Employed", "Self-Employed", "Unemployed"]
+CREDIT = ["Good", "Average", "Poor"]
+RISK_LEVELS = ["Low", "Medium", "High"]
+
+
+@contextmanager
+def temp_database(tune_sqlite=True):
+    """Yield (engine, SessionFactory) bound to a fresh temporary SQLite file"""
+    fd, path = tempfile.mkstemp(suffix=".db", prefix="sahulatfin-bench-")
+    os.close(fd)
+    if tune_sqlite:
+        engine = database.create_db_engine(f"sqlite:///{path}")
+    else:
+        # The engine configuration used before create_db_engine existed
+        engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+    database.Base.metadata.create_all(bind=engine)
+    try:
+        yield engine, sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    finally:
+        engine.dispose()
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+
+def seed_portfolio(session, n_loans, installments_per_loan=12, loans_per_client=2, seed=42):
+    """Bulk insert clients, loans and installments for benchmarking"""
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    n_clients = max(1, n_loans // loans_per_client)
+
+    first_client_id = (session.query(database.Client.id).order_by(database.Client.id.desc()).limit(1).scalar() or 0) + 1
+    first_loan_id = (session.query(database.Loan.id).order_by(database.Loan.id.desc()).limit(1).scalar() or 0) + 1
+
+    clients = []
+    for i in range(n_clients):
+        clients.append({
+            "id": first_client_id + i,
+            "name": f"Client {first_client_id + i}",
+            "cnic": f"{rng.randint(10000, 99999)}-{first_client_id + i:07d}-{rng.randint(1, 9)}",
+            "phone": f"+92-300-{rng.randint(1000000, 9999999)}",
+            "address": "Karachi",
+            "monthly_income": rng.choice([8000, 15000, 25000, 40000, 60000]),
+            "employment_status": rng.choice(EMPLOYMENT),
+            "existing_loans": rng.randint(0, 3),
+            "credit_history": rng.choice(CREDIT),
+            "risk_score": rng.uniform(10, 90),
+            "risk_level": rng.choice(RISK_LEVELS),
+            "created_at": now,
+        })
+    session.execute(insert(database.Client), clients)
+
+    loans = []
+    installments = []
+    for i in range(n_loans):
+        loan_id = first_loan_id + i
+        amount = rng.choice([25000, 50000, 100000, 250000])
+        start = now - timedelta(days=rng.randint(0, 720))
+        monthly = round(amount * 1.15 / installments_per_loan, 2)
+        loans.append({
+            "id": loan_id,
+            "client_id": first_client_id + (i % n_clients),
+            "loan_amount": amount,
+            "loan_type": rng.choice(LOAN_TYPES),
+            "interest_rate": 15.0,
+            "duration_months": installments_per_loan,
+            "monthly_installment": monthly,
+            "start_date": start,
+            "status": rng.choice(["Active", "Active", "Active", "Completed", "Defaulted"]),
+            "created_at": start,
+        })
+        for n in range(installments_per_loan):
+            due = start + timedelta(days=30 * (n + 1))
+            paid = due < now and rng.random() < 0.8
+            installments.append({
+                "loan_id": loan_id,
+                "installment_number": n + 1,
+                "due_date": due,
+                "amount": monthly,
+                "paid": paid,
+                "paid_date": due if paid else None,
+                "is_overdue": due < now and not paid,
+            })
+    session.execute(insert(database.Loan), loans)
+    session.execute(insert(database.Installment), installments)
+    # Ledger entries and balances for the installments generated as paid
+    ledger.backfill(session, now=now)
+    session.commit()
+
+
+@contextmanager
+def count_statements(engine):
+    """Count SQL statements executed on an engine inside the block"""
+    counter = {"statements": 0}
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        counter["statements"] += 1
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+def time_call(fn, repeat=5):
+    """Return the best wall-clock time in milliseconds over `repeat` runs"""
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        elapsed = (time.perf_counter() - started) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best
@@ -0,0 +1,95 @@
+"""
+HTTP load-test harness for the hot read endpoints.
+
+Logs in once, then keeps `--concurrency` requests in flight against each
+endpoint for `--requests` total requests and reports requests/sec and
+latency percentiles. Point it at a running server:
+
+    uvicorn main:app --workers 1 --port 8000
+    python benchmarks/load_test.py --url http://127.0.0.1:8000 --concurrency 200
+
+Requires httpx (pip install httpx).
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+DEFAULT_ENDPOINTS = [
+    "/api/dashboard/stats",
+    "/api/alerts/all?limit=100",
+    "/api/clients/?limit=100",
+    "/api/loans/?limit=100",
+    "/api/loans/1/installments",
+]
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def hammer(client, path, total, concurrency):
+    latencies = []
+    errors = 0
+    remaining = total
+
+    async def worker():
+        nonlocal remaining, errors
+        while remaining > 0:
+            remaining -= 1
+            started = time.perf_counter()
+            try:
+                response = await client.get(path)
+                if response.status_code >= 400:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return {
+        "path": path,
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": statistics.median(latencies) if latencies else 0.0,
+        "p99_ms": percentile(latencies, 99),
+    }
+
+
+async def run(args):
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=60) as client:
+        login = await client.post("/api/auth/login", json={"username": args.username, "password": args.password})
+        login.raise_for_status()
+        client.headers["Authorization"] = f"Bearer {login.json()['access_token']}"
+
+        print(f"{args.concurrency} concurrent connections, {args.requests} requests per endpoint")
+        print(f"{'endpoint':<32} {'req/s':>9} {'p50 ms':>9} {'p99 ms':>9} {'errors':>7}")
+        for path in args.endpoints:
+            result = await hammer(client, path, args.requests, args.concurrency)
+            print(f"{path:<32} {result['rps']:9.1f} {result['p50_ms']:9.1f} {result['p99_ms']:9.1f} {result['errors']:7d}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--username", default="hexenzirkle")
+    parser.add_argument("--password", default="24k-5541@Hexa")
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--endpoints", nargs="+", default=DEFAULT_ENDPOINTS)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
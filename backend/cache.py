@@ -0,0 +1,241 @@
+"""
+In-process caches.
+
+TTLCache is a thread-safe LRU map whose entries also expire at an absolute
+wall-clock time. It keeps hit/miss counters so the effect of a cache can be
+checked at runtime.
+
+ResponseCache stores serialized read-endpoint payloads with their ETag in a
+pluggable backend: MemoryBackend (the default, one per worker) or
+RedisBackend, which works with any client exposing the redis-py
+get/set/delete/scan_iter methods and is shared between workers.
+An invalidation only reaches the worker that made it with MemoryBackend, so
+it is refused when there are several workers; NullBackend turns the cache off.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    def __init__(self, maxsize=1024, default_ttl=None):
+        self.maxsize = maxsize
+        self.default_ttl = default_ttl
+        self._entries = OrderedDict()  # key -> (value, expires_at)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key, default=None):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= now:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, expires_at=None):
+        """Store `value`; it expires at `expires_at` (epoch seconds) or after the default TTL"""
+        if expires_at is None and self.default_ttl is not None:
+            expires_at = time.time() + self.default_ttl
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            return self._entries.pop(key, None) is not None
+
+    def delete_where(self, predicate):
+        """Drop every entry whose value matches `predicate`; returns how many were removed"""
+        with self._lock:
+            keys = [key for key, (value, _) in self._entries.items() if predicate(value)]
+            for key in keys:
+                del self._entries[key]
+            return len(keys)
+
+    def delete_prefix(self, prefix):
+        """Drop every entry whose (string) key starts with `prefix`"""
+        with self._lock:
+            keys = [key for key in self._entries if key.startswith(prefix)]
+            for key in keys:
+                del self._entries[key]
+            return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+class MemoryBackend:
+    """Response cache backend holding bytes in a per-process TTLCache"""
+
+    def __init__(self, maxsize=4096, ttl_seconds=None):
+        self._cache = TTLCache(maxsize=maxsize, default_ttl=ttl_seconds)
+
+    def get(self, key):
+        return self._cache.get(key)
+
+    def set(self, key, value):
+        self._cache.set(key, value)
+
+    def delete(self, *keys):
+        for key in keys:
+            self._cache.delete(key)
+
+    def delete_prefix(self, prefix):
+        self._cache.delete_prefix(prefix)
+
+    def stats(self):
+        return self._cache.stats()
+
+
+class NullBackend:
+    """Response cache backend that stores nothing (caching disabled)"""
+
+    def get(self, key):
+        return None
+
+    def set(self, key, value):
+        pass
+
+    def delete(self, *keys):
+        pass
+
+    def delete_prefix(self, prefix):
+        pass
+
+    def stats(self):
+        return {"hits": 0, "misses": 0, "disabled": True}
+
+
+class RedisBackend:
+    """Response cache backend for a Redis (or Redis-compatible) client"""
+
+    def __init__(self, client, ttl_seconds=None, namespace="sahulatfin:"):
+        self.client = client
+        self.ttl_seconds = ttl_seconds
+        self.namespace = namespace
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        value = self.client.get(self.namespace + key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def set(self, key, value):
+        self.client.set(self.namespace + key, value, ex=self.ttl_seconds)
+
+    def delete(self, *keys):
+        if keys:
+            self.client.delete(*(self.namespace + key for key in keys))
+
+    def delete_prefix(self, prefix):
+        keys = list(self.client.scan_iter(match=self.namespace + prefix + "*"))
+        if keys:
+            self.client.delete(*keys)
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses}
+
+
+def create_backend(url=None, maxsize=4096, ttl_seconds=None, workers=1):
+    """
+    MemoryBackend, a RedisBackend when `url` is a redis:// URL (needs the
+    redis package) or NullBackend for "none://". Raises ValueError for
+    memory:// with more than one worker, since each worker would keep
+    serving bodies another worker has invalidated.
+    """
+    if url == "none://":
+        return NullBackend()
+    if not url or url == "memory://":
+        if workers > 1:
+            raise ValueError(
+                f"memory:// response cache cannot be shared by {workers} workers; "
+                "set RESPONSE_CACHE_URL to a redis:// URL, or none:// to disable it"
+            )
+        return MemoryBackend(maxsize=maxsize, ttl_seconds=ttl_seconds)
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        import redis
+        return RedisBackend(redis.Redis.from_url(url), ttl_seconds=ttl_seconds)
+    raise ValueError(f"Unsupported response cache URL: {url}")
+
+
+class ResponseCache:
+    """
+    JSON response bodies and their ETags, keyed per entity (e.g. "client:12").
+
+    `generation` increases on every invalidation; readers take it before
+    querying and pass it to `set`, so a payload built from data that changed
+    while it was being read is never stored.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.generation = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def etag_for(body: bytes) -> str:
+        return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+    def get(self, key):
+        """Return (etag, body) or None"""
+        value = self.backend.get(key)
+        if value is None:
+            return None
+        etag, _, body = value.partition(b"\n")
+        return etag.decode(), body
+
+    def set(self, key, body: bytes, generation=None) -> str:
+        etag = self.etag_for(body)
+        with self._lock:
+            if generation is None or generation == self.generation:
+                self.backend.set(key, etag.encode() + b"\n" + body)
+        return etag
+
+    def invalidate(self, *keys):
+        with self._lock:
+            self.generation += 1
+            self.backend.delete(*keys)
+
+    def invalidate_prefix(self, *prefixes):
+        with self._lock:
+            self.generation += 1
+            for prefix in prefixes:
+                self.backend.delete_prefix(prefix)
+
+    def stats(self):
+        return dict(self.backend.stats(), generation=self.generation)
@@ -0,0 +1,134 @@
+"""
+Cash-flow projection over the installment book.
+
+What is still owed on unpaid installments of active loans falling due in a
+date window is summed per period (day, week starting Monday, or month) and
+optionally per loan type or client risk level, in one grouped query over the
+due-date index. The stress scenario re-prices every loan at its rate plus
+ai_models.STRESS_TEST_RATE_DELTA, the same shock suggest_loan_terms applies.
+"""
+from datetime import date, datetime
+from functools import lru_cache
+from typing import Optional
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+import ai_models
+import database
+import schedules
+
+PERIODS = ("day", "week", "month")
+GROUP_BY = ("loan_type", "risk_level")
+
+
+def period_start(column, period: str, dialect_name: str):
+    """SQL expression for the first day of the period containing `column`"""
+    if dialect_name == "sqlite":
+        if period == "day":
+            return func.date(column)
+        if period == "week":
+            # 'weekday 0' moves forward to Sunday; step back six days to that week's Monday
+            return func.date(column, "weekday 0", "-6 days")
+        return func.date(column, "start of month")
+    return func.date(func.date_trunc(period, column))
+
+
+@lru_cache(maxsize=4096)
+def stress_factor(interest_rate, duration_months, repayment_method=schedules.FLAT, grace_period_months=0,
+                  rate_delta=ai_models.STRESS_TEST_RATE_DELTA):
+    """Ratio of the stressed to the actual total repayment for a loan's terms"""
+    if not duration_months or duration_months <= (grace_period_months or 0):
+        return 1.0
+    totals = schedules.price_batch(
+        1.0, [interest_rate or 0, (interest_rate or 0) + rate_delta], duration_months,
+        repayment_method or schedules.FLAT, grace_period_months or 0,
+    )["total_payable"]
+    return float(totals[1] / totals[0])
+
+
+def projection_query(period: str, start: datetime, end: datetime, group_by: Optional[str], dialect_name: str):
+    Loan = database.Loan
+    Client = database.Client
+    Installment = database.Installment
+    bucket = period_start(Installment.due_date, period, dialect_name).label("period_start")
+
+    columns = [bucket, Loan.interest_rate, Loan.duration_months, Loan.repayment_method, Loan.grace_period_months]
+    if group_by == "loan_type":
+        columns.append(Loan.loan_type.label("group_key"))
+    elif group_by == "risk_level":
+        columns.append(Client.risk_level.label("group_key"))
+
+    stmt = (
+        select(
+            *columns,
+            # Only what is still owed on partly paid installments
+            func.sum(Installment.amount - Installment.amount_paid).label("amount"),
+            func.count().label("installments"),
+        )
+        .join(Loan, Loan.id == Installment.loan_id)
+        .where(
+            Installment.due_date >= start,
+            Installment.due_date < end,
+            Installment.paid == False,
+            Loan.status == "Active",
+        )
+    )
+    if group_by == "risk_level":
+        stmt = stmt.join(Client, Client.id == Loan.client_id)
+    # Grouping by loan terms lets the stress factor be applied per group in Python
+    return stmt.group_by(*columns)
+
+
+def project(db: Session, period: str = "month", start: Optional[date] = None, months: int = 6,
+            group_by: Optional[str] = None, stress: bool = False):
+    """Expected collections per period over `months` months starting at `start` (default today)"""
+    if period not in PERIODS:
+        raise ValueError(f"period must be one of {', '.join(PERIODS)}")
+    if group_by is not None and group_by not in GROUP_BY:
+        raise ValueError(f"group_by must be one of {', '.join(GROUP_BY)}")
+
+    start = start or datetime.utcnow().date()
+    end = schedules.add_months(start, months)
+    stmt = projection_query(
+        period, datetime.combine(start, datetime.min.time()), datetime.combine(end, datetime.min.time()),
+        group_by, db.get_bind().dialect.name,
+    )
+
+    buckets = {}
+    for row in db.execute(stmt):
+        key = str(row.period_start)
+        bucket = buckets.setdefault(key, {"period_start": key, "amount": 0.0, "installments": 0})
+        targets = [bucket]
+        if group_by:
+            groups = bucket.setdefault("groups", {})
+            group_name = row.group_key or "Unknown"
+            targets.append(groups.setdefault(group_name, {"amount": 0.0, "installments": 0}))
+        for target in targets:
+            target["amount"] += row.amount or 0
+            target["installments"] += row.installments
+            if stress:
+                target["stressed_amount"] = target.get("stressed_amount", 0.0) + (row.amount or 0) * stress_factor(
+                    row.interest_rate, row.duration_months, row.repayment_method, row.grace_period_months
+                )
+
+    periods = [buckets[key] for key in sorted(buckets)]
+    for bucket in periods:
+        for target in [bucket] + list(bucket.get("groups", {}).values()):
+            for field in ("amount", "stressed_amount"):
+                if field in target:
+                    target[field] = round(target[field], 2)
+
+    result = {
+        "period": period,
+        "group_by": group_by,
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "total_amount": round(sum(bucket["amount"] for bucket in periods), 2),
+        "total_installments": sum(bucket["installments"] for bucket in periods),
+        "periods": periods,
+    }
+    if stress:
+        result["stress_test"] = {
+            "rate_delta": ai_models.STRESS_TEST_RATE_DELTA,
+            "total_amount": round(sum(bucket["stressed_amount"] for bucket in periods), 2),
+        }
+    return result
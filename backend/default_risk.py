@@ -0,0 +1,181 @@
+"""
+Portfolio-wide default probability scoring.
+
+`score_portfolio` computes the default probability and default-risk alerts
+for every active loan from one grouped installment query (a window function
+picks each loan's three latest installments) and replaces the
+`loan_risk_scores` snapshot. `riskiest_query` pages through the snapshot
+ordered by probability, highest first.
+"""
+import json
+import time
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import and_, case, delete, func, insert, or_, select
+from sqlalchemy.orm import Session
+import database
+
+SEVERITY_ORDER = {"Low": 1, "Medium": 2, "High": 3}
+INSERT_CHUNK_SIZE = 5000
+
+
+def installment_stats_query():
+    """Per active loan: client risk score and the counts check_default_risk needs"""
+    Loan = database.Loan
+    Client = database.Client
+    Installment = database.Installment
+
+    # Rank installments from the latest due date backwards within each loan
+    ranked = (
+        select(
+            Installment.loan_id,
+            Installment.paid,
+            Installment.is_overdue,
+            func.row_number().over(
+                partition_by=Installment.loan_id,
+                order_by=(Installment.due_date.desc(), Installment.id),
+            ).label("recency"),
+        )
+        .join(Loan, Loan.id == Installment.loan_id)
+        .where(Loan.status == "Active")
+        .subquery()
+    )
+    paid = ranked.c.paid == True
+    stats = (
+        select(
+            ranked.c.loan_id,
+            func.count().label("installment_count"),
+            func.sum(case((paid, 1), else_=0)).label("paid_count"),
+            func.sum(case((and_(ranked.c.is_overdue == True, ~paid), 1), else_=0)).label("overdue_count"),
+            func.sum(case((and_(ranked.c.recency <= 3, ~paid), 1), else_=0)).label("recent_unpaid"),
+        )
+        .group_by(ranked.c.loan_id)
+        .subquery()
+    )
+
+    return (
+        select(
+            Loan.id.label("loan_id"),
+            Loan.client_id,
+            Loan.status,
+            Loan.loan_amount,
+            Client.risk_score,
+            func.coalesce(stats.c.installment_count, 0).label("installment_count"),
+            func.coalesce(stats.c.paid_count, 0).label("paid_count"),
+            func.coalesce(stats.c.overdue_count, 0).label("overdue_count"),
+            func.coalesce(stats.c.recent_unpaid, 0).label("recent_unpaid"),
+        )
+        .join(Client, Client.id == Loan.client_id)
+        .outerjoin(stats, stats.c.loan_id == Loan.id)
+        .where(Loan.status == "Active")
+    )
+
+
+def score_rows(rows, alert_system, scored_at):
+    """Turn installment statistics rows into loan_risk_scores mappings"""
+    scores = []
+    # Alerts depend only on the four counts, which repeat across many loans
+    alerts_by_stats = {}
+    for row in rows:
+        loan_data = {"status": row.status, "loan_amount": row.loan_amount}
+        probability = alert_system.calculate_default_probability(
+            loan_data, row.risk_score or 50, row.overdue_count
+        )
+        stats = (row.overdue_count, row.paid_count, row.installment_count, row.recent_unpaid)
+        if stats not in alerts_by_stats:
+            alerts = alert_system.check_default_risk_from_stats(*stats)
+            highest = max((alert["severity"] for alert in alerts), key=SEVERITY_ORDER.get, default=None)
+            alerts_by_stats[stats] = (len(alerts), highest, json.dumps(alerts) if alerts else None)
+        alert_count, highest, alerts_json = alerts_by_stats[stats]
+        scores.append({
+            "loan_id": row.loan_id,
+            "client_id": row.client_id,
+            "default_probability": probability,
+            "installment_count": row.installment_count,
+            "paid_count": row.paid_count,
+            "overdue_count": row.overdue_count,
+            "recent_unpaid": row.recent_unpaid,
+            "alert_count": alert_count,
+            "highest_severity": highest,
+            "alerts": alerts_json,
+            "scored_at": scored_at,
+        })
+    return scores
+
+
+def score_portfolio(db: Session, alert_system, now=None):
+    """Score every active loan and replace the stored snapshot in one transaction"""
+    started = time.perf_counter()
+    scored_at = now or datetime.utcnow()
+
+    rows = db.execute(installment_stats_query()).all()
+    scores = score_rows(rows, alert_system, scored_at)
+
+    RiskScore = database.LoanRiskScore
+    db.execute(delete(RiskScore))
+    for i in range(0, len(scores), INSERT_CHUNK_SIZE):
+        db.execute(insert(RiskScore), scores[i:i + INSERT_CHUNK_SIZE])
+    db.commit()
+
+    return {
+        "loans_scored": len(scores),
+        "scored_at": scored_at.isoformat(),
+        "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+    }
+
+
+def riskiest_query(after_probability: Optional[float] = None, after_loan_id: Optional[int] = None,
+                   limit: int = 100, min_probability: Optional[float] = None,
+                   risk_level: Optional[str] = None):
+    """
+    Scored loans ordered by default probability (highest first), then loan id,
+    with keyset pagination on that pair. Fetches limit + 1 rows.
+    """
+    RiskScore = database.LoanRiskScore
+    Client = database.Client
+
+    stmt = (
+        select(RiskScore, Client.name.label("client_name"), Client.risk_level)
+        .join(Client, Client.id == RiskScore.client_id)
+        .order_by(RiskScore.default_probability.desc(), RiskScore.loan_id.desc())
+        .limit(limit + 1)
+    )
+    if after_probability is not None and after_loan_id is not None:
+        stmt = stmt.where(or_(
+            RiskScore.default_probability < after_probability,
+            and_(RiskScore.default_probability == after_probability, RiskScore.loan_id < after_loan_id),
+        ))
+    if min_probability is not None:
+        stmt = stmt.where(RiskScore.default_probability >= min_probability)
+    if risk_level is not None:
+        stmt = stmt.where(Client.risk_level == risk_level)
+    return stmt
+
+
+def riskiest_loans(db: Session, after_probability=None, after_loan_id=None, limit=100,
+                   min_probability=None, risk_level=None):
+    """Page of the riskiest loans plus the (probability, loan_id) of the last row when more remain"""
+    rows = db.execute(riskiest_query(after_probability, after_loan_id, limit, min_probability, risk_level)).all()
+
+    next_position = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1].LoanRiskScore
+        next_position = (last.default_probability, last.loan_id)
+
+    loans = [
+        {
+            "loan_id": row.LoanRiskScore.loan_id,
+            "client_id": row.LoanRiskScore.client_id,
+            "client_name": row.client_name,
+            "risk_level": row.risk_level,
+            "default_probability": row.LoanRiskScore.default_probability,
+            "overdue_installments": row.LoanRiskScore.overdue_count,
+            "total_installments": row.LoanRiskScore.installment_count,
+            "highest_severity": row.LoanRiskScore.highest_severity,
+            "alerts": json.loads(row.LoanRiskScore.alerts) if row.LoanRiskScore.alerts else [],
+            "scored_at": row.LoanRiskScore.scored_at,
+        }
+        for row in rows
+    ]
+    return loans, next_position
@@ -0,0 +1,177 @@
+"""
+Streaming bulk client import.
+
+Rows are read one at a time from a CSV or NDJSON upload and processed in
+chunks: each chunk is validated, checked for CNIC clashes with a single
+set-based lookup on the unique CNIC index, risk-scored in batch and inserted
+in one transaction. Bad rows are reported back without stopping the import.
+"""
+import codecs
+import csv
+import json
+from datetime import datetime
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from pydantic import ValidationError
+import database
+
+SUPPORTED_FORMATS = ("csv", "ndjson")
+DEFAULT_CHUNK_SIZE = 1000
+
+
+def detect_format(filename, content_type):
+    """Guess the upload format from its file name or content type"""
+    name = (filename or "").lower()
+    content_type = (content_type or "").lower()
+    if name.endswith((".ndjson", ".jsonl")) or "ndjson" in content_type or "jsonl" in content_type:
+        return "ndjson"
+    if name.endswith(".csv") or "csv" in content_type:
+        return "csv"
+    return None
+
+
+def iter_records(fileobj, fmt):
+    """
+    Yield (row_number, record, error) for each data row of a binary file object.
+    Exactly one of record/error is set.
+    """
+    text = codecs.getreader("utf-8-sig")(fileobj)
+
+    if fmt == "csv":
+        reader = csv.DictReader(text)
+        for row_number, row in enumerate(reader, start=1):
+            # Drop empty cells so optional fields fall back to their defaults
+            yield row_number, {key: value for key, value in row.items() if key and value not in ("", None)}, None
+        return
+
+    row_number = 0
+    for line in text:
+        if not line.strip():
+            continue
+        row_number += 1
+        try:
+            record = json.loads(line)
+        except ValueError as exc:
+            yield row_number, None, f"Invalid JSON: {exc}"
+            continue
+        if not isinstance(record, dict):
+            yield row_number, None, "Each line must be a JSON object"
+            continue
+        yield row_number, record, None
+
+
+def _validation_messages(exc: ValidationError):
+    return [f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" for error in exc.errors()]
+
+
+def _existing_cnics(db: Session, cnics):
+    if not cnics:
+        return set()
+    rows = db.query(database.Client.cnic).filter(database.Client.cnic.in_(cnics)).all()
+    return {row.cnic for row in rows}
+
+
+class ClientImport:
+    """
+    Accumulates rows and flushes them to the database chunk by chunk.
+    `schema` is the Pydantic model used to validate each row.
+    """
+
+    def __init__(self, db: Session, schema, scorer, chunk_size=DEFAULT_CHUNK_SIZE):
+        self.db = db
+        self.schema = schema
+        self.scorer = scorer
+        self.chunk_size = chunk_size
+        self.total_rows = 0
+        self.imported = 0
+        self.errors = []
+        self._seen_cnics = set()
+        self._pending = []
+
+    def add(self, row_number, record, error=None):
+        self.total_rows += 1
+        if error:
+            self._fail(row_number, record, [error])
+            return
+        try:
+            client = self.schema.model_validate(record)
+        except ValidationError as exc:
+            self._fail(row_number, record, _validation_messages(exc))
+            return
+        if client.cnic in self._seen_cnics:
+            self._fail(row_number, record, ["Duplicate CNIC earlier in this file"])
+            return
+        self._seen_cnics.add(client.cnic)
+        self._pending.append((row_number, client))
+        if len(self._pending) >= self.chunk_size:
+            self.flush()
+
+    def _fail(self, row_number, record, messages):
+        cnic = record.get("cnic") if isinstance(record, dict) else None
+        self.errors.append({"row": row_number, "cnic": cnic, "errors": messages})
+
+    def flush(self):
+        """Validate CNICs against the database, score and insert the pending chunk"""
+        pending, self._pending = self._pending, []
+        if not pending:
+            return
+
+        existing = _existing_cnics(self.db, [client.cnic for _, client in pending])
+        accepted = []
+        for row_number, client in pending:
+            if client.cnic in existing:
+                self._fail(row_number, {"cnic": client.cnic}, ["Client with this CNIC already exists"])
+            else:
+                accepted.append((row_number, client))
+        if not accepted:
+            return
+
+        try:
+            self._insert(accepted)
+        except IntegrityError:
+            # Another request registered one of these CNICs after our lookup;
+            # re-check and insert whatever is still free.
+            self.db.rollback()
+            clashes = _existing_cnics(self.db, [client.cnic for _, client in accepted])
+            for row_number, client in accepted:
+                if client.cnic in clashes:
+                    self._fail(row_number, {"cnic": client.cnic}, ["Client with this CNIC already exists"])
+            remaining = [(row_number, client) for row_number, client in accepted if client.cnic not in clashes]
+            if remaining:
+                self._insert(remaining)
+
+    def _insert(self, accepted):
+        clients = [client for _, client in accepted]
+        risk_scores, risk_levels = self.scorer.score_batch({
+            'monthly_income': [client.monthly_income for client in clients],
+            'employment_status': [client.employment_status for client in clients],
+            'existing_loans': [client.existing_loans for client in clients],
+            'credit_history': [client.credit_history for client in clients]
+        })
+        now = datetime.utcnow()
+        rows = [
+            dict(client.model_dump(), risk_score=risk_score, risk_level=risk_level, created_at=now)
+            for client, risk_score, risk_level in zip(clients, risk_scores, risk_levels)
+        ]
+        self.db.execute(insert(database.Client), rows)
+        self.db.commit()
+        self.imported += len(rows)
+
+    def report(self):
+        self.errors.sort(key=lambda error: error["row"])
+        return {
+            "total_rows": self.total_rows,
+            "imported": self.imported,
+            "failed": len(self.errors),
+            "errors": self.errors,
+        }
+
+
+def import_clients(db: Session, fileobj, fmt, schema, scorer, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Stream a CSV/NDJSON upload into the clients table and return the row report"""
+    importer = ClientImport(db, schema, scorer, chunk_size)
+    for row_number, record, error in iter_records(fileobj, fmt):
+        importer.add(row_number, record, error)
+    importer.flush()
+    return importer.report()
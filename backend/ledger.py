@@ -0,0 +1,337 @@
+"""
+Payments ledger and running loan balances.
+
+Every payment is one row in `payments`: single and bulk postings, bulk closes,
+and a backfill for installments that were marked paid before the ledger
+existed. Posting a payment also adds it to the installment's `amount_paid`
+(the installment is paid once that covers its amount) and to the loan's
+`amount_paid` / `outstanding_balance`, so balances are read from the loan row
+instead of summing installments on every request.
+
+When a loan's schedule is regenerated its payments are detached from the old
+installments and applied to the new ones oldest first. `replay` recomputes
+every balance from the ledger the same way and reports, or fixes, any drift:
+
+    python ledger.py verify
+    python ledger.py replay
+"""
+import sys
+from collections import namedtuple
+from datetime import datetime
+from typing import Iterable
+from sqlalchemy import and_, bindparam, case, func, insert, literal, or_, select, update
+from sqlalchemy.orm import Session
+import database
+
+# Amounts are compared to the paisa
+TOLERANCE = 0.005
+
+Entry = namedtuple("Entry", ["installment_id", "loan_id", "amount", "paid_at"])
+
+
+def record(db: Session, entries: Iterable[Entry], source="payment", now=None):
+    """
+    Post payments against installments: insert them into the ledger and add
+    them to the installment and loan balances, one executemany per table.
+    Callers validate amounts against what is still owed. Returns the number
+    of payments written.
+    """
+    entries = [entry for entry in entries if entry.amount > 0]
+    if not entries:
+        return 0
+    now = now or datetime.utcnow()
+
+    db.execute(insert(database.Payment.__table__), [
+        {
+            "loan_id": entry.loan_id,
+            "installment_id": entry.installment_id,
+            "amount": round(entry.amount, 2),
+            "paid_at": entry.paid_at or now,
+            "source": source,
+            "created_at": now,
+        }
+        for entry in entries
+    ])
+
+    installments = database.Installment.__table__
+    paid_after = func.round(installments.c.amount_paid + bindparam("b_amount"), 2)
+    covered = paid_after >= installments.c.amount - TOLERANCE
+    db.execute(
+        update(installments)
+        .where(installments.c.id == bindparam("b_id"))
+        .values(
+            amount_paid=paid_after,
+            paid=case((covered, True), else_=installments.c.paid),
+            paid_date=case((covered, bindparam("b_paid_at")), else_=installments.c.paid_date),
+            is_overdue=case((covered, False), else_=installments.c.is_overdue),
+        ),
+        [{"b_id": entry.installment_id, "b_amount": round(entry.amount, 2), "b_paid_at": entry.paid_at or now}
+         for entry in entries],
+    )
+
+    per_loan = {}
+    for entry in entries:
+        per_loan[entry.loan_id] = per_loan.get(entry.loan_id, 0.0) + round(entry.amount, 2)
+    loans = database.Loan.__table__
+    db.execute(
+        update(loans)
+        .where(loans.c.id == bindparam("b_id"))
+        .values(
+            amount_paid=func.round(func.coalesce(loans.c.amount_paid, 0) + bindparam("b_amount"), 2),
+            outstanding_balance=func.round(loans.c.outstanding_balance - bindparam("b_amount"), 2),
+        ),
+        [{"b_id": loan_id, "b_amount": round(amount, 2)} for loan_id, amount in per_loan.items()],
+    )
+    return len(entries)
+
+
+def allocate(rows, amount, paid_at):
+    """
+    Spread `amount` over installment rows (dicts, in due order) oldest first,
+    setting amount_paid and marking the rows it covers as paid. Returns what
+    is left over.
+    """
+    remaining = round(amount or 0, 2)
+    for row in rows:
+        if remaining <= TOLERANCE:
+            break
+        share = min(remaining, row["amount"])
+        row["amount_paid"] = round(share, 2)
+        remaining = round(remaining - share, 2)
+        if share >= row["amount"] - TOLERANCE:
+            row.update(paid=True, paid_date=paid_at, is_overdue=False)
+    return remaining
+
+
+def detach_payments(db: Session, loan_id: int):
+    """
+    Unlink a loan's payments from its installments before the schedule is
+    replaced. Returns (total paid, latest payment time).
+    """
+    Payment = database.Payment
+    db.execute(update(Payment.__table__).where(Payment.loan_id == loan_id).values(installment_id=None))
+    total, latest = db.execute(
+        select(func.coalesce(func.sum(Payment.amount), 0), func.max(Payment.paid_at)).where(Payment.loan_id == loan_id)
+    ).one()
+    return round(total, 2), latest
+
+
+def refresh_balances(db: Session, where=None):
+    """Recompute total_due, amount_paid and outstanding_balance from the tables for the loans matching `where`"""
+    loans = database.Loan.__table__
+    installments = database.Installment.__table__
+    payments = database.Payment.__table__
+    total = select(func.coalesce(func.sum(installments.c.amount), 0)).where(
+        installments.c.loan_id == loans.c.id
+    ).scalar_subquery()
+    paid = select(func.coalesce(func.sum(payments.c.amount), 0)).where(
+        payments.c.loan_id == loans.c.id
+    ).scalar_subquery()
+    stmt = update(loans).values(
+        total_due=func.round(total, 2),
+        amount_paid=func.round(paid, 2),
+        outstanding_balance=func.round(total - paid, 2),
+    )
+    if where is not None:
+        stmt = stmt.where(where)
+    return db.execute(stmt).rowcount
+
+
+def backfill(db: Session, now=None):
+    """
+    Create ledger entries for installments marked paid without payments
+    covering them (data from before the ledger), then compute the balances of
+    those loans and of any loan that has none yet. Set-based; returns the
+    number of payments created.
+    """
+    now = now or datetime.utcnow()
+    installments = database.Installment.__table__
+    payments = database.Payment.__table__
+    loans = database.Loan.__table__
+    amount_paid = func.coalesce(installments.c.amount_paid, 0)
+    missing = and_(installments.c.paid == True, amount_paid < installments.c.amount - TOLERANCE)
+
+    created = db.execute(
+        insert(payments).from_select(
+            ["loan_id", "installment_id", "amount", "paid_at", "source", "created_at"],
+            select(
+                installments.c.loan_id,
+                installments.c.id,
+                func.round(installments.c.amount - amount_paid, 2),
+                func.coalesce(installments.c.paid_date, now),
+                literal("backfill"),
+                literal(now),
+            ).where(missing),
+        )
+    ).rowcount
+    db.execute(update(installments).where(missing).values(amount_paid=installments.c.amount))
+
+    backfilled = select(payments.c.loan_id).where(payments.c.source == "backfill", payments.c.created_at == now)
+    refresh_balances(db, or_(loans.c.total_due.is_(None), loans.c.id.in_(backfilled)))
+    return created
+
+
+def ensure_built(db: Session):
+    """Backfill the ledger if any loan has no balances yet (a database from before the ledger)"""
+    pending = db.execute(select(database.Loan.id).where(database.Loan.total_due.is_(None)).limit(1)).first()
+    if pending is None:
+        return False
+    backfill(db)
+    db.commit()
+    return True
+
+
+def replay(db: Session, fix=False, sample=20):
+    """
+    Recompute every installment and loan balance from the ledger: payments
+    linked to an installment count towards it, and a loan's unlinked payments
+    are applied to its installments oldest first. Returns a report of the rows
+    that disagree with the stored balances; with `fix`, rewrites them.
+    """
+    Installment = database.Installment
+    Loan = database.Loan
+    Payment = database.Payment
+
+    linked = dict(db.execute(
+        select(Payment.installment_id, func.sum(Payment.amount))
+        .where(Payment.installment_id.isnot(None))
+        .group_by(Payment.installment_id)
+    ).all())
+    unlinked = {
+        row.loan_id: (row.total, row.latest)
+        for row in db.execute(
+            select(Payment.loan_id, func.sum(Payment.amount).label("total"), func.max(Payment.paid_at).label("latest"))
+            .where(Payment.installment_id.is_(None))
+            .group_by(Payment.loan_id)
+        )
+    }
+    paid_by_loan = dict(db.execute(select(Payment.loan_id, func.sum(Payment.amount)).group_by(Payment.loan_id)).all())
+
+    installment_fixes = []
+    due_by_loan = {}
+    checked = 0
+    remaining, latest, current_loan = 0.0, None, None
+    rows = db.execute(
+        select(Installment.id, Installment.loan_id, Installment.amount, Installment.amount_paid,
+               Installment.paid, Installment.paid_date)
+        .order_by(Installment.loan_id, Installment.due_date, Installment.installment_number)
+        .execution_options(yield_per=10000)
+    )
+    for row in rows:
+        checked += 1
+        if row.loan_id != current_loan:
+            current_loan = row.loan_id
+            remaining, latest = unlinked.get(row.loan_id, (0.0, None))
+        due_by_loan[row.loan_id] = due_by_loan.get(row.loan_id, 0.0) + row.amount
+
+        expected = linked.get(row.id, 0.0)
+        if remaining > TOLERANCE:
+            share = max(0.0, min(remaining, row.amount - expected))
+            expected += share
+            remaining = round(remaining - share, 2)
+        expected = round(expected, 2)
+        paid = expected >= row.amount - TOLERANCE
+
+        if abs(expected - (row.amount_paid or 0)) > TOLERANCE or paid != bool(row.paid):
+            if not paid:
+                paid_date = None
+            else:
+                paid_date = row.paid_date or latest or datetime.utcnow()
+            installment_fixes.append({
+                "b_id": row.id, "b_loan_id": row.loan_id, "b_amount_paid": expected,
+                "b_paid": paid, "b_paid_date": paid_date,
+                "stored_amount_paid": row.amount_paid, "stored_paid": bool(row.paid),
+            })
+
+    loan_fixes = []
+    loans = db.execute(select(Loan.id, Loan.total_due, Loan.amount_paid, Loan.outstanding_balance))
+    loan_count = 0
+    for row in loans:
+        loan_count += 1
+        total_due = round(due_by_loan.get(row.id, 0.0), 2)
+        amount_paid = round(paid_by_loan.get(row.id, 0.0), 2)
+        stored = (row.total_due, row.amount_paid, row.outstanding_balance)
+        expected = (total_due, amount_paid, round(total_due - amount_paid, 2))
+        if any(value is None or abs(value - want) > TOLERANCE for value, want in zip(stored, expected)):
+            loan_fixes.append({
+                "b_id": row.id, "b_total_due": expected[0], "b_amount_paid": expected[1],
+                "b_outstanding_balance": expected[2], "stored": stored,
+            })
+
+    changed_loans = sorted({fix["b_loan_id"] for fix in installment_fixes} | {fix["b_id"] for fix in loan_fixes})
+    if fix and installment_fixes:
+        table = Installment.__table__
+        db.execute(
+            update(table)
+            .where(table.c.id == bindparam("b_id"))
+            .values(
+                amount_paid=bindparam("b_amount_paid"),
+                paid=bindparam("b_paid"),
+                paid_date=bindparam("b_paid_date"),
+                is_overdue=case((bindparam("b_paid"), False), else_=table.c.is_overdue),
+            ),
+            [{key: fix[key] for key in ("b_id", "b_amount_paid", "b_paid", "b_paid_date")} for fix in installment_fixes],
+        )
+    if fix and loan_fixes:
+        table = Loan.__table__
+        db.execute(
+            update(table)
+            .where(table.c.id == bindparam("b_id"))
+            .values(
+                total_due=bindparam("b_total_due"),
+                amount_paid=bindparam("b_amount_paid"),
+                outstanding_balance=bindparam("b_outstanding_balance"),
+            ),
+            [{key: fix[key] for key in ("b_id", "b_total_due", "b_amount_paid", "b_outstanding_balance")} for fix in loan_fixes],
+        )
+
+    return {
+        "ok": not installment_fixes and not loan_fixes,
+        "fixed": bool(fix and changed_loans),
+        "installments_checked": checked,
+        "loans_checked": loan_count,
+        "installment_mismatches": len(installment_fixes),
+        "loan_mismatches": len(loan_fixes),
+        "loan_ids": changed_loans,
+        "examples": [
+            {"installment_id": fix["b_id"], "loan_id": fix["b_loan_id"],
+             "stored": {"amount_paid": fix["stored_amount_paid"], "paid": fix["stored_paid"]},
+             "ledger": {"amount_paid": fix["b_amount_paid"], "paid": fix["b_paid"]}}
+            for fix in installment_fixes[:sample]
+        ] + [
+            {"loan_id": fix["b_id"],
+             "stored": dict(zip(("total_due", "amount_paid", "outstanding_balance"), fix["stored"])),
+             "ledger": {"total_due": fix["b_total_due"], "amount_paid": fix["b_amount_paid"],
+                        "outstanding_balance": fix["b_outstanding_balance"]}}
+            for fix in loan_fixes[:sample]
+        ],
+    }
+
+
+def main(argv):
+    if len(argv) != 2 or argv[1] not in ("replay", "verify"):
+        print("usage: python ledger.py [replay|verify]")
+        return 2
+
+    import summaries  # Only needed to refresh the summaries of corrected loans
+
+    database.init_db()
+    db = database.SessionLocal()
+    try:
+        report = replay(db, fix=argv[1] == "replay")
+        print(f"Checked {report['installments_checked']} installments and {report['loans_checked']} loans")
+        for example in report["examples"]:
+            print(f"  mismatch: {example}")
+        if argv[1] == "replay":
+            summaries.refresh_loans(db, report["loan_ids"])
+            db.commit()
+            print(f"Rewrote balances for {len(report['loan_ids'])} loans")
+            return 0
+        print("Balances match the ledger" if report["ok"] else "Drift detected - run `python ledger.py replay`")
+        return 0 if report["ok"] else 1
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
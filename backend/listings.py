@@ -0,0 +1,84 @@
+"""
+Keyset (cursor) pagination for the client and loan listings.
+
+Pages are ordered by id, which follows creation order, and the next page
+starts after the last id seen. Every page therefore costs an index seek
+instead of an OFFSET scan. Cursors are opaque URL-safe tokens.
+"""
+import base64
+import json
+from typing import Optional
+from sqlalchemy import select
+import database
+
+
+def encode_position(position: dict) -> str:
+    """Encode the sort key of the last row seen as an opaque cursor"""
+    payload = json.dumps(position, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+
+def decode_position(cursor: str) -> dict:
+    """Inverse of encode_position; raises ValueError when malformed"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        position = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if not isinstance(position, dict):
+        raise ValueError("Invalid cursor")
+    return position
+
+
+def encode_cursor(last_id: int) -> str:
+    return encode_position({"id": last_id})
+
+
+def decode_cursor(cursor: str) -> int:
+    """Return the last id encoded in a cursor; raises ValueError when malformed"""
+    last_id = decode_position(cursor).get("id")
+    if not isinstance(last_id, int):
+        raise ValueError("Invalid cursor")
+    return last_id
+
+
+def _page(stmt, model, after_id: Optional[int], limit: int):
+    if after_id is not None:
+        stmt = stmt.where(model.id > after_id)
+    # One extra row tells us whether there is a next page
+    return stmt.order_by(model.id).limit(limit + 1)
+
+
+def clients_query(after_id: Optional[int] = None, limit: int = 100, risk_level: Optional[str] = None,
+                  employment_status: Optional[str] = None, credit_history: Optional[str] = None):
+    Client = database.Client
+    stmt = select(Client)
+    if risk_level is not None:
+        stmt = stmt.where(Client.risk_level == risk_level)
+    if employment_status is not None:
+        stmt = stmt.where(Client.employment_status == employment_status)
+    if credit_history is not None:
+        stmt = stmt.where(Client.credit_history == credit_history)
+    return _page(stmt, Client, after_id, limit)
+
+
+def loans_query(after_id: Optional[int] = None, limit: int = 100, status: Optional[str] = None,
+                loan_type: Optional[str] = None, client_id: Optional[int] = None, with_client_name: bool = False):
+    """With `with_client_name` rows are (Loan, client name), joined in the same query"""
+    Loan = database.Loan
+    stmt = select(Loan, database.Client.name).join(Loan.client) if with_client_name else select(Loan)
+    if status is not None:
+        stmt = stmt.where(Loan.status == status)
+    if loan_type is not None:
+        stmt = stmt.where(Loan.loan_type == loan_type)
+    if client_id is not None:
+        stmt = stmt.where(Loan.client_id == client_id)
+    return _page(stmt, Loan, after_id, limit)
+
+
+def split_page(rows, limit: int):
+    """Trim the look-ahead row and return (rows, next_cursor)"""
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, encode_cursor(rows[-1].id)
+    return rows, None
@@ -1,17 +1,39 @@
-from fastapi import FastAPI, Depends, HTTPException, status
+from fastapi import FastAPI, Depends, File, HTTPException, Query, Request, Response, UploadFile, status
+from fastapi.encoders import jsonable_encoder
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
+from sqlalchemy import event, select
 from sqlalchemy.orm import Session
-from datetime import datetime, timedelta
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import date, datetime, timedelta
 from typing import List, Optional
-from pydantic import BaseModel
+from pydantic import BaseModel, field_validator
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 import database
 import ai_models
+import analytics
+import cache
+import cashflow
+import default_risk
+import exports
+import importers
+import ledger
+import listings
+import metrics
+import overdue
+import overview
+import passwords
+import repayments
+import scheduler
+import schedules
+import search
+import summaries
+import json
 import os
+import secrets
+import time
 
 # Initialize FastAPI app
 app = FastAPI(title="SahulatFin API")
@@ -28,14 +50,44 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
 
+# Per-route latency and SQL statement metrics, served on /metrics
+app.add_middleware(metrics.MetricsMiddleware)
+metrics.instrument_engine(database.engine)
+metrics.instrument_engine(database.async_engine.sync_engine)
+
 # Security setup
 SECRET_KEY = "sahulatfin-secret-key-change-in-production-2025"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24  # 24 hours
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Validated tokens are cached in-process; entries expire with the token or
+# after AUTH_CACHE_TTL_SECONDS, whichever comes first
+AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", "1024"))
+AUTH_CACHE_TTL_SECONDS = int(os.getenv("AUTH_CACHE_TTL_SECONDS", "300"))
+
+# Worker processes, as read by uvicorn/gunicorn for their default worker count
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "1"))
+
+# Read-endpoint response cache: "memory://" (single worker only), a redis://
+# URL or "none://". Off by default with several workers, since an in-process
+# cache would not see invalidations made by the other workers.
+RESPONSE_CACHE_URL = os.getenv("RESPONSE_CACHE_URL", "memory://" if WEB_CONCURRENCY <= 1 else "none://")
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "4096"))
+RESPONSE_CACHE_TTL_SECONDS = int(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "300"))
+
+# Bearer token the Prometheus scraper must send to /metrics. When unset the
+# endpoint is open, so it must only be reachable from the scraper's network.
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+# Background overdue sweep (0 runs it once at startup only)
+OVERDUE_SWEEP_INTERVAL_SECONDS = int(os.getenv("OVERDUE_SWEEP_INTERVAL_SECONDS", "900"))
+
+# Portfolio default-risk scoring job (0 runs it once at startup only)
+DEFAULT_RISK_INTERVAL_SECONDS = int(os.getenv("DEFAULT_RISK_INTERVAL_SECONDS", "3600"))
+
 security = HTTPBearer()
 
 # Initialize database on startup
@@ -43,6 +95,76 @@ security = HTTPBearer()
 def startup_event():
     database.init_db()
     create_default_admin()
+    db = database.SessionLocal()
+    try:
+        ledger.ensure_built(db)
+        summaries.ensure_built(db)
+        search.ensure_index(db)
+    finally:
+        db.close()
+    overdue_job.start()
+    default_risk_job.start()
+
+@app.on_event("shutdown")
+def shutdown_event():
+    overdue_job.stop()
+    default_risk_job.stop()
+    passwords.shutdown()
+
+def run_overdue_sweep():
+    db = database.SessionLocal()
+    try:
+        return overdue.sweep(db, on_commit=lambda loan_ids: invalidate_responses(loans=loan_ids))
+    finally:
+        db.close()
+
+overdue_job = scheduler.PeriodicJob("overdue_sweep", OVERDUE_SWEEP_INTERVAL_SECONDS, run_overdue_sweep)
+
+def run_default_risk_scoring():
+    db = database.SessionLocal()
+    try:
+        return default_risk.score_portfolio(db, alert_system)
+    finally:
+        db.close()
+
+default_risk_job = scheduler.PeriodicJob("default_risk_scoring", DEFAULT_RISK_INTERVAL_SECONDS, run_default_risk_scoring)
+
+response_cache = cache.ResponseCache(cache.create_backend(
+    RESPONSE_CACHE_URL, maxsize=RESPONSE_CACHE_SIZE, ttl_seconds=RESPONSE_CACHE_TTL_SECONDS, workers=WEB_CONCURRENCY
+))
+
+def etag_response(request: Request, etag: str, body: bytes) -> Response:
+    """200 with the cached body, or 304 when the client already has this ETag"""
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        if etag in candidates or "*" in candidates:
+            return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+def cached_response(request: Request, key: str) -> Optional[Response]:
+    entry = response_cache.get(key)
+    if entry is None:
+        return None
+    return etag_response(request, *entry)
+
+def store_response(request: Request, key: str, payload, generation: int) -> Response:
+    """Serialize `payload`, cache it under `key` and answer with its ETag"""
+    body = json.dumps(
+        jsonable_encoder(payload), ensure_ascii=False, allow_nan=False, separators=(",", ":")
+    ).encode("utf-8")
+    etag = response_cache.set(key, body, generation)
+    return etag_response(request, etag, body)
+
+def invalidate_responses(clients=(), loans=(), client_loans=()):
+    """Drop cached read responses touched by a write; portfolio-wide views always go"""
+    keys = [f"client:{client_id}" for client_id in clients]
+    keys += [f"client_loans:{client_id}" for client_id in client_loans]
+    for loan_id in loans:
+        keys += [f"loan:{loan_id}", f"loan_installments:{loan_id}"]
+    response_cache.invalidate(*keys)
+    response_cache.invalidate_prefix("dashboard:", "cashflow:")
 
 # Initialize AI models
 risk_scorer = ai_models.RiskScorer()
@@ -53,13 +175,12 @@ alert_system = ai_models.DefaultAlertSystem()
 # ============================================
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    return passwords.verify_password(plain_password, hashed_password)
 
 def get_password_hash(password: str) -> str:
-    # Bcrypt has a 72 byte limit, truncate if necessary
-    if len(password.encode('utf-8')) > 72:
-        password = password[:72]
-    return pwd_context.hash(password)
+    return passwords.hash_password(password)
+
+login_limiter = passwords.LoginRateLimiter()
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
@@ -90,16 +211,24 @@ def create_default_admin():
     finally:
         db.close()
 
-def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(database.get_db)
-):
-    """Verify JWT token and return current user"""
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
+credentials_exception = HTTPException(
+    status_code=status.HTTP_401_UNAUTHORIZED,
+    detail="Could not validate credentials",
+    headers={"WWW-Authenticate": "Bearer"},
+)
+
+class AuthenticatedUser:
+    """Lightweight, session-independent view of a User kept in the auth cache"""
+
+    def __init__(self, user: database.User):
+        self.id = user.id
+        self.username = user.username
+        self.is_admin = user.is_admin
+
+auth_cache = cache.TTLCache(maxsize=AUTH_CACHE_SIZE)
+
+def decode_token(credentials: HTTPAuthorizationCredentials):
+    """Validate the JWT and return (username, expiry as epoch seconds)"""
     try:
         token = credentials.credentials
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
@@ -108,11 +237,52 @@ def get_current_user(
             raise credentials_exception
     except JWTError:
         raise credentials_exception
-    
+    return username, payload.get("exp")
+
+def cache_authenticated_user(token: str, user: database.User, token_expires_at) -> AuthenticatedUser:
+    principal = AuthenticatedUser(user)
+    expires_at = time.time() + AUTH_CACHE_TTL_SECONDS
+    if token_expires_at is not None:
+        expires_at = min(expires_at, token_expires_at)
+    auth_cache.set(token, principal, expires_at)
+    return principal
+
+def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(database.get_db)
+):
+    """Verify JWT token and return current user"""
+    principal = auth_cache.get(credentials.credentials)
+    if principal is not None:
+        return principal
+
+    username, token_expires_at = decode_token(credentials)
     user = db.query(database.User).filter(database.User.username == username).first()
     if user is None:
         raise credentials_exception
-    return user
+    return cache_authenticated_user(credentials.credentials, user, token_expires_at)
+
+async def get_current_user_async(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(database.get_async_db)
+):
+    """Async variant of get_current_user for `async def` endpoints"""
+    principal = auth_cache.get(credentials.credentials)
+    if principal is not None:
+        return principal
+
+    username, token_expires_at = decode_token(credentials)
+    result = await db.execute(select(database.User).where(database.User.username == username))
+    user = result.scalars().first()
+    if user is None:
+        raise credentials_exception
+    return cache_authenticated_user(credentials.credentials, user, token_expires_at)
+
+@event.listens_for(database.User, "after_update")
+@event.listens_for(database.User, "after_delete")
+def invalidate_cached_user(mapper, connection, target):
+    """Drop cached tokens for a user whenever that user row changes"""
+    auth_cache.delete_where(lambda principal: principal.id == target.id)
 
 # ============================================
 # Pydantic Models for Request/Response
@@ -162,6 +332,8 @@ class LoanCreate(BaseModel):
     interest_rate: float
     duration_months: int
     start_date: datetime
+    repayment_method: str = schedules.FLAT  # flat or reducing (EMI)
+    grace_period_months: int = 0
 
 class LoanResponse(BaseModel):
     id: int
@@ -171,19 +343,28 @@ class LoanResponse(BaseModel):
     interest_rate: float
     duration_months: int
     monthly_installment: float
+    repayment_method: str
+    grace_period_months: int
     start_date: datetime
     status: str
+    total_due: Optional[float] = None
+    amount_paid: Optional[float] = None
+    outstanding_balance: Optional[float] = None
     created_at: datetime
     
     class Config:
         from_attributes = True
 
+class LoanListItem(LoanResponse):
+    client_name: str
+
 class InstallmentResponse(BaseModel):
     id: int
     loan_id: int
     installment_number: int
     due_date: datetime
     amount: float
+    amount_paid: float = 0
     paid: bool
     paid_date: Optional[datetime]
     is_overdue: bool
@@ -191,9 +372,62 @@ class InstallmentResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class PaymentResponse(BaseModel):
+    id: int
+    loan_id: int
+    installment_id: Optional[int]
+    amount: float
+    paid_at: datetime
+    source: str
+    
+    class Config:
+        from_attributes = True
+
+class PaymentRecord(BaseModel):
+    installment_id: Optional[int] = None
+    loan_id: Optional[int] = None
+    installment_number: Optional[int] = None
+    amount: Optional[float] = None  # Defaults to what is still owed; less is a partial payment
+    paid_date: Optional[datetime] = None  # Defaults to now
+
+class InstallmentSummary(BaseModel):
+    total: int
+    paid: int
+    overdue: int
+    expected_amount: float
+    collected_amount: float
+    overdue_amount: float
+    next_due_date: Optional[datetime]
+    next_due_amount: Optional[float]
+
+class LoanRisk(BaseModel):
+    default_probability: float
+    highest_severity: Optional[str]
+    alerts: List[dict]
+    scored_at: datetime
+
+class LoanOverview(LoanResponse):
+    installments: InstallmentSummary
+    risk: LoanRisk
+
+class ClientOverviewTotals(BaseModel):
+    loans: int
+    active_loans: int
+    total_due: float
+    amount_paid: float
+    outstanding_balance: float
+    overdue_installments: int
+
+class ClientOverviewResponse(BaseModel):
+    client: ClientResponse
+    loans: List[LoanOverview]
+    totals: ClientOverviewTotals
+
 class LoanSuggestionRequest(BaseModel):
     client_id: int
     loan_amount: float
+    repayment_method: str = schedules.FLAT
+    grace_period_months: int = 0
 
 class ClientUpdate(BaseModel):
     name: Optional[str] = None
@@ -211,23 +445,53 @@ class LoanUpdate(BaseModel):
     interest_rate: Optional[float] = None
     duration_months: Optional[int] = None
     start_date: Optional[datetime] = None
+    repayment_method: Optional[str] = None
+    grace_period_months: Optional[int] = None
     status: Optional[str] = None
 
+    @field_validator("*")
+    @classmethod
+    def reject_null(cls, value):
+        # Fields may be left out, but an explicit null would reach the loan's columns
+        if value is None:
+            raise ValueError("may be omitted but not null")
+        return value
+
 # ============================================
 # Authentication Endpoints
 # ============================================
 
 @app.post("/api/auth/login", response_model=TokenResponse)
-def login(login_data: LoginRequest, db: Session = Depends(database.get_db)):
+async def login(login_data: LoginRequest, db: AsyncSession = Depends(database.get_async_db)):
     """Admin login endpoint"""
-    user = db.query(database.User).filter(database.User.username == login_data.username).first()
-    
-    if not user or not verify_password(login_data.password, user.hashed_password):
+    # Counted before the password is checked; a successful login clears it
+    retry_after = login_limiter.attempt(login_data.username)
+    if retry_after:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many failed login attempts, try again later",
+            headers={"Retry-After": str(retry_after)},
+        )
+
+    result = await db.execute(select(database.User).where(database.User.username == login_data.username))
+    user = result.scalars().first()
+
+    # bcrypt runs on its own pool so it never blocks the event loop
+    valid, new_hash = await passwords.verify_and_update(
+        login_data.password, user.hashed_password if user else None
+    )
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    login_limiter.reset(login_data.username)
+
+    if new_hash:
+        # The work factor changed since this hash was created
+        user.hashed_password = new_hash
+        await db.commit()
     
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
@@ -242,6 +506,16 @@ def login(login_data: LoginRequest, db: Session = Depends(database.get_db)):
         "is_admin": user.is_admin
     }
 
+@app.get("/api/auth/cache-stats")
+def get_auth_cache_stats(current_user: database.User = Depends(get_current_user)):
+    """Hit/miss counters for the authenticated-user cache"""
+    return auth_cache.stats()
+
+@app.get("/api/cache/stats")
+def get_response_cache_stats(current_user: database.User = Depends(get_current_user)):
+    """Hit/miss counters for the read-endpoint response cache"""
+    return response_cache.stats()
+
 @app.get("/api/auth/me")
 def get_current_user_info(current_user: database.User = Depends(get_current_user)):
     """Get current logged-in user info"""
@@ -290,26 +564,137 @@ def create_client(client: ClientCreate, db: Session = Depends(database.get_db),
     db.add(db_client)
     db.commit()
     db.refresh(db_client)
+    invalidate_responses()
     
     return db_client
 
+@app.post("/api/clients/import")
+def import_clients(
+    file: UploadFile = File(...),
+    format: Optional[str] = Query(None, description="csv or ndjson; inferred from the file name if omitted"),
+    chunk_size: int = Query(importers.DEFAULT_CHUNK_SIZE, ge=1, le=10000),
+    db: Session = Depends(database.get_db),
+    current_user: database.User = Depends(get_current_user)
+):
+    """
+    Bulk-register clients from a CSV or NDJSON upload.
+    Valid rows are scored and inserted chunk by chunk; invalid rows are
+    returned in a per-row error report.
+    """
+    fmt = (format or importers.detect_format(file.filename, file.content_type) or "").lower()
+    if fmt not in importers.SUPPORTED_FORMATS:
+        raise HTTPException(status_code=400, detail="Unsupported format. Use csv or ndjson")
+
+    try:
+        return importers.import_clients(db, file.file, fmt, ClientCreate, risk_scorer, chunk_size)
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="File must be UTF-8 encoded")
+    finally:
+        # Chunks are committed as they go, so refresh even after a failure
+        invalidate_responses()
+
+@app.post("/api/clients/rescore")
+def rescore_clients(chunk_size: int = Query(1000, ge=1, le=10000), db: Session = Depends(database.get_db), current_user: database.User = Depends(get_current_user)):
+    """
+    Re-score every client in chunks using the batch risk scorer
+    """
+    scored = 0
+    updated = 0
+    last_id = 0
+    while True:
+        rows = db.query(
+            database.Client.id,
+            database.Client.monthly_income,
+            database.Client.employment_status,
+            database.Client.existing_loans,
+            database.Client.credit_history,
+            database.Client.risk_score,
+            database.Client.risk_level
+        ).filter(database.Client.id > last_id).order_by(database.Client.id).limit(chunk_size).all()
+        if not rows:
+            break
+
+        risk_scores, risk_levels = risk_scorer.score_batch({
+            'monthly_income': [row.monthly_income for row in rows],
+            'employment_status': [row.employment_status for row in rows],
+            'existing_loans': [row.existing_loans or 0 for row in rows],
+            'credit_history': [row.credit_history for row in rows]
+        })
+        changes = [
+            {"id": row.id, "risk_score": risk_score, "risk_level": risk_level}
+            for row, risk_score, risk_level in zip(rows, risk_scores, risk_levels)
+            if row.risk_score != risk_score or row.risk_level != risk_level
+        ]
+        if changes:
+            db.bulk_update_mappings(database.Client, changes)
+            db.commit()
+            invalidate_responses(clients=[change["id"] for change in changes])
+
+        scored += len(rows)
+        updated += len(changes)
+        last_id = rows[-1].id
+
+    return {"message": f"Re-scored {scored} clients", "scored": scored, "updated": updated}
+
+def decode_cursor(cursor: Optional[str]) -> Optional[int]:
+    if cursor is None:
+        return None
+    try:
+        return listings.decode_cursor(cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
 @app.get("/api/clients/", response_model=List[ClientResponse])
-def get_all_clients(skip: int = 0, limit: int = 100, db: Session = Depends(database.get_db), current_user: database.User = Depends(get_current_user)):
+async def get_all_clients(
+    response: Response,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    risk_level: Optional[str] = None,
+    employment_status: Optional[str] = None,
+    credit_history: Optional[str] = None,
+    db: AsyncSession = Depends(database.get_async_db),
+    current_user: database.User = Depends(get_current_user_async)
+):
     """
-    Get all registered clients
+    Get registered clients, one page at a time.
+    Pass the X-Next-Cursor response header back as `cursor` to fetch the next page.
     """
-    clients = db.query(database.Client).offset(skip).limit(limit).all()
+    stmt = listings.clients_query(decode_cursor(cursor), limit, risk_level, employment_status, credit_history)
+    clients, next_cursor = listings.split_page((await db.execute(stmt)).scalars().all(), limit)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     return clients
 
+@app.get("/api/clients/search", response_model=List[ClientResponse])
+async def search_clients(
+    q: str = Query(..., description="Name, CNIC, phone or address; each word matches as a prefix"),
+    limit: int = Query(20, ge=1, le=search.MAX_RESULTS),
+    db: AsyncSession = Depends(database.get_async_db),
+    current_user: database.User = Depends(get_current_user_async)
+):
+    """
+    Search all clients by name, CNIC, phone or address, best match first
+    """
+    try:
+        return await db.run_sync(search.search_clients, q, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @app.get("/api/clients/{client_id}", response_model=ClientResponse)
-def get_client(client_id: int, db: Session = Depends(database.get_db), current_user: database.User = Depends(get_current_user)):
+def get_client(client_id: int, request: Request, db: Session = Depends(database.get_db), current_user: database.User = Depends(get_current_user)):
     """
     Get a specific client by ID
     """
+    key = f"client:{client_id}"
+    generation = response_cache.generation
+    cached = cached_response(request, key)
+    if cached:
+        return cached
+
     client = db.query(database.Client).filter(database.Client.id == client_id).first()
     if not client:
         raise HTTPException(status_code=404, detail="Client not found")
-    return client
+    return store_response(request, key, ClientResponse.model_validate(client), generation)
 
 @app.put("/api/clients/{client_id}", response_model=ClientResponse)
 def update_client(client_id: int, updated_client: ClientUpdate, db: Session = Depends(database.get_db), current_user: database.User = Depends(get_current_user)):
@@ -340,6 +725,7 @@ def update_client(client_id: int, updated_client: ClientUpdate, db: Session = De
         client.risk_score, client.risk_level = risk_scorer.calculate_risk_score(client_data)
 
     db.commit()
+    invalidate_responses(clients=[client_id])
     db.refresh(client)
     return client
 
@@ -352,14 +738,44 @@ def delete_client(client_id: int, db: Session = Depends(database.get_db), curren
     if not client:
         raise HTTPException(status_code=404, detail="Client not found")
 
+    loan_ids = [loan.id for loan in client.loans]
     db.delete(client)
+    summaries.refresh_loans(db, loan_ids)
     db.commit()
+    invalidate_responses(clients=[client_id], loans=loan_ids, client_loans=[client_id])
     return {"message": "Client deleted successfully"}
 
 # ============================================
 # MODULE 2: Loan Application & Smart Schedule Generation
 # ============================================
 
+def validate_loan_terms(duration_months, repayment_method, grace_period_months):
+    try:
+        schedules.validate_terms(duration_months, repayment_method, grace_period_months)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def build_loan(loan: LoanCreate) -> database.Loan:
+    """Create an unsaved Loan with its monthly installment and opening balance calculated"""
+    terms = (loan.loan_amount, loan.interest_rate, loan.duration_months, loan.repayment_method, loan.grace_period_months)
+    monthly_installment = schedules.monthly_installment(*terms)
+    total_due = round(schedules.total_payable(*terms), 2)
+    return database.Loan(
+        client_id=loan.client_id,
+        loan_amount=loan.loan_amount,
+        loan_type=loan.loan_type,
+        interest_rate=loan.interest_rate,
+        duration_months=loan.duration_months,
+        monthly_installment=round(monthly_installment, 2),
+        repayment_method=loan.repayment_method,
+        grace_period_months=loan.grace_period_months,
+        start_date=loan.start_date,
+        status="Active",
+        total_due=total_due,
+        amount_paid=0.0,
+        outstanding_balance=total_due
+    )
+
 @app.post("/api/loans/suggest")
 def get_loan_suggestions(request: LoanSuggestionRequest, db: Session = Depends(database.get_db), current_user: database.User = Depends(get_current_user)):
     """
@@ -377,9 +793,32 @@ def get_loan_suggestions(request: LoanSuggestionRequest, db: Session = Depends(d
         'credit_history': client.credit_history
     }
     
-    suggestions = risk_scorer.suggest_loan_terms(client_data, request.loan_amount)
+    try:
+        suggestions = risk_scorer.suggest_loan_terms(
+            client_data, request.loan_amount, request.repayment_method, request.grace_period_months
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     return suggestions
 
+@app.get("/api/risk-scoring/config")
+def get_risk_scoring_config(current_user: database.User = Depends(get_current_user)):
+    """
+    The scoring config in use, when it was loaded and the memoization hit/miss counters
+    """
+    return risk_scorer.status()
+
+@app.post("/api/risk-scoring/reload")
+def reload_risk_scoring_config(current_user: database.User = Depends(get_current_user)):
+    """
+    Reload the scoring config now instead of waiting for the file change to be noticed.
+    Stored client scores keep their values until POST /api/clients/rescore.
+    """
+    try:
+        return risk_scorer.reload()
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @app.post("/api/loans/", response_model=LoanResponse)
 def create_loan(loan: LoanCreate, db: Session = Depends(database.get_db), current_user: database.User = Depends(get_current_user)):
     """
@@ -389,63 +828,92 @@ def create_loan(loan: LoanCreate, db: Session = Depends(database.get_db), curren
     client = db.query(database.Client).filter(database.Client.id == loan.client_id).first()
     if not client:
         raise HTTPException(status_code=404, detail="Client not found")
+    validate_loan_terms(loan.duration_months, loan.repayment_method, loan.grace_period_months)
     
-    # Calculate monthly installment
-    # Using simple interest formula: Total = Principal + (Principal * Rate * Time)
-    total_interest = loan.loan_amount * (loan.interest_rate / 100) * (loan.duration_months / 12)
-    total_amount = loan.loan_amount + total_interest
-    monthly_installment = total_amount / loan.duration_months
-    
-    # Create loan
-    db_loan = database.Loan(
-        client_id=loan.client_id,
-        loan_amount=loan.loan_amount,
-        loan_type=loan.loan_type,
-        interest_rate=loan.interest_rate,
-        duration_months=loan.duration_months,
-        monthly_installment=round(monthly_installment, 2),
-        start_date=loan.start_date,
-        status="Active"
-    )
-    
+    db_loan = build_loan(loan)
     db.add(db_loan)
-    db.commit()
-    db.refresh(db_loan)
+    db.flush()
     
     # Generate repayment schedule (installments)
-    for i in range(loan.duration_months):
-        due_date = loan.start_date + timedelta(days=30 * (i + 1))  # Approximate monthly
-        installment = database.Installment(
-            loan_id=db_loan.id,
-            installment_number=i + 1,
-            due_date=due_date,
-            amount=round(monthly_installment, 2),
-            paid=False,
-            is_overdue=False
-        )
-        db.add(installment)
+    schedules.insert_schedules(db, [db_loan])
     
+    summaries.refresh_loans(db, [db_loan.id])
     db.commit()
+    invalidate_responses(client_loans=[loan.client_id])
+    db.refresh(db_loan)
     
     return db_loan
 
-@app.get("/api/loans/", response_model=List[LoanResponse])
-def get_all_loans(skip: int = 0, limit: int = 100, db: Session = Depends(database.get_db), current_user: database.User = Depends(get_current_user)):
+@app.post("/api/loans/bulk", response_model=List[LoanResponse])
+def create_loans_bulk(loans: List[LoanCreate], db: Session = Depends(database.get_db), current_user: database.User = Depends(get_current_user)):
     """
-    Get all loans
+    Disburse many loans at once (e.g. group-lending days).
+    All loans and their schedules are written in a single transaction.
     """
-    loans = db.query(database.Loan).offset(skip).limit(limit).all()
+    if not loans:
+        return []
+    for loan in loans:
+        validate_loan_terms(loan.duration_months, loan.repayment_method, loan.grace_period_months)
+
+    client_ids = {loan.client_id for loan in loans}
+    found = {row.id for row in db.query(database.Client.id).filter(database.Client.id.in_(client_ids)).all()}
+    missing = sorted(client_ids - found)
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Clients not found: {missing}")
+
+    db_loans = [build_loan(loan) for loan in loans]
+    db.add_all(db_loans)
+    db.flush()
+
+    schedules.insert_schedules(db, db_loans)
+    summaries.refresh_loans(db, [db_loan.id for db_loan in db_loans])
+
+    # Serialize before commit expires the objects, to avoid reloading each loan
+    response = [LoanResponse.model_validate(db_loan) for db_loan in db_loans]
+    db.commit()
+    invalidate_responses(client_loans=client_ids)
+    return response
+
+@app.get("/api/loans/", response_model=List[LoanListItem])
+async def get_all_loans(
+    response: Response,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    status: Optional[str] = None,
+    loan_type: Optional[str] = None,
+    client_id: Optional[int] = None,
+    db: AsyncSession = Depends(database.get_async_db),
+    current_user: database.User = Depends(get_current_user_async)
+):
+    """
+    Get loans with their client's name, one page at a time.
+    Pass the X-Next-Cursor response header back as `cursor` to fetch the next page.
+    """
+    stmt = listings.loans_query(decode_cursor(cursor), limit, status, loan_type, client_id, with_client_name=True)
+    rows = (await db.execute(stmt)).all()
+    loans, next_cursor = listings.split_page(
+        [LoanListItem(**LoanResponse.model_validate(loan).model_dump(), client_name=name) for loan, name in rows],
+        limit,
+    )
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     return loans
 
 @app.get("/api/loans/{loan_id}", response_model=LoanResponse)
-def get_loan(loan_id: int, db: Session = Depends(database.get_db), current_user: database.User = Depends(get_current_user)):
+def get_loan(loan_id: int, request: Request, db: Session = Depends(database.get_db), current_user: database.User = Depends(get_current_user)):
     """
     Get a specific loan by ID
     """
+    key = f"loan:{loan_id}"
+    generation = response_cache.generation
+    cached = cached_response(request, key)
+    if cached:
+        return cached
+
     loan = db.query(database.Loan).filter(database.Loan.id == loan_id).first()
     if not loan:
         raise HTTPException(status_code=404, detail="Loan not found")
-    return loan
+    return store_response(request, key, LoanResponse.model_validate(loan), generation)
 
 @app.put("/api/loans/{loan_id}", response_model=LoanResponse)
 def update_loan(loan_id: int, updated_loan: LoanUpdate, db: Session = Depends(database.get_db), current_user: database.User = Depends(get_current_user)):
@@ -461,35 +929,25 @@ def update_loan(loan_id: int, updated_loan: LoanUpdate, db: Session = Depends(da
         return loan
 
     regenerate_schedule = any(
-        field in update_payload for field in ["loan_amount", "interest_rate", "duration_months", "start_date"]
+        field in update_payload
+        for field in ["loan_amount", "interest_rate", "duration_months", "start_date", "repayment_method", "grace_period_months"]
     )
 
     for field, value in update_payload.items():
         setattr(loan, field, value)
 
     if regenerate_schedule:
-        if loan.duration_months <= 0:
-            raise HTTPException(status_code=400, detail="Duration must be greater than zero")
-        total_interest = loan.loan_amount * (loan.interest_rate / 100) * (loan.duration_months / 12)
-        total_amount = loan.loan_amount + total_interest
-        monthly_installment = total_amount / loan.duration_months
+        validate_loan_terms(loan.duration_months, loan.repayment_method, loan.grace_period_months)
+        monthly_installment = schedules.monthly_installment(
+            loan.loan_amount, loan.interest_rate, loan.duration_months, loan.repayment_method, loan.grace_period_months
+        )
         loan.monthly_installment = round(monthly_installment, 2)
+        schedules.replace_schedule(db, loan)
 
-        db.query(database.Installment).filter(database.Installment.loan_id == loan.id).delete()
-        for i in range(loan.duration_months):
-            due_date = loan.start_date + timedelta(days=30 * (i + 1))
-            installment = database.Installment(
-                loan_id=loan.id,
-                installment_number=i + 1,
-                due_date=due_date,
-                amount=round(monthly_installment, 2),
-                paid=False,
-                is_overdue=False
-            )
-            db.add(installment)
-
+    summaries.refresh_loans(db, [loan.id])
     db.commit()
     db.refresh(loan)
+    invalidate_responses(loans=[loan_id], client_loans=[loan.client_id])
     return loan
 
 @app.delete("/api/loans/{loan_id}")
@@ -501,103 +959,201 @@ def delete_loan(loan_id: int, db: Session = Depends(database.get_db), current_us
     if not loan:
         raise HTTPException(status_code=404, detail="Loan not found")
 
+    client_id = loan.client_id
     db.delete(loan)
+    summaries.refresh_loans(db, [loan_id])
     db.commit()
+    invalidate_responses(loans=[loan_id], client_loans=[client_id])
     return {"message": "Loan deleted successfully"}
 
 @app.get("/api/clients/{client_id}/loans", response_model=List[LoanResponse])
-def get_client_loans(client_id: int, db: Session = Depends(database.get_db), current_user: database.User = Depends(get_current_user)):
+def get_client_loans(client_id: int, request: Request, db: Session = Depends(database.get_db), current_user: database.User = Depends(get_current_user)):
     """
     Get all loans for a specific client
     """
+    key = f"client_loans:{client_id}"
+    generation = response_cache.generation
+    cached = cached_response(request, key)
+    if cached:
+        return cached
+
     loans = db.query(database.Loan).filter(database.Loan.client_id == client_id).all()
-    return loans
+    return store_response(request, key, [LoanResponse.model_validate(loan) for loan in loans], generation)
+
+@app.get("/api/clients/{client_id}/overview", response_model=ClientOverviewResponse)
+def get_client_overview(client_id: int, db: Session = Depends(database.get_db), current_user: database.User = Depends(get_current_user)):
+    """
+    Client 360: the client, all their loans with installment summaries, next
+    payment due, default alerts and probabilities, in one response
+    """
+    result = overview.client_overview(db, client_id, alert_system)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Client not found")
+    return ClientOverviewResponse(
+        client=ClientResponse.model_validate(result["client"]),
+        loans=[
+            LoanOverview(**LoanResponse.model_validate(item["loan"]).model_dump(), installments=item["installments"], risk=item["risk"])
+            for item in result["loans"]
+        ],
+        totals=result["totals"],
+    )
 
 # ============================================
 # MODULE 3: Repayment Tracking & Default Alerts
 # ============================================
 
 @app.get("/api/loans/{loan_id}/installments", response_model=List[InstallmentResponse])
-def get_loan_installments(loan_id: int, db: Session = Depends(database.get_db), current_user: database.User = Depends(get_current_user)):
+async def get_loan_installments(loan_id: int, request: Request, db: AsyncSession = Depends(database.get_async_db), current_user: database.User = Depends(get_current_user_async)):
     """
     Get all installments for a specific loan
     """
-    loan = db.query(database.Loan).filter(database.Loan.id == loan_id).first()
-    if not loan:
+    key = f"loan_installments:{loan_id}"
+    generation = response_cache.generation
+    cached = cached_response(request, key)
+    if cached:
+        return cached
+
+    loan_exists = (await db.execute(select(database.Loan.id).where(database.Loan.id == loan_id))).first()
+    if not loan_exists:
         raise HTTPException(status_code=404, detail="Loan not found")
     
-    installments = db.query(database.Installment).filter(database.Installment.loan_id == loan_id).all()
-    return installments
+    # Without an ORDER BY SQLite returns rows in whichever index it reads,
+    # e.g. idx_installments_loan_paid puts unpaid installments first
+    result = await db.execute(
+        select(database.Installment)
+        .where(database.Installment.loan_id == loan_id)
+        .order_by(database.Installment.installment_number)
+    )
+    installments = [InstallmentResponse.model_validate(inst) for inst in result.scalars().all()]
+    return store_response(request, key, installments, generation)
+
+@app.get("/api/exports/installments")
+def export_installments(
+    format: str = Query("csv", description="csv or ndjson"),
+    due_from: Optional[datetime] = None,
+    due_to: Optional[datetime] = Query(None, description="Exclusive upper bound on due_date"),
+    loan_status: Optional[str] = None,
+    loan_id: Optional[int] = None,
+    current_user: database.User = Depends(get_current_user)
+):
+    """
+    Stream repayment schedules for all loans (optionally a due-date range) as CSV or NDJSON
+    """
+    fmt = format.lower()
+    if fmt not in exports.SUPPORTED_FORMATS:
+        raise HTTPException(status_code=400, detail="Unsupported format. Use csv or ndjson")
+
+    filename = f"installments-{datetime.utcnow():%Y%m%d-%H%M%S}.{fmt}"
+    return StreamingResponse(
+        exports.stream_installments(fmt, due_from=due_from, due_to=due_to, loan_status=loan_status, loan_id=loan_id),
+        media_type=exports.SUPPORTED_FORMATS[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
 
 @app.put("/api/installments/{installment_id}/pay")
-def mark_installment_paid(installment_id: int, db: Session = Depends(database.get_db), current_user: database.User = Depends(get_current_user)):
+def mark_installment_paid(
+    installment_id: int,
+    amount: Optional[float] = Query(None, gt=0, description="Defaults to what is still owed; less records a partial payment"),
+    db: Session = Depends(database.get_db),
+    current_user: database.User = Depends(get_current_user)
+):
     """
-    Mark an installment as paid
+    Record a payment against an installment, in full or in part
     """
     installment = db.query(database.Installment).filter(database.Installment.id == installment_id).first()
     if not installment:
         raise HTTPException(status_code=404, detail="Installment not found")
+    if installment.paid:
+        return {"message": "Installment is already paid", "installment": installment}
+
+    owed = round(installment.amount - (installment.amount_paid or 0), 2)
+    amount = owed if amount is None else round(amount, 2)
+    if amount > owed + ledger.TOLERANCE:
+        raise HTTPException(status_code=400, detail=f"Amount is more than the {owed:.2f} still owed")
+
+    loan_id = installment.loan_id
+    ledger.record(db, [ledger.Entry(installment.id, loan_id, amount, datetime.utcnow())])
     
-    installment.paid = True
-    installment.paid_date = datetime.utcnow()
-    installment.is_overdue = False
-    
+    # Complete the loan if nothing is left unpaid
+    clients, _ = repayments.complete_loans(db, [loan_id])
+    client_id = clients[loan_id]
+    summaries.refresh_loans(db, [loan_id])
     db.commit()
+    invalidate_responses(loans=[loan_id], client_loans=[client_id])
     db.refresh(installment)
     
-    # Check if all installments are paid
-    loan = db.query(database.Loan).filter(database.Loan.id == installment.loan_id).first()
-    all_installments = db.query(database.Installment).filter(database.Installment.loan_id == installment.loan_id).all()
-    
-    if all(inst.paid for inst in all_installments):
-        loan.status = "Completed"
-        db.commit()
-    
-    return {"message": "Installment marked as paid", "installment": installment}
+    message = "Installment marked as paid" if installment.paid else f"Partial payment of {amount:.2f} recorded"
+    return {"message": message, "installment": installment}
+
+@app.post("/api/payments/bulk")
+def post_bulk_payments(records: List[PaymentRecord], db: Session = Depends(database.get_db), current_user: database.User = Depends(get_current_user)):
+    """
+    Post a batch of repayments (e.g. a collection-day upload) in one transaction.
+    Each record names an installment by `installment_id` or by `loan_id` and
+    `installment_number`; the response has a result per record, in order.
+    """
+    if len(records) > repayments.MAX_BATCH_SIZE:
+        raise HTTPException(status_code=400, detail=f"At most {repayments.MAX_BATCH_SIZE} records per batch")
+
+    report = repayments.post_payments(db, records)
+    if report["posted"]:
+        loan_ids = {result["loan_id"] for result in report["results"] if result["status"] in ("paid", "partial")}
+        invalidate_responses(loans=loan_ids, client_loans=report.pop("client_ids"))
+    else:
+        report.pop("client_ids")
+    return report
+
+@app.get("/api/loans/{loan_id}/payments", response_model=List[PaymentResponse])
+def get_loan_payments(loan_id: int, db: Session = Depends(database.get_db), current_user: database.User = Depends(get_current_user)):
+    """
+    Payment history for a loan from the payments ledger, oldest first
+    """
+    if not db.query(database.Loan.id).filter(database.Loan.id == loan_id).first():
+        raise HTTPException(status_code=404, detail="Loan not found")
+    return db.query(database.Payment).filter(database.Payment.loan_id == loan_id).order_by(
+        database.Payment.paid_at, database.Payment.id
+    ).all()
 
 @app.put("/api/loans/{loan_id}/mark-all-paid")
 def mark_all_installments_paid(loan_id: int, db: Session = Depends(database.get_db), current_user: database.User = Depends(get_current_user)):
     """
-    Mark every installment for a loan as paid (bulk close)
+    Pay off everything still owed on a loan (bulk close)
     """
     loan = db.query(database.Loan).filter(database.Loan.id == loan_id).first()
     if not loan:
         raise HTTPException(status_code=404, detail="Loan not found")
 
-    installments = db.query(database.Installment).filter(database.Installment.loan_id == loan_id).all()
-    updated = 0
+    Installment = database.Installment
+    unpaid = db.query(Installment.id, Installment.amount, Installment.amount_paid).filter(
+        Installment.loan_id == loan_id, Installment.paid == False
+    ).all()
     now = datetime.utcnow()
-    for inst in installments:
-        if not inst.paid:
-            inst.paid = True
-            inst.paid_date = now
-            inst.is_overdue = False
-            updated += 1
+    updated = ledger.record(db, [
+        ledger.Entry(inst.id, loan_id, round(inst.amount - (inst.amount_paid or 0), 2), now) for inst in unpaid
+    ], source="mark_all_paid", now=now)
 
     loan.status = "Completed"
+    client_id = loan.client_id
+    summaries.refresh_loans(db, [loan_id])
     db.commit()
+    invalidate_responses(loans=[loan_id], client_loans=[client_id])
 
     return {"message": f"Marked {updated} installments as paid", "completed": True}
 
 @app.put("/api/installments/update-overdue")
-def update_overdue_status(db: Session = Depends(database.get_db), current_user: database.User = Depends(get_current_user)):
+def update_overdue_status(current_user: database.User = Depends(get_current_user)):
     """
-    Update overdue status for all unpaid installments
+    Run the overdue sweep now instead of waiting for the next scheduled run
     """
-    current_date = datetime.utcnow()
-    installments = db.query(database.Installment).filter(
-        database.Installment.paid == False,
-        database.Installment.due_date < current_date
-    ).all()
-    
-    count = 0
-    for installment in installments:
-        installment.is_overdue = True
-        count += 1
-    
-    db.commit()
-    
-    return {"message": f"Updated {count} overdue installments"}
+    result = overdue_job.run_now()
+    return {"message": f"Updated {result['rows_affected']} overdue installments", **result}
+
+@app.get("/api/installments/overdue-sweep")
+def get_overdue_sweep_stats(current_user: database.User = Depends(get_current_user)):
+    """
+    Statistics for the background overdue sweep (last run time, duration, rows affected)
+    """
+    return overdue_job.stats()
 
 @app.get("/api/loans/{loan_id}/alerts")
 def get_loan_alerts(loan_id: int, db: Session = Depends(database.get_db), current_user: database.User = Depends(get_current_user)):
@@ -614,23 +1170,25 @@ def get_loan_alerts(loan_id: int, db: Session = Depends(database.get_db), curren
         'loan_amount': loan.loan_amount
     }
     
-    # Get installments data
-    installments = db.query(database.Installment).filter(database.Installment.loan_id == loan_id).all()
-    installments_data = [
-        {
-            'paid': inst.paid,
-            'is_overdue': inst.is_overdue,
-            'due_date': inst.due_date.isoformat()
-        }
-        for inst in installments
-    ]
+    # Installment counts from the loan's summary row instead of loading every installment
+    summary = db.query(database.LoanSummary).filter(database.LoanSummary.loan_id == loan_id).first()
+    if summary:
+        counts = {field: getattr(summary, field) for field in ("installment_count", "paid_count", "overdue_count")}
+    else:
+        counts = summaries.compute_loan_values(db, [loan_id])[loan_id]
+    recent = db.query(database.Installment.paid).filter(database.Installment.loan_id == loan_id).order_by(
+        database.Installment.due_date.desc()
+    ).limit(3).all()
+    recent_unpaid = sum(1 for inst in recent if not inst.paid)
     
     # Get client risk score
     client_risk_score = loan.client.risk_score or 50
-    overdue_count = sum(1 for inst in installments if inst.is_overdue and not inst.paid)
+    overdue_count = counts["overdue_count"]
     
     # Generate alerts
-    alerts = alert_system.check_default_risk(loan_data, installments_data)
+    alerts = alert_system.check_default_risk_from_stats(
+        overdue_count, counts["paid_count"], counts["installment_count"], recent_unpaid
+    )
     default_probability = alert_system.calculate_default_probability(loan_data, client_risk_score, overdue_count)
     
     return {
@@ -638,123 +1196,131 @@ def get_loan_alerts(loan_id: int, db: Session = Depends(database.get_db), curren
         "alerts": alerts,
         "default_probability": default_probability,
         "overdue_installments": overdue_count,
-        "total_installments": len(installments)
+        "total_installments": counts["installment_count"],
+        "amount_paid": loan.amount_paid,
+        "outstanding_balance": loan.outstanding_balance
     }
 
 @app.get("/api/alerts/all")
-def get_all_alerts(db: Session = Depends(database.get_db), current_user: database.User = Depends(get_current_user)):
+async def get_all_alerts(
+    min_overdue: int = Query(1, ge=1),
+    risk_level: Optional[str] = None,
+    cursor: Optional[int] = None,
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    db: AsyncSession = Depends(database.get_async_db),
+    current_user: database.User = Depends(get_current_user_async)
+):
     """
-    Get alerts for all active loans
+    Get alerts for all active loans with overdue installments.
+    Optionally filter by minimum overdue count and client risk level, and page
+    through results with `limit` and the returned `next_cursor`.
     """
-    loans = db.query(database.Loan).filter(database.Loan.status == "Active").all()
-    all_alerts = []
-    
-    for loan in loans:
-        installments = db.query(database.Installment).filter(database.Installment.loan_id == loan.id).all()
-        overdue_count = sum(1 for inst in installments if inst.is_overdue and not inst.paid)
-        
-        if overdue_count > 0:
-            all_alerts.append({
-                "loan_id": loan.id,
-                "client_name": loan.client.name,
-                "client_id": loan.client_id,
-                "overdue_count": overdue_count,
-                "loan_amount": loan.loan_amount,
-                "risk_level": loan.client.risk_level
-            })
-    
-    return {"alerts": all_alerts, "total_count": len(all_alerts)}
+    all_alerts, next_cursor = await db.run_sync(
+        analytics.overdue_alerts, min_overdue, risk_level, cursor, limit
+    )
+    # total_count covers every page, not just this one
+    if cursor is None and next_cursor is None:
+        total_count = len(all_alerts)
+    else:
+        total_count = await db.run_sync(analytics.overdue_alerts_count, min_overdue, risk_level)
+    return {"alerts": all_alerts, "total_count": total_count, "next_cursor": next_cursor}
+
+@app.post("/api/alerts/risk-scores/run")
+def run_default_risk_scores(current_user: database.User = Depends(get_current_user)):
+    """
+    Score every active loan's default probability now instead of waiting for the next scheduled run
+    """
+    result = default_risk_job.run_now()
+    return {"message": f"Scored {result['loans_scored']} active loans", **result}
+
+@app.get("/api/alerts/risk-scores/status")
+def get_default_risk_status(current_user: database.User = Depends(get_current_user)):
+    """
+    Statistics for the portfolio default-risk scoring job
+    """
+    return default_risk_job.stats()
+
+@app.get("/api/alerts/riskiest")
+async def get_riskiest_loans(
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    min_probability: Optional[float] = Query(None, ge=0, le=100),
+    risk_level: Optional[str] = None,
+    db: AsyncSession = Depends(database.get_async_db),
+    current_user: database.User = Depends(get_current_user_async)
+):
+    """
+    Active loans ranked by default probability from the latest scoring run.
+    Pass the returned `next_cursor` back as `cursor` to fetch the next page.
+    """
+    after_probability = after_loan_id = None
+    if cursor:
+        try:
+            position = listings.decode_position(cursor)
+            after_probability = float(position["p"])
+            after_loan_id = int(position["id"])
+        except (ValueError, KeyError, TypeError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    loans, next_position = await db.run_sync(
+        default_risk.riskiest_loans, after_probability, after_loan_id, limit, min_probability, risk_level
+    )
+    next_cursor = None
+    if next_position:
+        next_cursor = listings.encode_position({"p": next_position[0], "id": next_position[1]})
+    return {
+        "loans": loans,
+        "count": len(loans),
+        "next_cursor": next_cursor,
+    }
 
 # ============================================
 # MODULE 4: Dashboard & Analytics
 # ============================================
 
 @app.get("/api/dashboard/stats")
-def get_dashboard_stats(db: Session = Depends(database.get_db), current_user: database.User = Depends(get_current_user)):
+async def get_dashboard_stats(request: Request, db: AsyncSession = Depends(database.get_async_db), current_user: database.User = Depends(get_current_user_async)):
     """
     Get comprehensive dashboard statistics
     """
-    # Total clients
-    total_clients = db.query(database.Client).count()
-    
-    # Risk distribution
-    low_risk = db.query(database.Client).filter(database.Client.risk_level == "Low").count()
-    medium_risk = db.query(database.Client).filter(database.Client.risk_level == "Medium").count()
-    high_risk = db.query(database.Client).filter(database.Client.risk_level == "High").count()
-    
-    # Loan statistics
-    total_loans = db.query(database.Loan).count()
-    active_loans = db.query(database.Loan).filter(database.Loan.status == "Active").count()
-    completed_loans = db.query(database.Loan).filter(database.Loan.status == "Completed").count()
-    defaulted_loans = db.query(database.Loan).filter(database.Loan.status == "Defaulted").count()
-    
-    # Financial statistics
-    loans = db.query(database.Loan).all()
-    total_disbursed = sum(loan.loan_amount for loan in loans)
-    
-    # Calculate total expected and collected
-    total_expected = 0
-    total_collected = 0
-    current_year = datetime.utcnow().year
-    yearly_disbursed = 0
-    yearly_expected = 0
-    yearly_collected = 0
-    
-    for loan in loans:
-        installments = db.query(database.Installment).filter(database.Installment.loan_id == loan.id).all()
-        total_expected += sum(inst.amount for inst in installments)
-        total_collected += sum(inst.amount for inst in installments if inst.paid)
-
-        if loan.start_date.year == current_year:
-            yearly_disbursed += loan.loan_amount
-            yearly_expected += sum(inst.amount for inst in installments if inst.due_date.year == current_year)
-            yearly_collected += sum(
-                inst.amount for inst in installments if inst.paid and inst.paid_date and inst.paid_date.year == current_year
-            )
-    
-    # Active overdue count
-    overdue_count = db.query(database.Installment).filter(
-        database.Installment.is_overdue == True,
-        database.Installment.paid == False
-    ).count()
-    
-    # Loan type distribution
-    loan_types = {}
-    for loan in loans:
-        loan_types[loan.loan_type] = loan_types.get(loan.loan_type, 0) + 1
-    
-    return {
-        "clients": {
-            "total": total_clients,
-            "risk_distribution": {
-                "low": low_risk,
-                "medium": medium_risk,
-                "high": high_risk
-            }
-        },
-        "loans": {
-            "total": total_loans,
-            "active": active_loans,
-            "completed": completed_loans,
-            "defaulted": defaulted_loans
-        },
-        "financial": {
-            "total_disbursed": round(total_disbursed, 2),
-            "total_expected": round(total_expected, 2),
-            "total_collected": round(total_collected, 2),
-            "collection_rate": round((total_collected / total_expected * 100) if total_expected > 0 else 0, 2),
-            "yearly": {
-                "year": current_year,
-                "disbursed": round(yearly_disbursed, 2),
-                "expected": round(yearly_expected, 2),
-                "collected": round(yearly_collected, 2)
-            }
-        },
-        "alerts": {
-            "overdue_installments": overdue_count
-        },
-        "loan_types": loan_types
-    }
+    year = datetime.utcnow().year
+    key = f"dashboard:{year}"
+    generation = response_cache.generation
+    cached = cached_response(request, key)
+    if cached:
+        return cached
+
+    stats = await db.run_sync(summaries.dashboard_stats, year)
+    return store_response(request, key, stats, generation)
+
+@app.get("/api/cashflow/projection")
+async def get_cashflow_projection(
+    request: Request,
+    period: str = Query("month", description="day, week or month"),
+    start: Optional[date] = Query(None, description="First day of the projection (default today)"),
+    months: int = Query(6, ge=1, le=60),
+    group_by: Optional[str] = Query(None, description="loan_type or risk_level"),
+    stress: bool = Query(False, description="Add a scenario with rates raised by the stress-test delta"),
+    db: AsyncSession = Depends(database.get_async_db),
+    current_user: database.User = Depends(get_current_user_async)
+):
+    """
+    Expected collections from unpaid installments of active loans, per period
+    """
+    if period not in cashflow.PERIODS:
+        raise HTTPException(status_code=400, detail=f"period must be one of {', '.join(cashflow.PERIODS)}")
+    if group_by is not None and group_by not in cashflow.GROUP_BY:
+        raise HTTPException(status_code=400, detail=f"group_by must be one of {', '.join(cashflow.GROUP_BY)}")
+
+    start = start or datetime.utcnow().date()
+    key = f"cashflow:{period}:{start.isoformat()}:{months}:{group_by or 'all'}:{int(stress)}"
+    generation = response_cache.generation
+    cached = cached_response(request, key)
+    if cached:
+        return cached
+
+    projection = await db.run_sync(cashflow.project, period, start, months, group_by, stress)
+    return store_response(request, key, projection, generation)
 
 # ============================================
 # Health Check & Documentation
@@ -775,6 +1341,24 @@ def root():
 def health_check():
     return {"status": "healthy", "timestamp": datetime.utcnow().isoformat()}
 
+@app.get("/metrics")
+def prometheus_metrics(request: Request):
+    """Request latency, SQL statement count and DB time per route in Prometheus text format"""
+    if METRICS_TOKEN and not secrets.compare_digest(
+        request.headers.get("Authorization", ""), f"Bearer {METRICS_TOKEN}"
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid metrics token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return Response(metrics.registry.render_prometheus(), media_type="text/plain; version=0.0.4")
+
+@app.get("/api/metrics/summary")
+def metrics_summary(current_user: database.User = Depends(get_current_user)):
+    """Per-route latency and query-count summary (shown on /health.html)"""
+    return metrics.registry.summary()
+
 @app.get("/docs.html")
 def api_docs():
     """Serve the API documentation page"""
@@ -0,0 +1,281 @@
+"""
+Request and SQL instrumentation.
+
+MetricsMiddleware times every HTTP request and tags it with its route
+template. SQLAlchemy cursor events, installed on each engine with
+`instrument_engine`, add the statement count and database time to the
+request that issued them (tracked through a context variable, which follows
+the request into the threadpool and into async-session greenlets).
+
+`registry.render_prometheus()` produces the Prometheus text exposition
+format; `registry.summary()` is a compact JSON view. Requests slower than
+SLOW_REQUEST_MS are logged with their slowest SQL statements.
+"""
+import contextvars
+import logging
+import os
+import threading
+import time
+from collections import deque
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "1000"))
+SLOW_LOG_STATEMENTS = 5
+SQL_PREVIEW_CHARS = 500
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 250, 1000)
+
+
+class RequestStats:
+    """SQL activity of one request"""
+
+    __slots__ = ("statements", "db_seconds", "queries")
+
+    def __init__(self):
+        self.statements = 0
+        self.db_seconds = 0.0
+        self.queries = []  # (seconds, sql) kept for the slow-request log
+
+    def record(self, statement, seconds):
+        self.statements += 1
+        self.db_seconds += seconds
+        self.queries.append((seconds, statement))
+        if len(self.queries) > 4 * SLOW_LOG_STATEMENTS:
+            self.queries.sort(key=lambda query: query[0], reverse=True)
+            del self.queries[SLOW_LOG_STATEMENTS:]
+
+    def slowest(self, n=SLOW_LOG_STATEMENTS):
+        return sorted(self.queries, key=lambda query: query[0], reverse=True)[:n]
+
+
+current_request = contextvars.ContextVar("current_request_stats", default=None)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.total += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+
+    def cumulative(self):
+        running = 0
+        for bound, count in zip(self.buckets, self.counts):
+            running += count
+            yield bound, running
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-quantile (None when empty or beyond the last bucket)"""
+        if not self.total:
+            return None
+        rank = q * self.total
+        for bound, running in self.cumulative():
+            if running >= rank:
+                return bound
+        return None
+
+
+class RouteMetrics:
+    def __init__(self):
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.statements = Histogram(STATEMENT_BUCKETS)
+        self.db_seconds = 0.0
+        self.statuses = {}
+
+
+class MetricsRegistry:
+    def __init__(self, slow_request_ms=SLOW_REQUEST_MS):
+        self.slow_request_ms = slow_request_ms
+        self.started_at = time.time()
+        self._routes = {}
+        self._slow = deque(maxlen=50)
+        self._lock = threading.Lock()
+
+    def reset(self):
+        with self._lock:
+            self._routes.clear()
+            self._slow.clear()
+            self.started_at = time.time()
+
+    def observe(self, method, route, status, seconds, stats: RequestStats):
+        with self._lock:
+            metrics = self._routes.get((method, route))
+            if metrics is None:
+                metrics = self._routes[(method, route)] = RouteMetrics()
+            metrics.latency.observe(seconds)
+            metrics.statements.observe(stats.statements)
+            metrics.db_seconds += stats.db_seconds
+            metrics.statuses[status] = metrics.statuses.get(status, 0) + 1
+
+        if seconds * 1000 >= self.slow_request_ms:
+            self._log_slow(method, route, status, seconds, stats)
+
+    def _log_slow(self, method, route, status, seconds, stats):
+        slowest = stats.slowest()
+        self._slow.append({
+            "method": method,
+            "route": route,
+            "status": status,
+            "duration_ms": round(seconds * 1000, 1),
+            "statements": stats.statements,
+            "db_ms": round(stats.db_seconds * 1000, 1),
+            "at": time.time(),
+        })
+        lines = [
+            f"Slow request {method} {route} -> {status}: {seconds * 1000:.0f} ms, "
+            f"{stats.statements} statements, {stats.db_seconds * 1000:.0f} ms in the database"
+        ]
+        for query_seconds, sql in slowest:
+            preview = " ".join(sql.split())[:SQL_PREVIEW_CHARS]
+            lines.append(f"  {query_seconds * 1000:8.1f} ms  {preview}")
+        logger.warning("\n".join(lines))
+
+    def render_prometheus(self):
+        """Metrics in the Prometheus text exposition format"""
+        out = [
+            "# HELP sahulatfin_http_request_duration_seconds Request latency by route",
+            "# TYPE sahulatfin_http_request_duration_seconds histogram",
+        ]
+        with self._lock:
+            routes = sorted(self._routes.items())
+            for (method, route), metrics in routes:
+                labels = f'method="{method}",route="{_escape(route)}"'
+                for bound, running in metrics.latency.cumulative():
+                    out.append(f'sahulatfin_http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {running}')
+                out.append(f'sahulatfin_http_request_duration_seconds_bucket{{{labels},le="+Inf"}} {metrics.latency.total}')
+                out.append(f"sahulatfin_http_request_duration_seconds_sum{{{labels}}} {metrics.latency.sum:.6f}")
+                out.append(f"sahulatfin_http_request_duration_seconds_count{{{labels}}} {metrics.latency.total}")
+
+            out += [
+                "# HELP sahulatfin_db_statements_per_request SQL statements issued per request by route",
+                "# TYPE sahulatfin_db_statements_per_request histogram",
+            ]
+            for (method, route), metrics in routes:
+                labels = f'method="{method}",route="{_escape(route)}"'
+                for bound, running in metrics.statements.cumulative():
+                    out.append(f'sahulatfin_db_statements_per_request_bucket{{{labels},le="{bound}"}} {running}')
+                out.append(f'sahulatfin_db_statements_per_request_bucket{{{labels},le="+Inf"}} {metrics.statements.total}')
+                out.append(f"sahulatfin_db_statements_per_request_sum{{{labels}}} {metrics.statements.sum:.0f}")
+                out.append(f"sahulatfin_db_statements_per_request_count{{{labels}}} {metrics.statements.total}")
+
+            out += [
+                "# HELP sahulatfin_db_seconds_total Time spent executing SQL by route",
+                "# TYPE sahulatfin_db_seconds_total counter",
+            ]
+            for (method, route), metrics in routes:
+                labels = f'method="{method}",route="{_escape(route)}"'
+                out.append(f"sahulatfin_db_seconds_total{{{labels}}} {metrics.db_seconds:.6f}")
+
+            out += [
+                "# HELP sahulatfin_http_responses_total Responses by route and status code",
+                "# TYPE sahulatfin_http_responses_total counter",
+            ]
+            for (method, route), metrics in routes:
+                labels = f'method="{method}",route="{_escape(route)}"'
+                for status, count in sorted(metrics.statuses.items()):
+                    out.append(f'sahulatfin_http_responses_total{{{labels},status="{status}"}} {count}')
+        return "\n".join(out) + "\n"
+
+    def summary(self):
+        """Per-route request counts, latency and SQL figures, slowest routes first"""
+        with self._lock:
+            routes = []
+            for (method, route), metrics in self._routes.items():
+                count = metrics.latency.total
+                routes.append({
+                    "method": method,
+                    "route": route,
+                    "requests": count,
+                    "errors": sum(n for status, n in metrics.statuses.items() if status >= 500),
+                    "avg_ms": round(metrics.latency.sum / count * 1000, 2) if count else 0,
+                    "p95_ms_le": _ms(metrics.latency.quantile(0.95)),
+                    "avg_statements": round(metrics.statements.sum / count, 2) if count else 0,
+                    "avg_db_ms": round(metrics.db_seconds / count * 1000, 2) if count else 0,
+                })
+            slow = list(self._slow)
+        routes.sort(key=lambda route: route["avg_ms"], reverse=True)
+        return {
+            "uptime_seconds": round(time.time() - self.started_at),
+            "requests": sum(route["requests"] for route in routes),
+            "slow_request_ms": self.slow_request_ms,
+            "routes": routes,
+            "recent_slow_requests": slow[::-1],
+        }
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 1) if seconds is not None else None
+
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"')
+
+
+registry = MetricsRegistry()
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency and SQL activity per route"""
+
+    def __init__(self, app, registry=registry):
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = current_request.set(stats)
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            current_request.reset(token)
+            route = scope.get("route")
+            route_path = getattr(route, "path", None) or "unmatched"
+            self.registry.observe(scope["method"], route_path, status["code"], elapsed, stats)
+
+
+def instrument_engine(engine):
+    """Attribute each SQL statement run on `engine` (a sync Engine) to the current request"""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("metrics_query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get("metrics_query_start")
+        if not starts:
+            return
+        seconds = time.perf_counter() - starts.pop()
+        stats = current_request.get()
+        if stats is not None:
+            stats.record(statement, seconds)
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(exception_context):
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("metrics_query_start"):
+            conn.info["metrics_query_start"].pop()
@@ -0,0 +1,46 @@
+"""
+Set-based overdue sweep.
+
+Flags unpaid, past-due installments as overdue with a single UPDATE that
+only touches rows whose flag actually changes, then refreshes the portfolio
+summaries of the affected loans in the same transaction.
+"""
+from datetime import datetime
+from sqlalchemy import update, select, or_
+from sqlalchemy.orm import Session
+import database
+import summaries
+
+
+def _newly_overdue(now):
+    Installment = database.Installment
+    return (
+        Installment.paid == False,
+        Installment.due_date < now,
+        or_(Installment.is_overdue == False, Installment.is_overdue.is_(None)),
+    )
+
+
+def sweep(db: Session, now=None, on_commit=None):
+    """
+    Mark newly overdue installments and return the rows and loans affected.
+    `on_commit` is called with the affected loan ids once the change is committed.
+    """
+    now = now or datetime.utcnow()
+    Installment = database.Installment
+    stmt = update(Installment).where(*_newly_overdue(now)).values(is_overdue=True)
+
+    if db.get_bind().dialect.update_returning:
+        loan_ids = [row.loan_id for row in db.execute(stmt.returning(Installment.loan_id))]
+        rows_affected = len(loan_ids)
+    else:
+        loan_ids = db.execute(select(Installment.loan_id).where(*_newly_overdue(now)).distinct()).scalars().all()
+        rows_affected = db.execute(stmt).rowcount
+
+    affected_loans = set(loan_ids)
+    summaries.refresh_loans(db, affected_loans)
+    db.commit()
+    if on_commit is not None and affected_loans:
+        on_commit(affected_loans)
+
+    return {"rows_affected": rows_affected, "loans_affected": len(affected_loans)}
@@ -0,0 +1,150 @@
+"""
+Client 360 view.
+
+`client_overview` gathers a client, every one of their loans with its
+installment summary and next payment due, and each loan's default-risk
+alerts and probability. It uses the same five statements however many
+loans the client has:
+
+1. the client
+2. their loans (selectinload)
+3. the loans' `loan_summaries` rows (selectinload)
+4. the loans' `loan_risk_scores` snapshot rows (selectinload)
+5. one windowed query over the loans' installments for the next payment
+   due and the number of unpaid installments among the latest three
+
+Alerts come from the scoring job's snapshot when it is at least as recent as
+the loan's summary. Otherwise they are computed from the summary counts,
+with no further queries. The default probability is always recomputed, since
+it also depends on the client's risk score, which changes without touching
+the loan summaries (client edits, /api/clients/rescore).
+"""
+import json
+from datetime import datetime
+from types import SimpleNamespace
+from sqlalchemy import and_, case, func, select
+from sqlalchemy.orm import Session, selectinload
+import database
+import default_risk
+
+
+def installment_stats_query(loan_ids):
+    """Per loan: the next unpaid installment's due date and amount owed, and recent_unpaid"""
+    Installment = database.Installment
+    ranked = (
+        select(
+            Installment.loan_id,
+            Installment.paid,
+            Installment.due_date,
+            (Installment.amount - Installment.amount_paid).label("owed"),
+            func.row_number().over(
+                partition_by=Installment.loan_id, order_by=(Installment.due_date.desc(), Installment.id)
+            ).label("recency"),
+            # Unpaid installments sort first, so the first row is the next one due
+            func.row_number().over(
+                partition_by=Installment.loan_id, order_by=(Installment.paid, Installment.due_date, Installment.id)
+            ).label("upcoming"),
+        )
+        .where(Installment.loan_id.in_(loan_ids))
+        .subquery()
+    )
+    unpaid = ranked.c.paid == False
+    next_due = and_(ranked.c.upcoming == 1, unpaid)
+    return select(
+        ranked.c.loan_id,
+        func.sum(case((and_(ranked.c.recency <= 3, unpaid), 1), else_=0)).label("recent_unpaid"),
+        func.max(case((next_due, ranked.c.due_date))).label("next_due_date"),
+        func.max(case((next_due, ranked.c.owed))).label("next_due_amount"),
+    ).group_by(ranked.c.loan_id)
+
+
+def _is_current(snapshot, summary):
+    if snapshot is None:
+        return False
+    if summary is None or summary.updated_at is None:
+        return True
+    return snapshot.scored_at >= summary.updated_at
+
+
+def client_overview(db: Session, client_id: int, alert_system, now=None):
+    """
+    {"client", "loans", "totals"} for one client, or None when it does not
+    exist. Each loan entry holds the Loan plus "installments" and "risk" dicts.
+    """
+    Client = database.Client
+    Loan = database.Loan
+    client = db.execute(
+        select(Client)
+        .where(Client.id == client_id)
+        .options(selectinload(Client.loans).options(selectinload(Loan.summary), selectinload(Loan.risk_snapshot)))
+    ).scalar_one_or_none()
+    if client is None:
+        return None
+
+    loans = sorted(client.loans, key=lambda loan: loan.id)
+    stats = {}
+    if loans:
+        stats = {row.loan_id: row for row in db.execute(installment_stats_query([loan.id for loan in loans]))}
+
+    # Loans without a current snapshot are scored the way the job would score them
+    stale = []
+    for loan in loans:
+        if not _is_current(loan.risk_snapshot, loan.summary):
+            summary = loan.summary
+            row = stats.get(loan.id)
+            stale.append(SimpleNamespace(
+                loan_id=loan.id,
+                client_id=client.id,
+                status=loan.status,
+                loan_amount=loan.loan_amount,
+                risk_score=client.risk_score,
+                installment_count=summary.installment_count if summary else 0,
+                paid_count=summary.paid_count if summary else 0,
+                overdue_count=summary.overdue_count if summary else 0,
+                recent_unpaid=row.recent_unpaid if row else 0,
+            ))
+    live = {score["loan_id"]: score for score in default_risk.score_rows(stale, alert_system, now or datetime.utcnow())}
+
+    items = []
+    for loan in loans:
+        summary = loan.summary
+        row = stats.get(loan.id)
+        score = live.get(loan.id)
+        if score is None:
+            snapshot = loan.risk_snapshot
+            score = {field: getattr(snapshot, field) for field in ("highest_severity", "alerts", "scored_at")}
+            score["default_probability"] = alert_system.calculate_default_probability(
+                {"status": loan.status, "loan_amount": loan.loan_amount}, client.risk_score or 50, snapshot.overdue_count
+            )
+        items.append({
+            "loan": loan,
+            "installments": {
+                "total": summary.installment_count if summary else 0,
+                "paid": summary.paid_count if summary else 0,
+                "overdue": summary.overdue_count if summary else 0,
+                "expected_amount": summary.expected_amount if summary else 0,
+                "collected_amount": summary.collected_amount if summary else 0,
+                "overdue_amount": summary.overdue_amount if summary else 0,
+                "next_due_date": row.next_due_date if row else None,
+                "next_due_amount": round(row.next_due_amount, 2) if row and row.next_due_amount is not None else None,
+            },
+            "risk": {
+                "default_probability": score["default_probability"],
+                "highest_severity": score["highest_severity"],
+                "alerts": json.loads(score["alerts"]) if score["alerts"] else [],
+                "scored_at": score["scored_at"],
+            },
+        })
+
+    return {
+        "client": client,
+        "loans": items,
+        "totals": {
+            "loans": len(loans),
+            "active_loans": sum(1 for loan in loans if loan.status == "Active"),
+            "total_due": round(sum(loan.total_due or 0 for loan in loans), 2),
+            "amount_paid": round(sum(loan.amount_paid or 0 for loan in loans), 2),
+            "outstanding_balance": round(sum(loan.outstanding_balance or 0 for loan in loans), 2),
+            "overdue_installments": sum(item["installments"]["overdue"] for item in items),
+        },
+    }
@@ -0,0 +1,105 @@
+"""
+Password hashing and login throttling.
+
+bcrypt is deliberately slow, so verification runs on a small dedicated
+thread pool (bcrypt releases the GIL) instead of the request threadpool or
+the event loop. The work factor comes from BCRYPT_ROUNDS; stored hashes
+with a different cost are transparently rehashed on the next successful
+login.
+"""
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+from passlib.context import CryptContext
+import cache
+
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+BCRYPT_WORKERS = int(os.getenv("BCRYPT_WORKERS", "2"))
+
+# Failed logins allowed per username within the sliding window
+LOGIN_MAX_FAILURES = int(os.getenv("LOGIN_MAX_FAILURES", "5"))
+LOGIN_WINDOW_SECONDS = int(os.getenv("LOGIN_WINDOW_SECONDS", "300"))
+# Usernames tracked at once. Any username can be tried, including unknown
+# ones, so past this the least recently tried are forgotten rather than
+# letting the table grow without bound.
+LOGIN_TRACKED_USERNAMES = int(os.getenv("LOGIN_TRACKED_USERNAMES", "10000"))
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+
+_executor = ThreadPoolExecutor(max_workers=BCRYPT_WORKERS, thread_name_prefix="bcrypt")
+
+
+def _truncate(password: str) -> str:
+    # Bcrypt has a 72 byte limit, truncate if necessary
+    if len(password.encode('utf-8')) > 72:
+        password = password[:72]
+    return password
+
+
+def hash_password(password: str) -> str:
+    return pwd_context.hash(_truncate(password))
+
+
+def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return pwd_context.verify(plain_password, hashed_password)
+
+
+def _verify_and_update(plain_password: str, hashed_password: Optional[str]):
+    if hashed_password is None:
+        # Unknown user: spend the same time as a real check so usernames
+        # cannot be probed by timing
+        pwd_context.dummy_verify()
+        return False, None
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+
+async def verify_and_update(plain_password: str, hashed_password: Optional[str]):
+    """
+    Check a password on the bcrypt pool. Returns (valid, new_hash) where
+    new_hash is set when the stored hash should be replaced.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, _verify_and_update, plain_password, hashed_password)
+
+
+def shutdown():
+    _executor.shutdown(wait=False)
+
+
+class LoginRateLimiter:
+    """Sliding-window count of login attempts per username, in a bounded TTLCache"""
+
+    def __init__(self, max_failures=LOGIN_MAX_FAILURES, window_seconds=LOGIN_WINDOW_SECONDS,
+                 maxsize=LOGIN_TRACKED_USERNAMES):
+        self.max_failures = max_failures
+        self.window_seconds = window_seconds
+        # username -> deque of attempt times; an entry expires with its newest attempt
+        self._attempts = cache.TTLCache(maxsize=maxsize, default_ttl=window_seconds)
+        self._lock = threading.Lock()
+
+    def attempt(self, username: str) -> int:
+        """
+        Count a login attempt for `username` and return 0, or, when it is
+        throttled, return the seconds until it may try again without counting
+        one. Checking and counting share one lock, so concurrent attempts
+        cannot all get in before any of them is recorded. A successful login
+        calls reset(), so only failures stay counted.
+        """
+        now = time.time()
+        with self._lock:
+            attempts = self._attempts.get(username) or deque()
+            while attempts and attempts[0] <= now - self.window_seconds:
+                attempts.popleft()
+            if len(attempts) >= self.max_failures:
+                return max(1, int(attempts[0] + self.window_seconds - now) + 1)
+            attempts.append(now)
+            self._attempts.set(username, attempts, now + self.window_seconds)
+            return 0
+
+    def reset(self, username: str):
+        with self._lock:
+            self._attempts.delete(username)
@@ -0,0 +1,169 @@
+"""
+Bulk repayment posting.
+
+A batch of payment records (each naming an installment by id, or by loan id
+and installment number) is resolved with one lookup per chunk, validated,
+and posted to the payments ledger (ledger.py) in one transaction. A record
+may pay part of what is still owed on an installment. Loan completion is
+then re-checked only for the loans touched, with one grouped query, and
+every record gets its own result in input order.
+"""
+from datetime import datetime
+from sqlalchemy import case, func, select, tuple_, update
+from sqlalchemy.orm import Session
+import database
+import ledger
+import summaries
+
+MAX_BATCH_SIZE = 10000
+LOOKUP_CHUNK_SIZE = 500
+
+
+def _chunks(values, size=LOOKUP_CHUNK_SIZE):
+    values = list(values)
+    for i in range(0, len(values), size):
+        yield values[i:i + size]
+
+
+def _resolve(db: Session, records):
+    """Installment rows named by the records, keyed both by id and by (loan_id, installment_number)"""
+    Installment = database.Installment
+    ids = {record.installment_id for record in records if record.installment_id is not None}
+    pairs = {
+        (record.loan_id, record.installment_number)
+        for record in records
+        if record.installment_id is None and record.loan_id is not None and record.installment_number is not None
+    }
+    columns = (
+        Installment.id, Installment.loan_id, Installment.installment_number,
+        Installment.amount, Installment.amount_paid, Installment.paid,
+    )
+
+    rows = []
+    for chunk in _chunks(ids):
+        rows += db.execute(select(*columns).where(Installment.id.in_(chunk))).all()
+    for chunk in _chunks(pairs):
+        rows += db.execute(
+            select(*columns).where(tuple_(Installment.loan_id, Installment.installment_number).in_(chunk))
+        ).all()
+
+    by_id = {row.id: row for row in rows}
+    by_number = {(row.loan_id, row.installment_number): row for row in rows}
+    return by_id, by_number
+
+
+def complete_loans(db: Session, loan_ids):
+    """
+    Mark loans with no unpaid installments left as Completed, using one grouped
+    query. Returns {loan_id: client_id} for the loans checked and the ids completed.
+    """
+    Loan = database.Loan
+    Installment = database.Installment
+    loan_ids = list(loan_ids)
+    clients = {}
+    completed = []
+    for chunk in _chunks(loan_ids):
+        unpaid = func.coalesce(func.sum(case((Installment.paid == False, 1), else_=0)), 0)
+        rows = db.execute(
+            select(Loan.id, Loan.client_id, Loan.status, unpaid.label("unpaid"))
+            .outerjoin(Installment, Installment.loan_id == Loan.id)
+            .where(Loan.id.in_(chunk))
+            .group_by(Loan.id, Loan.client_id, Loan.status)
+        ).all()
+        for row in rows:
+            clients[row.id] = row.client_id
+            if row.unpaid == 0 and row.status != "Completed":
+                completed.append(row.id)
+
+    for chunk in _chunks(completed):
+        db.execute(update(Loan).where(Loan.id.in_(chunk)).values(status="Completed"))
+    return clients, completed
+
+
+def post_payments(db: Session, records, now=None):
+    """
+    Apply a batch of payment records in one transaction and return
+    {"posted", "failed", "completed_loans", "client_ids", "results"}.
+    Records need installment_id or loan_id + installment_number; amount and
+    paid_date are optional (whatever is still owed, now). A record for less
+    than the amount owed is posted as a partial payment.
+    """
+    now = now or datetime.utcnow()
+    by_id, by_number = _resolve(db, records)
+
+    results = []
+    entries = []
+    claimed = {}
+    for index, record in enumerate(records):
+        result = {
+            "index": index,
+            "installment_id": record.installment_id,
+            "loan_id": record.loan_id,
+            "installment_number": record.installment_number,
+        }
+        results.append(result)
+
+        if record.installment_id is not None:
+            row = by_id.get(record.installment_id)
+        elif record.loan_id is not None and record.installment_number is not None:
+            row = by_number.get((record.loan_id, record.installment_number))
+        else:
+            result.update(status="invalid", detail="Give installment_id, or loan_id and installment_number")
+            continue
+
+        if row is None:
+            result.update(status="not_found", detail="Installment not found")
+            continue
+        if record.loan_id is not None and record.loan_id != row.loan_id:
+            result.update(status="invalid", detail=f"Installment belongs to loan {row.loan_id}")
+            continue
+        result.update(installment_id=row.id, loan_id=row.loan_id, installment_number=row.installment_number)
+
+        if row.id in claimed:
+            result.update(status="duplicate", detail=f"Installment already posted by record {claimed[row.id]}")
+            continue
+        if row.paid:
+            result.update(status="already_paid", detail="Installment is already paid")
+            continue
+        owed = round(row.amount - (row.amount_paid or 0), 2)
+        amount = owed if record.amount is None else round(record.amount, 2)
+        if amount <= 0:
+            result.update(status="invalid", detail="Amount must be greater than zero")
+            continue
+        if amount > owed + ledger.TOLERANCE:
+            result.update(status="overpaid", detail=f"Amount is more than the {owed:.2f} still owed")
+            continue
+
+        claimed[row.id] = index
+        paid_date = record.paid_date or now
+        entries.append(ledger.Entry(row.id, row.loan_id, amount, paid_date))
+        fully_paid = amount >= owed - ledger.TOLERANCE
+        result.update(
+            status="paid" if fully_paid else "partial",
+            amount=amount,
+            remaining=0.0 if fully_paid else round(owed - amount, 2),
+            paid_date=paid_date,
+        )
+
+    posted_statuses = ("paid", "partial")
+    loan_ids = {result["loan_id"] for result in results if result["status"] in posted_statuses}
+    clients, completed = {}, []
+    if entries:
+        ledger.record(db, entries, source="bulk", now=now)
+        clients, completed = complete_loans(db, loan_ids)
+        summaries.refresh_loans(db, loan_ids)
+    db.commit()
+
+    completed_set = set(completed)
+    for result in results:
+        if result["status"] in posted_statuses:
+            result["loan_completed"] = result["loan_id"] in completed_set
+
+    posted = len(entries)
+    return {
+        "posted": posted,
+        "failed": len(records) - posted,
+        "completed_loans": sorted(completed),
+        "client_ids": sorted(set(clients.values())),
+        "results": results,
+    }
@@ -0,0 +1,300 @@
+"""
+Client risk scoring rules, compiled into lookup tables.
+
+The rules live in risk_scoring.json, or the file named by RISK_SCORING_CONFIG:
+the factor weights, score bands, exact-value tables, loan terms per risk
+level and the limits behind the suggestion insights. A band table is written
+like the if/elif chain it replaces, `[operator, threshold, value]` rules
+tried in order and then "otherwise":
+
+    "income": {"bands": [[">=", 50000, 10], [">=", 30000, 30]], "otherwise": 90}
+
+`ScoringTables` turns each chain into sorted breakpoints searched with
+bisect and multiplies the factor scores by their weights up front, so
+scoring a client is a handful of lookups. For whole columns it also
+tabulates the rounded score and risk level of every combination of factor
+slots, so batch scoring is np.searchsorted plus one array index.
+
+    python risk_config.py check [path]
+"""
+import bisect
+import json
+import math
+import operator
+import os
+import sys
+import numpy as np
+
+CONFIG_PATH = os.getenv(
+    "RISK_SCORING_CONFIG", os.path.join(os.path.dirname(os.path.abspath(__file__)), "risk_scoring.json")
+)
+# Memoized scores and suggestions kept per RiskScorer
+CACHE_SIZE = int(os.getenv("RISK_SCORING_CACHE_SIZE", "8192"))
+# How often the config file's modification time is checked; 0 checks on every call
+RELOAD_SECONDS = float(os.getenv("RISK_SCORING_RELOAD_SECONDS", "5"))
+
+FACTORS = ("income", "employment", "existing_loans", "credit_history", "loan_to_income")
+
+LIMITS = ("max_debt_service_ratio", "max_loan_to_income", "many_existing_loans", "max_loan_income_multiple")
+
+# Largest combined score table a config may produce
+MAX_SCORE_COMBINATIONS = 1 << 20
+
+_OPERATORS = {"<": operator.lt, "<=": operator.le, ">": operator.gt, ">=": operator.ge}
+
+
+def _breakpoint(op, threshold):
+    """The largest value on the low side of `op threshold`, so every rule reads as `value <= breakpoint`"""
+    threshold = float(threshold)
+    return math.nextafter(threshold, -math.inf) if op in ("<", ">=") else threshold
+
+
+class BandTable:
+    """An if/elif chain of threshold comparisons on one number, as a bisect table"""
+
+    def __init__(self, rules, otherwise):
+        rules = [(op, threshold, value) for op, threshold, value in rules]
+        for op, threshold, _ in rules:
+            if op not in _OPERATORS:
+                raise ValueError(f"unknown operator {op!r}")
+            if not isinstance(threshold, (int, float)) or isinstance(threshold, bool) or not math.isfinite(threshold):
+                raise ValueError(f"threshold must be a finite number, not {threshold!r}")
+        self.otherwise = otherwise
+
+        # No comparison changes outcome between two neighbouring breakpoints,
+        # so the chain evaluated at each interval's upper end holds for the
+        # whole interval.
+        keys = sorted({_breakpoint(op, threshold) for op, threshold, _ in rules})
+        values = [self._evaluate(rules, probe) for probe in keys + [math.inf]]
+        self.keys, self.values = [], [values[0]]
+        for key, value in zip(keys, values[1:]):
+            if value != self.values[-1]:
+                self.keys.append(key)
+                self.values.append(value)
+        self._keys_array = np.array(self.keys, dtype=float)
+        # Batch positions index `slots`; the extra last slot is for NaN
+        self.slots = self.values + [otherwise]
+
+    def _evaluate(self, rules, value):
+        for op, threshold, result in rules:
+            if _OPERATORS[op](value, threshold):
+                return result
+        return self.otherwise
+
+    def __call__(self, value):
+        if value != value:
+            # NaN fails every comparison in the chain
+            return self.otherwise
+        return self.values[bisect.bisect_left(self.keys, value)]
+
+    def positions(self, values):
+        """Slot index of each value in a column"""
+        values = np.asarray(values, dtype=float)
+        positions = np.searchsorted(self._keys_array, values, side="left")
+        positions[np.isnan(values)] = len(self.values)
+        return positions
+
+
+class ValueTable:
+    """Exact matches on one value, then `otherwise`"""
+
+    def __init__(self, values, otherwise):
+        self.values = dict(values)
+        self.otherwise = otherwise
+        self.slots = list(self.values.values()) + [otherwise]
+        self._slot_of = {key: slot for slot, key in enumerate(self.values)}
+
+    def __call__(self, value):
+        return self.values.get(value, self.otherwise)
+
+    def positions(self, values):
+        """Slot index of each number in a column"""
+        values = np.asarray(values, dtype=float)
+        positions = np.full(values.shape, len(self.slots) - 1)
+        for key, slot in self._slot_of.items():
+            positions[values == key] = slot
+        return positions
+
+    def text_positions(self, values):
+        """Slot index of each string in a column, matched case-insensitively"""
+        if isinstance(values, np.ndarray):
+            # Iterating a NumPy string array element by element is several times slower
+            values = values.tolist()
+        return np.fromiter(map(_TextSlots(self._slot_of, len(self.slots) - 1).__getitem__, values),
+                           dtype=np.intp, count=len(values))
+
+
+class _TextSlots(dict):
+    """Memo of column string -> slot, lower-casing each distinct string once"""
+
+    def __init__(self, slot_of, otherwise):
+        super().__init__()
+        self.slot_of = slot_of
+        self.otherwise = otherwise
+
+    def __missing__(self, value):
+        # str() matches np.asarray(values, dtype=str), so None and NaN fall through to otherwise
+        slot = self[value] = self.slot_of.get(str(value).lower(), self.otherwise)
+        return slot
+
+
+def _weighted_bands(spec, weight):
+    return BandTable([(op, threshold, score * weight) for op, threshold, score in spec["bands"]],
+                     spec["otherwise"] * weight)
+
+
+def _weighted_values(spec, weight, parse_key):
+    return ValueTable({parse_key(key): score * weight for key, score in spec["values"].items()},
+                      spec["otherwise"] * weight)
+
+
+class ScoringTables:
+    """A scoring config compiled for lookup. Raises ValueError for an invalid config."""
+
+    def __init__(self, config):
+        try:
+            self._compile(config)
+        except (KeyError, TypeError, ValueError, AttributeError) as e:
+            raise ValueError(f"Invalid risk scoring config: {e!r}") from e
+
+    def _compile(self, config):
+        self.config = config
+        self.weights = {name: float(config["weights"][name]) for name in FACTORS}
+        weights = self.weights
+
+        # Factor scores are stored already multiplied by their weight, the
+        # same products the rule-by-rule scorer computed
+        self.income = _weighted_bands(config["income"], weights["income"])
+        self.employment = _weighted_values(config["employment"], weights["employment"], str.lower)
+        self.existing_loans = _weighted_values(config["existing_loans"], weights["existing_loans"], float)
+        self.credit_history = _weighted_values(config["credit_history"], weights["credit_history"], str.lower)
+        self.loan_to_income = _weighted_bands(config["loan_to_income"], weights["loan_to_income"])
+        self.no_loan = config["loan_to_income"]["no_loan"] * weights["loan_to_income"]
+
+        self.risk_levels = BandTable(config["risk_levels"]["bands"], config["risk_levels"]["otherwise"])
+        self.terms = {
+            level: (float(terms["interest_rate"]), int(terms["max_duration"]))
+            for level, terms in config["terms"].items()
+        }
+        missing = set(self.risk_levels.values) - set(self.terms)
+        if missing:
+            raise ValueError(f"no terms for risk levels {sorted(missing)}")
+        self.amount_rate_delta = BandTable(config["amount_rate_delta"]["bands"], config["amount_rate_delta"]["otherwise"])
+        self.amount_duration = BandTable(config["amount_duration"]["bands"], config["amount_duration"]["otherwise"])
+        self.approve_levels = frozenset(config["approve_levels"])
+        self.limits = {name: float(config["limits"][name]) for name in LIMITS}
+
+        self.score = self._compile_score()
+        self._compile_combinations()
+
+    def _compile_combinations(self):
+        """Rounded score and level for every combination of factor slots, for score_columns"""
+        # Loan-to-income gets one more slot for "no loan amount"
+        factors = [self.income.slots, self.employment.slots, self.existing_loans.slots,
+                   self.credit_history.slots, self.loan_to_income.slots + [self.no_loan]]
+        self._no_loan_slot = len(factors[-1]) - 1
+        self._strides = []
+        size = 1
+        for slots in reversed(factors):
+            self._strides.insert(0, size)
+            size *= len(slots)
+        if size > MAX_SCORE_COMBINATIONS:
+            raise ValueError(f"{size} factor combinations, more than the {MAX_SCORE_COMBINATIONS} supported")
+
+        # np.add.outer adds in the scalar path's order, with the same float results
+        totals = np.asarray(factors[0], dtype=float)
+        for slots in factors[1:]:
+            totals = np.add.outer(totals, np.asarray(slots, dtype=float))
+        totals = totals.ravel().tolist()
+        # Python's round(), since np.round can differ in the last digit
+        self._scores = np.array([round(total, 2) for total in totals])
+        self._levels = np.array([self.risk_levels(total) for total in totals], dtype=object)
+
+    def _compile_score(self):
+        """
+        score(monthly_income, employment_status, existing_loans, credit_history, loan_amount=None)
+        -> (risk_score, risk_level), with every table bound to a local
+        """
+        income_keys, income_values, income_otherwise = self.income.keys, self.income.values, self.income.otherwise
+        employment, employment_otherwise = self.employment.values.get, self.employment.otherwise
+        loans, loans_otherwise = self.existing_loans.values.get, self.existing_loans.otherwise
+        credit, credit_otherwise = self.credit_history.values.get, self.credit_history.otherwise
+        lti, no_loan = self.loan_to_income, self.no_loan
+        level_keys, levels = self.risk_levels.keys, self.risk_levels.values
+        bisect_left = bisect.bisect_left
+
+        def score(monthly_income, employment_status, existing_loans, credit_history, loan_amount=None):
+            # Same addition order as the rule-by-rule scorer, so the sums match exactly
+            risk_score = (
+                (income_values[bisect_left(income_keys, monthly_income)] if monthly_income == monthly_income
+                 else income_otherwise)
+                + employment(employment_status.lower(), employment_otherwise)
+                + loans(existing_loans, loans_otherwise)
+                + credit(credit_history.lower(), credit_otherwise)
+            )
+            if loan_amount and monthly_income > 0:
+                risk_score += lti(loan_amount / monthly_income)
+            else:
+                risk_score += no_loan
+            return round(risk_score, 2), levels[bisect_left(level_keys, risk_score)]
+
+        return score
+
+
+    def score_columns(self, monthly_income, employment_status, existing_loans, credit_history, loan_amounts=None):
+        """
+        (risk_scores, risk_levels) lists for columns of client features,
+        identical to `score` row by row. `loan_amounts` is None, a scalar or
+        an array; zero or NaN counts as no loan amount.
+        """
+        income = np.asarray(monthly_income, dtype=float)
+        if loan_amounts is None:
+            lti = np.full(income.shape, self._no_loan_slot)
+        else:
+            amounts = np.broadcast_to(np.asarray(loan_amounts, dtype=float), income.shape)
+            has_ratio = (amounts != 0) & ~np.isnan(amounts) & (income > 0)
+            ratio = np.divide(amounts, income, out=np.zeros(income.shape), where=has_ratio)
+            lti = np.where(has_ratio, self.loan_to_income.positions(ratio), self._no_loan_slot)
+
+        strides = self._strides
+        combination = (
+            self.income.positions(income) * strides[0]
+            + self.employment.text_positions(employment_status) * strides[1]
+            + self.existing_loans.positions(existing_loans) * strides[2]
+            + self.credit_history.text_positions(credit_history) * strides[3]
+            + lti * strides[4]
+        )
+        return self._scores[combination].tolist(), self._levels[combination].tolist()
+
+
+def load(path=None):
+    """Read and compile a scoring config file. Raises ValueError if it is missing or invalid."""
+    path = path or CONFIG_PATH
+    try:
+        with open(path, encoding="utf-8") as f:
+            config = json.load(f)
+    except OSError as e:
+        raise ValueError(f"Cannot read risk scoring config {path}: {e}") from e
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Risk scoring config {path} is not valid JSON: {e}") from e
+    return ScoringTables(config)
+
+
+def main(argv):
+    if len(argv) not in (2, 3) or argv[1] != "check":
+        print("usage: python risk_config.py check [path]")
+        return 2
+    path = argv[2] if len(argv) == 3 else CONFIG_PATH
+    try:
+        tables = load(path)
+    except ValueError as e:
+        print(e)
+        return 1
+    print(f"{path}: OK")
+    print(f"  weights: {tables.weights}")
+    print(f"  risk levels: {', '.join(tables.risk_levels.values)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,83 @@
+"""
+Minimal in-process periodic job runner.
+
+Each job runs in a daemon thread: once as soon as it is started and then
+every `interval_seconds`. Run statistics are kept so they can be exposed
+over the API.
+"""
+import logging
+import threading
+import time
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+
+class PeriodicJob:
+    def __init__(self, name, interval_seconds, func):
+        self.name = name
+        self.interval_seconds = interval_seconds
+        self.func = func
+        self._run_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._stats = {
+            "job": name,
+            "interval_seconds": interval_seconds,
+            "runs": 0,
+            "failures": 0,
+            "last_started_at": None,
+            "last_finished_at": None,
+            "last_duration_ms": None,
+            "last_result": None,
+            "last_error": None,
+        }
+
+    def start(self):
+        """Start the background thread; with no interval the job runs once, inline"""
+        if self.interval_seconds <= 0:
+            self.run_now()
+            return
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name=f"job-{self.name}", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=5):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                self.run_now()
+            except Exception:
+                # Already recorded in the stats; keep the schedule going
+                pass
+            self._stop.wait(self.interval_seconds)
+
+    def run_now(self):
+        """Run the job in the calling thread, waiting for any run already in progress"""
+        with self._run_lock:
+            started = time.perf_counter()
+            self._stats["last_started_at"] = datetime.utcnow()
+            try:
+                result = self.func()
+            except Exception as e:
+                self._stats["failures"] += 1
+                self._stats["last_error"] = str(e)
+                logger.exception("Job %s failed", self.name)
+                raise
+            finally:
+                self._stats["runs"] += 1
+                self._stats["last_finished_at"] = datetime.utcnow()
+                self._stats["last_duration_ms"] = round((time.perf_counter() - started) * 1000, 2)
+            self._stats["last_result"] = result
+            self._stats["last_error"] = None
+            return result
+
+    def stats(self):
+        return dict(self._stats)
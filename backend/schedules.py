@@ -0,0 +1,236 @@
+"""
+Amortization engine shared by the loan endpoints, loan suggestions and the
+cash-flow stress test.
+
+Two repayment methods are supported, each with an optional grace period of
+interest-only months at the start of the term:
+
+- flat: simple interest on the original principal, spread evenly
+  (Total = Principal + Principal * Rate * Time)
+- reducing: reducing-balance EMI, interest charged monthly on the
+  outstanding principal
+
+Schedules are computed as numpy arrays for a whole batch of loans at once
+(`schedule_batch`, `price_batch`) and due dates fall on the same day of each
+calendar month as the start date. Installment rows are written with a single
+bulk INSERT instead of one ORM object per installment.
+"""
+import calendar
+from collections import namedtuple
+from datetime import date, datetime
+import numpy as np
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+import database
+import ledger
+
+FLAT = "flat"
+REDUCING = "reducing"
+METHODS = (FLAT, REDUCING)
+
+# Per-month arrays; in a batch each row is one loan, zero-padded past its term
+Schedule = namedtuple("Schedule", ["payment", "principal", "interest", "balance"])
+
+
+def add_months(day: date, months: int) -> date:
+    """Same day-of-month `months` later, clamped to the last day of the month (dates and datetimes)"""
+    month_index = day.month - 1 + months
+    year, month = day.year + month_index // 12, month_index % 12 + 1
+    return day.replace(year=year, month=month, day=min(day.day, calendar.monthrange(year, month)[1]))
+
+
+def due_dates(start_date, duration_months):
+    """Calendar-month due dates, the first one month after `start_date`"""
+    return [add_months(start_date, i + 1) for i in range(duration_months)]
+
+
+def validate_terms(duration_months, method=FLAT, grace_period_months=0):
+    """Raise ValueError for terms the engine cannot schedule"""
+    if method not in METHODS:
+        raise ValueError(f"repayment_method must be one of {', '.join(METHODS)}")
+    if duration_months is None or duration_months <= 0:
+        raise ValueError("Duration must be greater than zero")
+    if grace_period_months < 0 or grace_period_months >= duration_months:
+        raise ValueError("Grace period must be at least zero and shorter than the duration")
+
+
+def _terms(loan_amounts, interest_rates, duration_months, method, grace_period_months):
+    principal, rate, months, grace = np.broadcast_arrays(
+        np.asarray(loan_amounts, dtype=float),
+        np.asarray(interest_rates, dtype=float),
+        np.asarray(duration_months, dtype=int),
+        np.asarray(grace_period_months, dtype=int),
+    )
+    reducing = np.broadcast_to(np.asarray(method) == REDUCING, principal.shape)
+    return principal, rate / 1200, months, grace, reducing
+
+
+def _installments(principal, monthly_rate, months, grace, reducing):
+    """Regular (post-grace) installment, grace-month installment and total payable per loan"""
+    repaying = months - grace
+    flat_interest = principal * monthly_rate * months
+    with np.errstate(divide="ignore", invalid="ignore"):
+        emi = np.where(
+            monthly_rate > 0,
+            principal * monthly_rate / -np.expm1(-repaying * np.log1p(monthly_rate)),
+            principal / repaying,
+        )
+    regular = np.where(reducing, emi, principal / repaying + flat_interest / months)
+    interest_only = np.where(reducing, principal * monthly_rate, flat_interest / months)
+    total = grace * interest_only + repaying * regular
+    return regular, interest_only, total
+
+
+def price_batch(loan_amounts, interest_rates, duration_months, method=FLAT, grace_period_months=0):
+    """
+    Price many loans at once for what-if comparisons. Arguments broadcast
+    against each other; returns arrays of the regular installment, the
+    grace-period installment, total payable and total interest.
+    """
+    principal, monthly_rate, months, grace, reducing = _terms(
+        loan_amounts, interest_rates, duration_months, method, grace_period_months
+    )
+    regular, interest_only, total = _installments(principal, monthly_rate, months, grace, reducing)
+    return {
+        "installment": regular,
+        "grace_installment": interest_only,
+        "total_payable": total,
+        "total_interest": total - principal,
+    }
+
+
+def schedule_batch(loan_amounts, interest_rates, duration_months, method=FLAT, grace_period_months=0):
+    """
+    Month-by-month schedules for many loans as 2-D arrays (loan x month).
+    Payments are rounded to paisa with the last installment absorbing the
+    rounding, so each loan's payments add up to its total payable.
+    """
+    principal, monthly_rate, months, grace, reducing = _terms(
+        loan_amounts, interest_rates, duration_months, method, grace_period_months
+    )
+    principal, monthly_rate, months, grace, reducing = (
+        np.atleast_1d(value)[:, None] for value in (principal, monthly_rate, months, grace, reducing)
+    )
+    regular, interest_only, total = _installments(principal, monthly_rate, months, grace, reducing)
+
+    month = np.arange(months.max())[None, :]
+    in_term = month < months
+    in_grace = month < grace
+    repaid = np.clip(month + 1 - grace, 0, None)  # Regular installments paid by the end of each month
+
+    # Outstanding principal after each month
+    growth = np.power(1 + monthly_rate, repaid)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        reducing_balance = np.where(
+            monthly_rate > 0,
+            principal * growth - regular * (growth - 1) / monthly_rate,
+            principal - regular * repaid,
+        )
+    flat_balance = principal - principal / (months - grace) * repaid
+    balance = np.where(in_term, np.clip(np.where(reducing, reducing_balance, flat_balance), 0, None), 0.0)
+
+    payment = np.where(in_grace, interest_only, regular)
+    payment = np.where(in_term, np.round(payment, 2), 0.0)
+    last = months[:, 0] - 1
+    rows = np.arange(payment.shape[0])
+    payment[rows, last] = 0.0
+    payment[rows, last] = np.round(total[:, 0] - payment.sum(axis=1), 2)
+
+    opening = np.concatenate([principal, balance[:, :-1]], axis=1)
+    principal_paid = np.where(in_term, opening - balance, 0.0)
+    interest = np.where(in_term, payment - principal_paid, 0.0)
+    return Schedule(payment, principal_paid, interest, balance)
+
+
+def amortize(loan_amount, interest_rate, duration_months, method=FLAT, grace_period_months=0):
+    """Schedule of a single loan as 1-D arrays, one entry per month"""
+    validate_terms(duration_months, method, grace_period_months)
+    batch = schedule_batch(loan_amount, interest_rate, duration_months, method, grace_period_months)
+    return Schedule(*(values[0, :duration_months] for values in batch))
+
+
+def monthly_installment(loan_amount, interest_rate, duration_months, method=FLAT, grace_period_months=0):
+    """Regular installment once any grace period is over"""
+    priced = price_batch(loan_amount, interest_rate, duration_months, method, grace_period_months)
+    return float(priced["installment"])
+
+
+def total_payable(loan_amount, interest_rate, duration_months, method=FLAT, grace_period_months=0):
+    priced = price_batch(loan_amount, interest_rate, duration_months, method, grace_period_months)
+    return float(priced["total_payable"])
+
+
+def _loan_terms(loan):
+    return (
+        getattr(loan, "repayment_method", None) or FLAT,
+        getattr(loan, "grace_period_months", None) or 0,
+    )
+
+
+def build_installment_rows(loan_id, loan_amount, interest_rate, duration_months, start_date,
+                           method=FLAT, grace_period_months=0, payments=None):
+    """Installment rows for one loan, ready for a bulk insert"""
+    if payments is None:
+        payments = amortize(loan_amount, interest_rate, duration_months, method, grace_period_months).payment
+    return [
+        {
+            "loan_id": loan_id,
+            "installment_number": i + 1,
+            "due_date": due_date,
+            "amount": float(payments[i]),
+            "amount_paid": 0.0,
+            "paid": False,
+            "paid_date": None,
+            "is_overdue": False,
+        }
+        for i, due_date in enumerate(due_dates(start_date, duration_months))
+    ]
+
+
+def insert_schedules(db: Session, loans, paid=None, now=None):
+    """
+    Generate and insert the schedules for already-flushed Loan objects in one
+    statement and set each loan's balances. `paid` maps loan ids to
+    (amount already paid, paid_at), applied to the new installments oldest
+    first. Unpaid installments already past due on a backdated schedule are
+    written as overdue. Returns the number of installments written.
+    """
+    paid = paid or {}
+    now = now or datetime.utcnow()
+    if not loans:
+        return 0
+    terms = [_loan_terms(loan) for loan in loans]
+    payments = schedule_batch(
+        [loan.loan_amount for loan in loans],
+        [loan.interest_rate for loan in loans],
+        [loan.duration_months for loan in loans],
+        [method for method, _ in terms],
+        [grace for _, grace in terms],
+    ).payment
+
+    rows = []
+    for loan, loan_payments in zip(loans, payments):
+        loan_rows = build_installment_rows(
+            loan.id, loan.loan_amount, loan.interest_rate, loan.duration_months, loan.start_date,
+            payments=loan_payments,
+        )
+        amount_paid, paid_at = paid.get(loan.id, (0.0, None))
+        ledger.allocate(loan_rows, amount_paid, paid_at)
+        for row in loan_rows:
+            row["is_overdue"] = row["due_date"] < now and not row["paid"]
+        # Unchanged values (set by the caller before the flush) do not cause an UPDATE
+        loan.total_due = round(sum(row["amount"] for row in loan_rows), 2)
+        loan.amount_paid = round(amount_paid, 2)
+        loan.outstanding_balance = round(loan.total_due - loan.amount_paid, 2)
+        rows.extend(loan_rows)
+    if rows:
+        # Core insert on the table skips ORM bookkeeping for large schedules
+        db.execute(insert(database.Installment.__table__), rows)
+    return len(rows)
+
+
+def replace_schedule(db: Session, loan, now=None):
+    """Drop a loan's existing installments and write a fresh schedule, carrying over what has been paid"""
+    amount_paid, paid_at = ledger.detach_payments(db, loan.id)
+    db.query(database.Installment).filter(database.Installment.loan_id == loan.id).delete(synchronize_session=False)
+    return insert_schedules(db, [loan], paid={loan.id: (amount_paid, paid_at)}, now=now)
@@ -0,0 +1,253 @@
+"""
+Client search over name, CNIC, phone and address.
+
+On SQLite the clients are indexed in an FTS5 table, `clients_fts`, kept in
+sync by triggers on `clients`. Every write path, including bulk Core inserts
+from the importer and the seed script, updates the index in the same
+transaction. CNIC and phone numbers are also indexed as bare digits so
+"3520212" finds "35202-1234567-1". A phone number is indexed with and
+without its country code or leading zero. Results are ranked with bm25,
+weighting name matches highest. Each search word is a prefix match.
+
+Databases without FTS5 (or not on SQLite) fall back to LIKE matching.
+
+    python search.py rebuild
+    python search.py verify
+"""
+import re
+import sys
+from sqlalchemy import case, func, or_, select, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+import database
+
+MIN_QUERY_LENGTH = 2
+MAX_RESULTS = 100
+
+# bm25 column weights, in the column order of clients_fts
+WEIGHTS = {"name": 10.0, "cnic": 6.0, "phone": 4.0, "address": 1.0, "cnic_digits": 6.0, "phone_digits": 4.0}
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+_SEPARATORS = ("-", " ", "+", "(", ")", ".")
+
+# Per database URL: whether clients_fts exists there
+_fts_enabled = {}
+
+
+def _digits(column):
+    """SQL for `column` with the separators used in CNICs and phone numbers removed"""
+    expr = column
+    for separator in _SEPARATORS:
+        expr = f"replace({expr}, '{separator}', '')"
+    return expr
+
+
+def _phone_variants(column):
+    """Digits of a phone number as written, without the 92 country code or leading 0, and with a leading 0"""
+    digits = _digits(column)
+    national = f"(CASE WHEN {digits} LIKE '92%' THEN substr({digits}, 3) WHEN {digits} LIKE '0%' THEN substr({digits}, 2) ELSE {digits} END)"
+    return f"{digits} || ' ' || {national} || ' 0' || {national}"
+
+
+def _row_values(prefix):
+    return (
+        f"{prefix}.id, {prefix}.name, {prefix}.cnic, {prefix}.phone, {prefix}.address, "
+        f"{_digits(prefix + '.cnic')}, {_phone_variants(prefix + '.phone')}"
+    )
+
+
+COLUMNS = "rowid, name, cnic, phone, address, cnic_digits, phone_digits"
+
+DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS clients_fts USING fts5("
+    "name, cnic, phone, address, cnic_digits, phone_digits, prefix='2 3 4')",
+    f"""CREATE TRIGGER IF NOT EXISTS clients_fts_insert AFTER INSERT ON clients BEGIN
+        INSERT INTO clients_fts({COLUMNS}) SELECT {_row_values('new')};
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS clients_fts_delete AFTER DELETE ON clients BEGIN
+        DELETE FROM clients_fts WHERE rowid = old.id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS clients_fts_update AFTER UPDATE OF name, cnic, phone, address ON clients BEGIN
+        DELETE FROM clients_fts WHERE rowid = old.id;
+        INSERT INTO clients_fts({COLUMNS}) SELECT {_row_values('new')};
+    END""",
+]
+
+
+def _key(db):
+    return str(db.get_bind().url)
+
+
+def fts_enabled(db: Session) -> bool:
+    """Whether this database has the FTS5 index (checked once per database)"""
+    key = _key(db)
+    if key not in _fts_enabled:
+        if db.get_bind().dialect.name != "sqlite":
+            _fts_enabled[key] = False
+        else:
+            _fts_enabled[key] = db.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'clients_fts'")
+            ).first() is not None
+    return _fts_enabled[key]
+
+
+def rebuild(db: Session):
+    """Repopulate clients_fts from the clients table. Returns the number of clients indexed."""
+    db.execute(text("DELETE FROM clients_fts"))
+    db.execute(text(f"INSERT INTO clients_fts({COLUMNS}) SELECT {_row_values('clients')} FROM clients"))
+    db.execute(text("INSERT INTO clients_fts(clients_fts) VALUES ('optimize')"))
+    db.commit()
+    return db.execute(text("SELECT count(*) FROM clients_fts")).scalar()
+
+
+def ensure_index(db: Session):
+    """
+    Create the FTS5 table and its triggers on SQLite and fill it the first
+    time. Returns False (LIKE search) when FTS5 is unavailable.
+    """
+    key = _key(db)
+    if db.get_bind().dialect.name != "sqlite":
+        _fts_enabled[key] = False
+        return False
+    existed = db.execute(text("SELECT 1 FROM sqlite_master WHERE name = 'clients_fts'")).first() is not None
+    try:
+        for statement in DDL:
+            db.execute(text(statement))
+    except OperationalError:
+        # SQLite built without FTS5
+        db.rollback()
+        _fts_enabled[key] = False
+        return False
+    db.commit()
+    if not existed:
+        rebuild(db)
+    _fts_enabled[key] = True
+    return True
+
+
+def verify(db: Session):
+    """Compare the index with the clients table and run FTS5's integrity check"""
+    clients = db.execute(select(func.count(database.Client.id))).scalar()
+    indexed = db.execute(text("SELECT count(*) FROM clients_fts")).scalar()
+    missing = db.execute(text(
+        "SELECT count(*) FROM clients WHERE id NOT IN (SELECT rowid FROM clients_fts)"
+    )).scalar()
+    try:
+        db.execute(text("INSERT INTO clients_fts(clients_fts) VALUES ('integrity-check')"))
+        intact = True
+    except OperationalError:
+        intact = False
+    db.rollback()
+    return {
+        "clients": clients,
+        "indexed": indexed,
+        "missing": missing,
+        "intact": intact,
+        "ok": intact and missing == 0 and clients == indexed,
+    }
+
+
+def match_expression(query: str):
+    """
+    FTS5 MATCH expression for free text: every word as a prefix. A number
+    is also matched as bare digits against the CNIC and phone digit columns;
+    a number written with separators (a CNIC or phone number) only there,
+    since its short trailing groups would otherwise match half the index.
+    Returns None when nothing searchable is left.
+    """
+    words = _WORD.findall(query.lower())
+    if not words:
+        return None
+    digits = "".join(words)
+    by_digits = f'{{cnic_digits phone_digits}} : "{digits}"*'
+    if digits.isdigit() and len(words) > 1:
+        return by_digits
+    expression = " AND ".join(f'"{word}"*' for word in words)
+    if digits.isdigit():
+        expression = f"{expression} OR {by_digits}"
+    return expression
+
+
+def _fts_search(db: Session, query: str, limit: int):
+    expression = match_expression(query)
+    if expression is None:
+        return []
+    weights = ", ".join(str(weight) for weight in WEIGHTS.values())
+    # Rank inside the FTS table first so only `limit` client rows are read
+    stmt = select(database.Client).from_statement(text(f"""
+        SELECT clients.* FROM clients
+        JOIN (
+            SELECT rowid AS client_id, bm25(clients_fts, {weights}) AS score
+            FROM clients_fts WHERE clients_fts MATCH :expression
+            ORDER BY score LIMIT :limit
+        ) AS ranked ON clients.id = ranked.client_id
+        ORDER BY ranked.score, clients.id
+    """))
+    return db.execute(stmt, {"expression": expression, "limit": limit}).scalars().all()
+
+
+def _escape_like(value: str) -> str:
+    """`value` with backslashes, % and _ escaped, so they match literally in LIKE"""
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _like_search(db: Session, query: str, limit: int):
+    Client = database.Client
+    term = query.strip().lower()
+    digits = "".join(_WORD.findall(term))
+    # Wildcards typed by the user match literally
+    escaped, escaped_digits = _escape_like(term), _escape_like(digits)
+    name = func.lower(Client.name)
+
+    def like(column, pattern):
+        return column.like(pattern, escape="\\")
+
+    conditions = [like(name, f"%{escaped}%"), like(func.lower(Client.address), f"%{escaped}%"),
+                  like(Client.cnic, f"{escaped}%"), like(Client.phone, f"%{escaped}%")]
+    if digits.isdigit():
+        conditions.append(like(func.replace(Client.cnic, "-", ""), f"{escaped_digits}%"))
+    rank = case((like(name, f"{escaped}%"), 0), (like(name, f"%{escaped}%"), 1), else_=2)
+    stmt = select(Client).where(or_(*conditions)).order_by(rank, Client.name, Client.id).limit(limit)
+    return db.execute(stmt).scalars().all()
+
+
+def search_clients(db: Session, query: str, limit: int = 20):
+    """
+    Clients matching `query`, best match first. Raises ValueError when the
+    query is too short to search.
+    """
+    query = (query or "").strip()
+    if len(query) < MIN_QUERY_LENGTH:
+        raise ValueError(f"Search for at least {MIN_QUERY_LENGTH} characters")
+    limit = max(1, min(limit, MAX_RESULTS))
+    if fts_enabled(db):
+        return _fts_search(db, query, limit)
+    return _like_search(db, query, limit)
+
+
+def main(argv):
+    if len(argv) != 2 or argv[1] not in ("rebuild", "verify"):
+        print("usage: python search.py [rebuild|verify]")
+        return 2
+
+    database.init_db()
+    db = database.SessionLocal()
+    try:
+        if not ensure_index(db):
+            print("FTS5 is not available; client search uses LIKE matching")
+            return 1
+        if argv[1] == "rebuild":
+            print(f"Indexed {rebuild(db)} clients")
+            return 0
+
+        report = verify(db)
+        print(f"{report['indexed']} of {report['clients']} clients indexed, {report['missing']} missing, "
+              f"integrity check {'passed' if report['intact'] else 'failed'}")
+        print("Index is in sync" if report["ok"] else "Index is out of sync - run `python search.py rebuild`")
+        return 0 if report["ok"] else 1
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
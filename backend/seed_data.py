@@ -0,0 +1,211 @@
+"""
+Synthetic portfolio generator.
+
+Writes realistic clients, loans and repayment histories straight into a
+database at a chosen scale, then posts the repayments to the payments ledger
+and rebuilds the dashboard summaries and the default-risk snapshot. Output is fully determined by --seed and --now.
+
+    python seed_data.py --installments 100000 --database sqlite:///./bench.db
+
+Client incomes, employment and credit history follow skewed distributions,
+risk scores come from RiskScorer, loan size tracks income, loan terms track
+risk level, and repayment behaviour depends on risk: riskier clients pay
+late, miss more often and a missed payment makes the next one less likely.
+"""
+import argparse
+import math
+import random
+import sys
+from datetime import datetime, timedelta
+from sqlalchemy import func, insert, select
+from sqlalchemy.orm import sessionmaker
+import ai_models
+import database
+import default_risk
+import ledger
+import schedules
+import summaries
+
+SCALES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+CLIENT_CHUNK = 2000
+
+FIRST_NAMES = [
+    "Ayesha", "Fatima", "Zainab", "Maryam", "Hira", "Sana", "Iqra", "Amna", "Khadija", "Rabia",
+    "Ahmed", "Ali", "Hassan", "Usman", "Bilal", "Hamza", "Imran", "Faisal", "Tariq", "Zubair",
+]
+LAST_NAMES = [
+    "Khan", "Ahmed", "Malik", "Hussain", "Qureshi", "Siddiqui", "Butt", "Chaudhry", "Sheikh", "Raza",
+    "Abbasi", "Baloch", "Shah", "Mirza", "Javed", "Aslam", "Iqbal", "Nawaz", "Anwar", "Farooq",
+]
+CITIES = ["Karachi", "Lahore", "Faisalabad", "Rawalpindi", "Multan", "Hyderabad", "Peshawar", "Quetta", "Sialkot"]
+
+EMPLOYMENT = (["Employed", "Self-Employed", "Unemployed"], [45, 40, 15])
+EXISTING_LOANS = ([0, 1, 2, 3], [50, 30, 15, 5])
+CREDIT_HISTORY = (["Good", "Average", "Poor"], [40, 40, 20])
+LOAN_TYPES = (["Business", "Agriculture", "Personal", "Education"], [40, 25, 25, 10])
+LOANS_PER_CLIENT = ([1, 2, 3], [60, 30, 10])
+
+# Per risk level: base annual rate, allowed durations, chance of paying an installment on time-ish
+TERMS = {
+    "Low": (12.0, [6, 12, 18, 24, 36], 0.97),
+    "Medium": (18.0, [6, 12, 18, 24], 0.90),
+    "High": (24.0, [6, 9, 12], 0.75),
+}
+
+
+def _choice(rng, options):
+    values, weights = options
+    return rng.choices(values, weights)[0]
+
+
+def _client(rng, client_id):
+    income = round(min(250000, max(5000, rng.lognormvariate(math.log(28000), 0.6))) / 500) * 500
+    address_no = rng.randint(1, 999)
+    return {
+        "id": client_id,
+        "name": f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+        "cnic": f"{rng.randint(10000, 99999)}-{client_id:07d}-{rng.randint(1, 9)}",
+        "phone": f"+92-3{rng.randint(0, 4)}{rng.randint(0, 9)}-{rng.randint(1000000, 9999999)}",
+        "address": f"House {address_no}, {rng.choice(CITIES)}",
+        "monthly_income": float(income),
+        "employment_status": _choice(rng, EMPLOYMENT),
+        "existing_loans": _choice(rng, EXISTING_LOANS),
+        "credit_history": _choice(rng, CREDIT_HISTORY),
+    }
+
+
+def _loan(rng, loan_id, client, now):
+    base_rate, durations, _ = TERMS[client["risk_level"]]
+    amount = round(min(1_000_000, max(10_000, client["monthly_income"] * rng.uniform(2, 12))), -3)
+    interest_rate = base_rate + (2 if amount > 500_000 else -1 if amount < 50_000 else 0)
+    duration = rng.choice(durations)
+    start = now - timedelta(days=rng.randint(0, 3 * 365), seconds=rng.randint(0, 86399))
+    return {
+        "id": loan_id,
+        "client_id": client["id"],
+        "loan_amount": float(amount),
+        "loan_type": _choice(rng, LOAN_TYPES),
+        "interest_rate": interest_rate,
+        "duration_months": duration,
+        "monthly_installment": round(schedules.monthly_installment(amount, interest_rate, duration), 2),
+        "start_date": start,
+        "status": "Active",
+        "created_at": start,
+    }
+
+
+def _repay(rng, loan, rows, on_time_rate, now):
+    """Fill in payments for installments already due and settle the loan status"""
+    missed_streak = 0
+    for row in rows:
+        if row["due_date"] >= now:
+            break
+        # Each consecutive miss makes the next payment less likely
+        if rng.random() < on_time_rate * (0.7 ** missed_streak):
+            paid_at = row["due_date"] + timedelta(days=rng.choice([-3, -1, 0, 0, 1, 2, 5, 10, 20]))
+            row["paid"] = True
+            row["paid_date"] = min(paid_at, now)
+            missed_streak = 0
+        else:
+            row["is_overdue"] = True
+            missed_streak += 1
+
+    overdue = sum(1 for row in rows if row["is_overdue"])
+    if all(row["paid"] for row in rows):
+        loan["status"] = "Completed"
+    elif overdue >= 4 and rng.random() < 0.5:
+        loan["status"] = "Defaulted"
+
+
+def _next_id(session, column):
+    return (session.execute(select(func.max(column))).scalar() or 0) + 1
+
+
+def generate_portfolio(session, installments, seed=42, now=None, scorer=None):
+    """
+    Insert clients, loans and installments until about `installments`
+    installments exist in the new data. Returns the number of rows written.
+    """
+    rng = random.Random(seed)
+    now = now or datetime.utcnow()
+    scorer = scorer or ai_models.RiskScorer()
+    client_id = _next_id(session, database.Client.id)
+    loan_id = _next_id(session, database.Loan.id)
+    counts = {"clients": 0, "loans": 0, "installments": 0}
+
+    while counts["installments"] < installments:
+        clients = [_client(rng, client_id + i) for i in range(CLIENT_CHUNK)]
+        client_id += CLIENT_CHUNK
+        risk_scores, risk_levels = scorer.score_batch(clients)
+        for client, risk_score, risk_level in zip(clients, risk_scores, risk_levels):
+            client.update(risk_score=risk_score, risk_level=risk_level, created_at=now)
+
+        loans = []
+        installment_rows = []
+        used_clients = 0
+        for client in clients:
+            if counts["installments"] + len(installment_rows) >= installments:
+                break
+            used_clients += 1
+            for _ in range(_choice(rng, LOANS_PER_CLIENT)):
+                loan = _loan(rng, loan_id, client, now)
+                loan_id += 1
+                rows = schedules.build_installment_rows(
+                    loan["id"], loan["loan_amount"], loan["interest_rate"], loan["duration_months"], loan["start_date"]
+                )
+                _repay(rng, loan, rows, TERMS[client["risk_level"]][2], now)
+                loans.append(loan)
+                installment_rows.extend(rows)
+
+        session.execute(insert(database.Client), clients[:used_clients])
+        session.execute(insert(database.Loan), loans)
+        session.execute(insert(database.Installment.__table__), installment_rows)
+        session.commit()
+        counts["clients"] += used_clients
+        counts["loans"] += len(loans)
+        counts["installments"] += len(installment_rows)
+
+    return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--installments", default="100k",
+                        help="number of installments, or one of " + ", ".join(SCALES))
+    parser.add_argument("--database", default=database.SQLALCHEMY_DATABASE_URL,
+                        help="SQLAlchemy URL (default: DATABASE_URL or the app database)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--now", type=datetime.fromisoformat, default=None,
+                        help="reference 'today' as ISO date, for reproducible repayment histories")
+    parser.add_argument("--append", action="store_true", help="allow adding to a database that already has loans")
+    args = parser.parse_args(argv)
+
+    target = SCALES.get(str(args.installments).lower())
+    if target is None:
+        target = int(args.installments)
+
+    engine = database.create_db_engine(args.database)
+    database.Base.metadata.create_all(bind=engine)
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    try:
+        if session.execute(select(database.Loan.id).limit(1)).first() and not args.append:
+            print(f"{args.database} already contains loans; pass --append to add to it")
+            return 1
+
+        started = datetime.utcnow()
+        counts = generate_portfolio(session, target, seed=args.seed, now=args.now)
+        ledger.backfill(session, now=args.now)
+        session.commit()
+        summaries.rebuild(session)
+        default_risk.score_portfolio(session, ai_models.DefaultAlertSystem(), now=args.now)
+        elapsed = (datetime.utcnow() - started).total_seconds()
+        print(f"Wrote {counts['clients']} clients, {counts['loans']} loans and "
+              f"{counts['installments']} installments in {elapsed:.1f}s")
+        return 0
+    finally:
+        session.close()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,355 @@
+"""
+Materialized portfolio summaries.
+
+`loan_summaries` keeps one rollup row per loan and `portfolio_rollups` keeps
+running totals per (dimension, bucket): the whole portfolio, each loan status,
+each loan type and each start year. Write endpoints call `refresh_loans` inside
+their own transaction, so /api/dashboard/stats only has to read a few rows.
+
+Rebuild or check the summaries from the command line:
+
+    python summaries.py rebuild
+    python summaries.py verify
+"""
+import sys
+from datetime import datetime
+from typing import Iterable, Optional
+from sqlalchemy import func, case, and_, extract, select, update
+from sqlalchemy.orm import Session
+import database
+import analytics
+
+LOAN_FIELDS = [
+    "loan_amount",
+    "installment_count",
+    "paid_count",
+    "overdue_count",
+    "expected_amount",
+    "collected_amount",
+    "overdue_amount",
+    "year_expected_amount",
+    "year_collected_amount",
+]
+
+# Rollup column for each per-loan field, plus the loan counter
+ROLLUP_FIELDS = {field: field for field in LOAN_FIELDS}
+ROLLUP_FIELDS["loan_amount"] = "disbursed_amount"
+
+AMOUNT_TOLERANCE = 0.01
+CHUNK_SIZE = 500
+
+
+def _chunks(values, size=CHUNK_SIZE):
+    values = list(values)
+    for i in range(0, len(values), size):
+        yield values[i:i + size]
+
+
+def _loan_rows_query(db: Session):
+    """
+    Grouped per-loan figures: counts from the installments, expected and
+    collected amounts from the loan's running balances (ledger.py) and the
+    start-year collections from the payments ledger
+    """
+    Loan = database.Loan
+    Installment = database.Installment
+    Payment = database.Payment
+    overdue = and_(Installment.is_overdue == True, Installment.paid == False)
+    start_year = extract("year", Loan.start_date)
+    year_collected = (
+        select(func.coalesce(func.sum(Payment.amount), 0))
+        .where(Payment.loan_id == Loan.id, extract("year", Payment.paid_at) == start_year)
+        .scalar_subquery()
+    )
+
+    return db.query(
+        Loan.id,
+        Loan.status,
+        Loan.loan_type,
+        start_year,
+        Loan.loan_amount,
+        func.count(Installment.id),
+        func.coalesce(func.sum(case((Installment.paid == True, 1), else_=0)), 0),
+        func.coalesce(func.sum(case((overdue, 1), else_=0)), 0),
+        func.coalesce(Loan.total_due, func.sum(Installment.amount), 0),
+        func.coalesce(Loan.amount_paid, func.sum(case((Installment.paid == True, Installment.amount), else_=0)), 0),
+        func.coalesce(func.sum(case((overdue, Installment.amount - Installment.amount_paid), else_=0)), 0),
+        func.coalesce(func.sum(case(
+            (extract("year", Installment.due_date) == start_year, Installment.amount), else_=0
+        )), 0),
+        year_collected,
+    ).outerjoin(Installment, Installment.loan_id == Loan.id).group_by(Loan.id)
+
+
+def _row_to_values(row):
+    return {
+        "status": row[1],
+        "loan_type": row[2],
+        "start_year": int(row[3]) if row[3] is not None else None,
+        "loan_amount": row[4] or 0,
+        "installment_count": row[5],
+        "paid_count": row[6],
+        "overdue_count": row[7],
+        "expected_amount": row[8],
+        "collected_amount": row[9],
+        "overdue_amount": row[10],
+        "year_expected_amount": row[11],
+        "year_collected_amount": row[12],
+    }
+
+
+def compute_loan_values(db: Session, loan_ids: Optional[Iterable[int]] = None):
+    """
+    Recompute per-loan summary values from scratch.
+    Returns a dict of loan_id -> values; loans that no longer exist are absent.
+    """
+    query = _loan_rows_query(db)
+    if loan_ids is None:
+        return {row[0]: _row_to_values(row) for row in query.all()}
+
+    values = {}
+    for chunk in _chunks(set(loan_ids)):
+        for row in query.filter(database.Loan.id.in_(chunk)).all():
+            values[row[0]] = _row_to_values(row)
+    return values
+
+
+def _summary_to_values(summary: database.LoanSummary):
+    values = {field: getattr(summary, field) or 0 for field in LOAN_FIELDS}
+    values.update(status=summary.status, loan_type=summary.loan_type, start_year=summary.start_year)
+    return values
+
+
+def _buckets(values):
+    """Rollup buckets a loan contributes to"""
+    buckets = [("portfolio", "all"), ("status", values["status"]), ("loan_type", values["loan_type"])]
+    if values["start_year"] is not None:
+        buckets.append(("start_year", str(values["start_year"])))
+    return buckets
+
+
+def _accumulate(deltas, values, sign):
+    for key in _buckets(values):
+        delta = deltas.setdefault(key, dict.fromkeys(["loan_count"] + list(ROLLUP_FIELDS.values()), 0))
+        delta["loan_count"] += sign
+        for field, rollup_field in ROLLUP_FIELDS.items():
+            delta[rollup_field] += sign * values[field]
+
+
+def _apply_deltas(db: Session, deltas):
+    """Apply accumulated deltas as atomic increments so concurrent writers do not lose updates"""
+    Rollup = database.PortfolioRollup
+    now = datetime.utcnow()
+    for (dimension, bucket), delta in deltas.items():
+        if not any(delta.values()):
+            continue
+        result = db.execute(
+            update(Rollup)
+            .where(Rollup.dimension == dimension, Rollup.bucket == bucket)
+            .values(updated_at=now, **{field: getattr(Rollup, field) + value for field, value in delta.items()})
+        )
+        if result.rowcount == 0:
+            db.add(Rollup(dimension=dimension, bucket=bucket, updated_at=now, **delta))
+    db.flush()
+
+    # Drop buckets that no longer hold any loans (e.g. a loan type that was
+    # removed, or the portfolio row once the last loan is deleted), as a rebuild would
+    db.query(Rollup).filter(Rollup.loan_count <= 0).delete(synchronize_session=False)
+
+
+def refresh_loans(db: Session, loan_ids: Iterable[int]):
+    """
+    Bring the summaries for the given loans up to date and adjust the
+    portfolio rollups by the difference. Call before committing the
+    transaction that changed the loans or their installments.
+    """
+    loan_ids = set(loan_ids)
+    if not loan_ids:
+        return
+    db.flush()
+
+    fresh = compute_loan_values(db, loan_ids)
+    existing = {}
+    for chunk in _chunks(loan_ids):
+        for summary in db.query(database.LoanSummary).filter(database.LoanSummary.loan_id.in_(chunk)).all():
+            existing[summary.loan_id] = summary
+
+    deltas = {}
+    for loan_id in loan_ids:
+        summary = existing.get(loan_id)
+        values = fresh.get(loan_id)
+        if summary is not None:
+            _accumulate(deltas, _summary_to_values(summary), -1)
+        if values is not None:
+            _accumulate(deltas, values, 1)
+            if summary is None:
+                db.add(database.LoanSummary(loan_id=loan_id, **values))
+            else:
+                for field, value in values.items():
+                    setattr(summary, field, value)
+        elif summary is not None:
+            db.delete(summary)
+
+    _apply_deltas(db, deltas)
+
+
+def _rollups_from_values(loan_values):
+    rollups = {}
+    for values in loan_values.values():
+        _accumulate(rollups, values, 1)
+    return rollups
+
+
+def rebuild(db: Session):
+    """Recompute every summary and rollup row from the raw tables"""
+    loan_values = compute_loan_values(db)
+    db.query(database.LoanSummary).delete(synchronize_session=False)
+    db.query(database.PortfolioRollup).delete(synchronize_session=False)
+
+    now = datetime.utcnow()
+    db.bulk_insert_mappings(database.LoanSummary, [
+        dict(values, loan_id=loan_id, updated_at=now) for loan_id, values in loan_values.items()
+    ])
+    db.bulk_insert_mappings(database.PortfolioRollup, [
+        dict(totals, dimension=dimension, bucket=bucket, updated_at=now)
+        for (dimension, bucket), totals in _rollups_from_values(loan_values).items()
+    ])
+    db.commit()
+    return {"loans": len(loan_values)}
+
+
+def _differs(stored, fresh):
+    if isinstance(fresh, float) or isinstance(stored, float):
+        return abs((stored or 0) - (fresh or 0)) > AMOUNT_TOLERANCE
+    return stored != fresh
+
+
+def verify(db: Session):
+    """
+    Recompute everything from scratch and report drift against the stored
+    summaries without modifying them.
+    """
+    loan_values = compute_loan_values(db)
+    stored = {summary.loan_id: summary for summary in db.query(database.LoanSummary).all()}
+
+    loan_drift = []
+    for loan_id in sorted(set(loan_values) | set(stored)):
+        values = loan_values.get(loan_id)
+        summary = stored.get(loan_id)
+        if values is None or summary is None:
+            loan_drift.append({"loan_id": loan_id, "problem": "missing summary" if summary is None else "orphaned summary"})
+            continue
+        fields = {
+            field: {"stored": getattr(summary, field), "actual": value}
+            for field, value in values.items() if _differs(getattr(summary, field), value)
+        }
+        if fields:
+            loan_drift.append({"loan_id": loan_id, "fields": fields})
+
+    expected_rollups = _rollups_from_values(loan_values)
+    stored_rollups = {(row.dimension, row.bucket): row for row in db.query(database.PortfolioRollup).all()}
+    rollup_drift = []
+    for key in sorted(set(expected_rollups) | set(stored_rollups), key=str):
+        totals = expected_rollups.get(key)
+        row = stored_rollups.get(key)
+        if totals is None or row is None:
+            rollup_drift.append({"dimension": key[0], "bucket": key[1], "problem": "missing row" if row is None else "stale row"})
+            continue
+        fields = {
+            field: {"stored": getattr(row, field), "actual": value}
+            for field, value in totals.items() if _differs(getattr(row, field), value)
+        }
+        if fields:
+            rollup_drift.append({"dimension": key[0], "bucket": key[1], "fields": fields})
+
+    return {
+        "loans_checked": len(loan_values),
+        "loan_drift": loan_drift,
+        "rollup_drift": rollup_drift,
+        "ok": not loan_drift and not rollup_drift,
+    }
+
+
+def ensure_built(db: Session):
+    """Build the summaries once for databases created before they existed"""
+    has_rollup = db.query(database.PortfolioRollup).filter(database.PortfolioRollup.dimension == "portfolio").first()
+    has_loans = db.query(database.Loan.id).first()
+    if has_loans and not has_rollup:
+        rebuild(db)
+
+
+def dashboard_stats(db: Session, year: Optional[int] = None):
+    """
+    Dashboard payload read from the rollup rows plus one grouped count over clients
+    """
+    if year is None:
+        year = datetime.utcnow().year
+
+    Rollup = database.PortfolioRollup
+    rows = db.query(Rollup).filter(
+        (Rollup.dimension.in_(["portfolio", "status", "loan_type"]))
+        | ((Rollup.dimension == "start_year") & (Rollup.bucket == str(year)))
+    ).all()
+
+    portfolio = None
+    statuses = {}
+    loan_types = {}
+    this_year = None
+    for row in rows:
+        if row.dimension == "portfolio":
+            portfolio = row
+        elif row.dimension == "status":
+            statuses[row.bucket] = row.loan_count
+        elif row.dimension == "loan_type":
+            loan_types[row.bucket] = row.loan_count
+        else:
+            this_year = row
+
+    loans = {
+        "total": portfolio.loan_count if portfolio else 0,
+        "active": statuses.get("Active", 0),
+        "completed": statuses.get("Completed", 0),
+        "defaulted": statuses.get("Defaulted", 0),
+        "disbursed": portfolio.disbursed_amount if portfolio else 0,
+        "yearly_disbursed": this_year.disbursed_amount if this_year else 0,
+    }
+    installments = {
+        "expected": portfolio.expected_amount if portfolio else 0,
+        "collected": portfolio.collected_amount if portfolio else 0,
+        "yearly_expected": this_year.year_expected_amount if this_year else 0,
+        "yearly_collected": this_year.year_collected_amount if this_year else 0,
+        "overdue_count": portfolio.overdue_count if portfolio else 0,
+    }
+
+    return analytics.build_dashboard_payload(
+        analytics.client_risk_counts(db), loans, installments, loan_types, year
+    )
+
+
+def main(argv):
+    if len(argv) != 2 or argv[1] not in ("rebuild", "verify"):
+        print("usage: python summaries.py [rebuild|verify]")
+        return 2
+
+    database.init_db()
+    db = database.SessionLocal()
+    try:
+        if argv[1] == "rebuild":
+            result = rebuild(db)
+            print(f"Rebuilt summaries for {result['loans']} loans")
+            return 0
+
+        report = verify(db)
+        print(f"Checked {report['loans_checked']} loans")
+        for drift in report["loan_drift"]:
+            print(f"  loan {drift['loan_id']}: {drift.get('problem') or drift['fields']}")
+        for drift in report["rollup_drift"]:
+            print(f"  rollup {drift['dimension']}/{drift['bucket']}: {drift.get('problem') or drift['fields']}")
+        print("No drift found" if report["ok"] else "Drift detected - run `python summaries.py rebuild`")
+        return 0 if report["ok"] else 1
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
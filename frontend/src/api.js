@@ -36,10 +36,28 @@ api.interceptors.response.use(
   }
 );
 
+// One page of a keyset-paginated listing. Pass the returned nextCursor back
+// as `cursor` to load the following page; it is null on the last page.
+export const PAGE_SIZE = 50;
+const fetchPage = async (path, { cursor, limit = PAGE_SIZE, ...filters } = {}) => {
+  const response = await api.get(path, {
+    params: { ...filters, limit, ...(cursor ? { cursor } : {}) },
+  });
+  return {
+    items: response.data,
+    nextCursor: response.headers["x-next-cursor"] || null,
+  };
+};
+
 // Client APIs
 export const createClient = (clientData) => api.post("/clients/", clientData);
-export const getAllClients = () => api.get("/clients/");
+export const getClientsPage = (params) => fetchPage("/clients/", params);
 export const getClient = (clientId) => api.get(`/clients/${clientId}`);
+
+export const getClientOverview = (clientId) =>
+  api.get(`/clients/${clientId}/overview`);
+export const searchClients = (query, limit = 20) =>
+  api.get("/clients/search", { params: { q: query, limit } });
 export const updateClient = (clientId, payload) =>
   api.put(`/clients/${clientId}`, payload);
 export const deleteClient = (clientId) => api.delete(`/clients/${clientId}`);
@@ -48,7 +66,7 @@ export const deleteClient = (clientId) => api.delete(`/clients/${clientId}`);
 export const getLoanSuggestions = (clientId, loanAmount) =>
   api.post("/loans/suggest", { client_id: clientId, loan_amount: loanAmount });
 export const createLoan = (loanData) => api.post("/loans/", loanData);
-export const getAllLoans = () => api.get("/loans/");
+export const getLoansPage = (params) => fetchPage("/loans/", params);
 export const getLoan = (loanId) => api.get(`/loans/${loanId}`);
 export const getClientLoans = (clientId) =>
   api.get(`/clients/${clientId}/loans`);
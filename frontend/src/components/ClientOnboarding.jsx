@@ -1,7 +1,8 @@
 import { useState, useEffect } from "react";
 import {
   createClient,
-  getAllClients,
+  getClientsPage,
+  getClientOverview,
   updateClient,
   deleteClient,
 } from "../api";
@@ -25,10 +26,12 @@ const CNIC_REGEX = /^\d{5}-\d{7}-\d{1}$/;
 
 function ClientOnboarding() {
   const [clients, setClients] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
   const [loading, setLoading] = useState(false);
   const [showForm, setShowForm] = useState(false);
   const [message, setMessage] = useState(null);
   const [editingClientId, setEditingClientId] = useState(null);
+  const [overview, setOverview] = useState(null);
 
   const [formData, setFormData] = useState({
     name: "",
@@ -45,11 +48,13 @@ function ClientOnboarding() {
     fetchClients();
   }, []);
 
-  const fetchClients = async () => {
+  // Loads the first page, or appends the page after `cursor`
+  const fetchClients = async (cursor = null) => {
     try {
       setLoading(true);
-      const response = await getAllClients();
-      setClients(response.data);
+      const page = await getClientsPage({ cursor });
+      setClients((current) => (cursor ? [...current, ...page.items] : page.items));
+      setNextCursor(page.nextCursor);
     } catch (error) {
       console.error("Error fetching clients:", error);
       setMessage({
@@ -61,6 +66,111 @@ function ClientOnboarding() {
     }
   };
 
+  // Client, loans, installment summaries and risk in one request
+  const handleViewClient = async (clientId) => {
+    try {
+      setLoading(true);
+      const response = await getClientOverview(clientId);
+      setOverview(response.data);
+    } catch (error) {
+      console.error("Error loading client overview:", error);
+      setMessage({
+        type: "error",
+        text: "Unable to load this client's loans right now.",
+      });
+    } finally {
+      setLoading(false);
+    }
+  };
+
+  const renderOverview = () => {
+    if (!overview) return null;
+    const { client, loans, totals } = overview;
+    return (
+      <div style={{ marginBottom: "2rem" }}>
+        <div className="page-header">
+          <h3>
+            {client.name} — {totals.loans} loans ({totals.active_loans} active)
+          </h3>
+          <button className="btn btn-secondary" onClick={() => setOverview(null)}>
+            Close
+          </button>
+        </div>
+        <div className="stats-grid">
+          <div className="stat-card">
+            <h3>Total due</h3>
+            <div className="stat-value">₨ {totals.total_due.toLocaleString()}</div>
+          </div>
+          <div className="stat-card">
+            <h3>Paid</h3>
+            <div className="stat-value">₨ {totals.amount_paid.toLocaleString()}</div>
+          </div>
+          <div className="stat-card">
+            <h3>Outstanding</h3>
+            <div className="stat-value">
+              ₨ {totals.outstanding_balance.toLocaleString()}
+            </div>
+            <p className="stat-meta">
+              {totals.overdue_installments} overdue installments
+            </p>
+          </div>
+        </div>
+        {loans.length > 0 && (
+          <div className="table-container" style={{ marginTop: "1rem" }}>
+            <table>
+              <thead>
+                <tr>
+                  <th>Loan ID</th>
+                  <th>Amount</th>
+                  <th>Status</th>
+                  <th>Installments paid</th>
+                  <th>Next due</th>
+                  <th>Default probability</th>
+                  <th>Alerts</th>
+                </tr>
+              </thead>
+              <tbody>
+                {loans.map((loan) => (
+                  <tr key={loan.id}>
+                    <td>#{loan.id}</td>
+                    <td>₨ {loan.loan_amount.toLocaleString()}</td>
+                    <td>
+                      <span className={`badge badge-${loan.status.toLowerCase()}`}>
+                        {loan.status}
+                      </span>
+                    </td>
+                    <td>
+                      {loan.installments.paid}/{loan.installments.total}
+                    </td>
+                    <td>
+                      {loan.installments.next_due_date
+                        ? `${new Date(
+                            loan.installments.next_due_date
+                          ).toLocaleDateString()} (₨ ${loan.installments.next_due_amount.toLocaleString()})`
+                        : "—"}
+                    </td>
+                    <td>{loan.risk.default_probability}%</td>
+                    <td>
+                      {loan.risk.highest_severity ? (
+                        <span
+                          className={`badge badge-${loan.risk.highest_severity.toLowerCase()}`}
+                        >
+                          {loan.risk.alerts.length} ({loan.risk.highest_severity})
+                        </span>
+                      ) : (
+                        "None"
+                      )}
+                    </td>
+                  </tr>
+                ))}
+              </tbody>
+            </table>
+          </div>
+        )}
+      </div>
+    );
+  };
+
   const resetForm = () => {
     setFormData({
       name: "",
@@ -156,6 +266,7 @@ function ClientOnboarding() {
       setLoading(true);
       await deleteClient(clientId);
       setMessage({ type: "success", text: "Client deleted successfully." });
+      setOverview((current) => (current?.client.id === clientId ? null : current));
       fetchClients();
     } catch (error) {
       console.error("Error deleting client:", error);
@@ -317,7 +428,12 @@ function ClientOnboarding() {
           </form>
         )}
 
-        <h3>Registered clients ({clients.length})</h3>
+        {renderOverview()}
+
+        <h3>
+          Registered clients ({clients.length}
+          {nextCursor ? "+" : ""})
+        </h3>
 
         {loading && !showForm ? (
           <div className="loading">Loading client registry...</div>
@@ -370,6 +486,12 @@ function ClientOnboarding() {
                           flexWrap: "wrap",
                         }}
                       >
+                        <button
+                          className="btn btn-secondary"
+                          onClick={() => handleViewClient(client.id)}
+                        >
+                          View
+                        </button>
                         <button
                           className="btn btn-secondary"
                           onClick={() => handleEditClient(client)}
@@ -388,6 +510,16 @@ function ClientOnboarding() {
                 ))}
               </tbody>
             </table>
+            {nextCursor && (
+              <button
+                className="btn btn-secondary"
+                style={{ marginTop: "1rem" }}
+                onClick={() => fetchClients(nextCursor)}
+                disabled={loading}
+              >
+                {loading ? "Loading..." : "Load more clients"}
+              </button>
+            )}
           </div>
         )}
       </div>
@@ -1,5 +1,5 @@
 import { useState, useEffect } from "react";
-import { getDashboardStats, getAllAlerts, updateOverdueStatus } from "../api";
+import { getDashboardStats, getAllAlerts } from "../api";
 import {
   PieChart,
   Pie,
@@ -27,7 +27,7 @@ function Dashboard() {
     try {
       setLoading(true);
 
-      await updateOverdueStatus();
+      // Overdue flags are kept current by the server-side sweep
       const statsResponse = await getDashboardStats();
       setStats(statsResponse.data);
 
@@ -1,16 +1,19 @@
 import { useState, useEffect } from "react";
 import {
-  getAllClients,
+  searchClients,
   createLoan,
   getLoanSuggestions,
-  getAllLoans,
+  getLoansPage,
   updateLoan,
   deleteLoan,
 } from "../api";
 
 function LoanApplication() {
-  const [clients, setClients] = useState([]);
+  const [selectedClientName, setSelectedClientName] = useState("");
+  const [clientQuery, setClientQuery] = useState("");
+  const [clientMatches, setClientMatches] = useState([]);
   const [loans, setLoans] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
   const [loading, setLoading] = useState(false);
   const [showForm, setShowForm] = useState(false);
   const [message, setMessage] = useState(null);
@@ -27,24 +30,34 @@ function LoanApplication() {
   });
 
   useEffect(() => {
-    fetchClients();
     fetchLoans();
   }, []);
 
-  const fetchClients = async () => {
-    try {
-      const response = await getAllClients();
-      setClients(response.data);
-    } catch (error) {
-      console.error("Error fetching clients:", error);
+  // Search clients as the user types instead of listing every client
+  useEffect(() => {
+    const query = clientQuery.trim();
+    if (query.length < 2) {
+      setClientMatches([]);
+      return undefined;
     }
-  };
+    const timer = setTimeout(async () => {
+      try {
+        const response = await searchClients(query);
+        setClientMatches(response.data);
+      } catch (error) {
+        console.error("Error searching clients:", error);
+      }
+    }, 250);
+    return () => clearTimeout(timer);
+  }, [clientQuery]);
 
-  const fetchLoans = async () => {
+  // Loads the first page, or appends the page after `cursor`
+  const fetchLoans = async (cursor = null) => {
     try {
       setLoading(true);
-      const response = await getAllLoans();
-      setLoans(response.data);
+      const page = await getLoansPage({ cursor });
+      setLoans((current) => (cursor ? [...current, ...page.items] : page.items));
+      setNextCursor(page.nextCursor);
     } catch (error) {
       console.error("Error fetching loans:", error);
     } finally {
@@ -63,6 +76,9 @@ function LoanApplication() {
     });
     setEditingLoanId(null);
     setSuggestions(null);
+    setClientQuery("");
+    setClientMatches([]);
+    setSelectedClientName("");
   };
 
   const handleInputChange = (e) => {
@@ -76,6 +92,14 @@ function LoanApplication() {
     }
   };
 
+  const handleClientSelect = (client) => {
+    setFormData((prev) => ({ ...prev, client_id: client.id.toString() }));
+    setSelectedClientName(client.name);
+    setClientQuery("");
+    setClientMatches([]);
+    setSuggestions(null);
+  };
+
   const handleGetSuggestions = async () => {
     if (!formData.client_id || !formData.loan_amount) {
       setMessage({
@@ -158,6 +182,7 @@ function LoanApplication() {
       duration_months: loan.duration_months,
       start_date: new Date(loan.start_date).toISOString().split("T")[0],
     });
+    setSelectedClientName(loan.client_name);
     setEditingLoanId(loan.id);
     setShowForm(true);
   };
@@ -177,11 +202,6 @@ function LoanApplication() {
     }
   };
 
-  const getClientName = (clientId) => {
-    const client = clients.find((c) => c.id === clientId);
-    return client ? client.name : "Unknown";
-  };
-
   const renderSuggestionDetails = () => {
     if (!suggestions) return null;
     return (
@@ -293,20 +313,33 @@ function LoanApplication() {
             <div className="form-row">
               <div className="form-group">
                 <label>Select Client *</label>
-                <select
-                  name="client_id"
-                  value={formData.client_id}
-                  onChange={handleInputChange}
-                  required
-                >
-                  <option value="">-- Select Client --</option>
-                  {clients.map((client) => (
-                    <option key={client.id} value={client.id}>
-                      {client.name} (CNIC: {client.cnic}) — Risk:{" "}
-                      {client.risk_level}
-                    </option>
-                  ))}
-                </select>
+                <input
+                  type="text"
+                  value={clientQuery}
+                  onChange={(e) => setClientQuery(e.target.value)}
+                  placeholder={
+                    formData.client_id
+                      ? `${selectedClientName} — type to change`
+                      : "Search by name, CNIC or phone"
+                  }
+                  required={!formData.client_id}
+                />
+                {clientMatches.length > 0 && (
+                  <ul className="search-results">
+                    {clientMatches.map((client) => (
+                      <li key={client.id}>
+                        <button
+                          type="button"
+                          className="btn btn-secondary"
+                          onClick={() => handleClientSelect(client)}
+                        >
+                          {client.name} (CNIC: {client.cnic}) — Risk:{" "}
+                          {client.risk_level}
+                        </button>
+                      </li>
+                    ))}
+                  </ul>
+                )}
               </div>
 
               <div className="form-group">
@@ -412,7 +445,10 @@ function LoanApplication() {
           </form>
         )}
 
-        <h3>All loans ({loans.length})</h3>
+        <h3>
+          All loans ({loans.length}
+          {nextCursor ? "+" : ""})
+        </h3>
 
         {loading && !showForm ? (
           <div className="loading">Loading loan book...</div>
@@ -443,7 +479,7 @@ function LoanApplication() {
                 {loans.map((loan) => (
                   <tr key={loan.id}>
                     <td>#{loan.id}</td>
-                    <td>{getClientName(loan.client_id)}</td>
+                    <td>{loan.client_name}</td>
                     <td>₨ {loan.loan_amount.toLocaleString()}</td>
                     <td>{loan.loan_type}</td>
                     <td>{loan.interest_rate}%</td>
@@ -483,6 +519,16 @@ function LoanApplication() {
                 ))}
               </tbody>
             </table>
+            {nextCursor && (
+              <button
+                className="btn btn-secondary"
+                style={{ marginTop: "1rem" }}
+                onClick={() => fetchLoans(nextCursor)}
+                disabled={loading}
+              >
+                {loading ? "Loading..." : "Load more loans"}
+              </button>
+            )}
           </div>
         )}
       </div>
@@ -1,16 +1,16 @@
 import { useState, useEffect } from "react";
 import {
-  getAllLoans,
+  getLoansPage,
+  getLoan,
   getLoanInstallments,
   markInstallmentPaid,
   getLoanAlerts,
-  getAllClients,
   markAllInstallmentsPaid,
 } from "../api";
 
 function RepaymentTracker() {
   const [loans, setLoans] = useState([]);
-  const [clients, setClients] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
   const [selectedLoan, setSelectedLoan] = useState(null);
   const [installments, setInstallments] = useState([]);
   const [alerts, setAlerts] = useState(null);
@@ -19,13 +19,14 @@ function RepaymentTracker() {
 
   useEffect(() => {
     fetchLoans();
-    fetchClients();
   }, []);
 
-  const fetchLoans = async () => {
+  // Loads the first page, or appends the page after `cursor`
+  const fetchLoans = async (cursor = null) => {
     try {
-      const response = await getAllLoans();
-      setLoans(response.data);
+      const page = await getLoansPage({ cursor });
+      setLoans((current) => (cursor ? [...current, ...page.items] : page.items));
+      setNextCursor(page.nextCursor);
     } catch (error) {
       console.error("Error fetching loans:", error);
     }
@@ -40,7 +41,6 @@ function RepaymentTracker() {
       await markAllInstallmentsPaid(selectedLoan.id);
       setMessage({ type: "success", text: "All installments marked as paid." });
       await handleLoanSelect(selectedLoan.id);
-      fetchLoans();
     } catch (error) {
       console.error("Error marking all installments as paid:", error);
       setMessage({
@@ -52,15 +52,6 @@ function RepaymentTracker() {
     }
   };
 
-  const fetchClients = async () => {
-    try {
-      const response = await getAllClients();
-      setClients(response.data);
-    } catch (error) {
-      console.error("Error fetching clients:", error);
-    }
-  };
-
   const handleLoanSelect = async (loanId) => {
     if (!loanId) {
       setSelectedLoan(null);
@@ -71,8 +62,12 @@ function RepaymentTracker() {
 
     try {
       setLoading(true);
-      const loan = loans.find((l) => l.id === parseInt(loanId, 10));
+      // Fetched fresh so the loaded pages pick up status and balance changes
+      const loanResponse = await getLoan(loanId);
+      const listed = loans.find((l) => l.id === loanResponse.data.id);
+      const loan = { ...loanResponse.data, client_name: listed?.client_name };
       setSelectedLoan(loan);
+      setLoans((current) => current.map((l) => (l.id === loan.id ? loan : l)));
 
       const installmentsResponse = await getLoanInstallments(loanId);
       setInstallments(installmentsResponse.data);
@@ -103,7 +98,6 @@ function RepaymentTracker() {
         await handleLoanSelect(selectedLoan.id);
       }
 
-      await fetchLoans();
       setLoading(false);
     } catch (error) {
       console.error("Error marking installment as paid:", error);
@@ -115,11 +109,6 @@ function RepaymentTracker() {
     }
   };
 
-  const getClientName = (clientId) => {
-    const client = clients.find((c) => c.id === clientId);
-    return client ? client.name : "Unknown";
-  };
-
   const calculateProgress = () => {
     if (installments.length === 0) return 0;
     const paidCount = installments.filter((inst) => inst.paid).length;
@@ -157,11 +146,21 @@ function RepaymentTracker() {
             <option value="">-- Select a Loan --</option>
             {loans.map((loan) => (
               <option key={loan.id} value={loan.id}>
-                Loan #{loan.id} • {getClientName(loan.client_id)} • ₨
+                Loan #{loan.id} • {loan.client_name} • ₨
                 {loan.loan_amount.toLocaleString()} ({loan.status})
               </option>
             ))}
           </select>
+          {nextCursor && (
+            <button
+              type="button"
+              className="btn btn-secondary"
+              style={{ marginTop: "0.5rem" }}
+              onClick={() => fetchLoans(nextCursor)}
+            >
+              Load more loans
+            </button>
+          )}
         </div>
 
         {loading && <div className="loading">Pulling repayment data...</div>}
@@ -231,7 +230,7 @@ function RepaymentTracker() {
               <div className="stat-card">
                 <h3>Client</h3>
                 <div className="stat-value" style={{ fontSize: "1.4rem" }}>
-                  {getClientName(selectedLoan.client_id)}
+                  {selectedLoan.client_name}
                 </div>
               </div>
             </div>